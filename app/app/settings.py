@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from decimal import Decimal
 from pathlib import Path
 import os
 
@@ -31,8 +32,14 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# api only workers leave out the admin urls and don't autodiscover the admin
+# modules of the apps, the admin app stays for its LogEntry model
+API_ONLY = os.environ.get("DJANGO_API_ONLY", "0") == "1"
+
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "django.contrib.admin.apps.SimpleAdminConfig"
+    if API_ONLY
+    else "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -48,14 +55,32 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.RoutedMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# middleware run in RoutedMiddleware's place by the longest matching path
+# prefix, the token authenticated API needs no sessions, CSRF or messages
+MIDDLEWARE_ROUTES = {
+    "/api/": ["django.middleware.common.CommonMiddleware"],
+    "": [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.common.CommonMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+    ],
+}
+# the admin checks look for its middleware in MIDDLEWARE only, the routes
+# above give the admin all three
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
+
+# response compression, see core.middleware.CompressionMiddleware
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+
 ROOT_URLCONF = "app.urls"
 
 TEMPLATES = [
@@ -90,6 +115,36 @@ DATABASES = {
     }
 }
 
+# read replicas, comma separated hosts sharing the primary's credentials,
+# pointing one at the primary's own host works for local testing
+REPLICA_DATABASES = []
+replica_hosts = os.environ.get("DB_REPLICA_HOSTS", "")
+for index, host in enumerate(filter(None, replica_hosts.split(","))):
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+# seconds a client reads from the primary after one of its writes
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 15))
+
+# the cache every process shares, the versions of the recipe.names and
+# recipe.matching maps, recipe stats and the per user replica pins of
+# core.mixins only reach the other workers through it. without REDIS_URL
+# each process keeps its own, which only does for a single process
+# (runserver, tests), see core.checks
+REDIS_URL = os.environ.get("REDIS_URL", "")
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -127,12 +182,106 @@ MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media/"
 STATIC_ROOT = "/vol/web/static/"
 
+# how core.views.serve_media delivers MEDIA_URL: "file", "x-accel-redirect",
+# "x-sendfile" or "none" when the front proxy serves MEDIA_ROOT itself
+MEDIA_SERVE_MODE = os.environ.get("MEDIA_SERVE_MODE", "file")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.User"
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"}
+
+# swaps in a fast password hasher while testing
+TEST_RUNNER = "core.test_runner.TestRunner"
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # token bucket sizes and refill rates, see core.throttling
+    "DEFAULT_THROTTLE_RATES": {
+        "token": "10/min",
+        "user_create": "20/hour",
+        "recipe_upload": "60/hour",
+    },
+    # reverse proxies in front of the app, the client ip throttles key on
+    # is the X-Forwarded-For entry the outermost one added, with 0 it is
+    # REMOTE_ADDR. clients write whatever they like into the header
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
+}
+
+# "memory" per process buckets or "cache" to share them through CACHES
+THROTTLE_STORE = os.environ.get("THROTTLE_STORE", "memory")
+
+# "orjson" when installed, "json" forces the stdlib encoder/decoder
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "orjson")
+
+# width of the price histogram buckets and cache lifetime of recipe stats
+RECIPE_STATS_PRICE_BUCKET = Decimal("5.00")
+RECIPE_STATS_CACHE_SECONDS = 60 * 60
+
+# users whose ingredient index (recipe.matching) is kept in memory
+MATCHING_INDEX_MAX_USERS = int(os.environ.get("MATCHING_INDEX_MAX_USERS", 1000))
+
+# users whose tag and ingredient names (recipe.names) are kept in memory
+NAME_CACHE_MAX_USERS = int(os.environ.get("NAME_CACHE_MAX_USERS", 10000))
+
+# background jobs, see core.jobs
+JOB_MAX_ATTEMPTS = 5
+# seconds, doubled after every failed attempt
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+# seconds a worker owns a claimed job before it is handed to another one,
+# extended every third of it while the job runs
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", 5 * 60))
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", 4))
+
+# admin changelists of bigger tables show the planner's row estimate
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# rows deleted per transaction when deleting an account, see user.deletion
+USER_DELETE_CHUNK_SIZE = 500
+
+# change feed of recipe.sync, changes per page and how long deletes are kept
+SYNC_PAGE_SIZE = 500
+SYNC_TOMBSTONE_RETENTION_DAYS = int(
+    os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+)
+
+# where `manage.py relay_events` delivers the change events, a file:// or
+# http(s):// url, how many per batch and how long delivered ones are kept,
+# see core.outbox
+OUTBOX_SINK = os.environ.get("OUTBOX_SINK", "file:///vol/web/outbox/events.jsonl")
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_RETENTION_HOURS = int(os.environ.get("OUTBOX_RETENTION_HOURS", 24))
+
+# seconds the response of an Idempotency-Key request is replayed, see
+# core.idempotency
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# views reachable through /api/batch/, how many sub-requests a batch may
+# hold and how many of its reads run at once, see core.batch
+BATCH_VIEWS = [
+    "recipe.views.RecipeViewSet",
+    "recipe.views.TagViewSet",
+    "recipe.views.IngredientViewSet",
+    "user.views.ManageUserView",
+]
+BATCH_MAX_REQUESTS = 20
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+
+# schema written at build time, served by core.schema.PrebuiltSchemaView
+SCHEMA_FILE = os.environ.get("SCHEMA_FILE", "")
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
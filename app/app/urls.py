@@ -14,23 +14,37 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
-from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.conf.urls.static import static
+from django.urls import path, re_path, include
 from django.conf import settings
 
+from core.batch import BatchView
+from core.lazy import lazy_view
+from core.views import serve_media
+
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api_schema"),
+    path("api/schema/", lazy_view("core.schema.PrebuiltSchemaView"), name="api_schema"),
     path(
         "api/docs",
-        SpectacularSwaggerView.as_view(url_name="api_schema"),
+        lazy_view(
+            "drf_spectacular.views.SpectacularSwaggerView", url_name="api_schema"
+        ),
         name="api-docs",
     ),
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
+    path("api/batch/", BatchView.as_view(), name="batch"),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT,)
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
+
+if settings.MEDIA_SERVE_MODE != "none":
+    urlpatterns += [
+        re_path(
+            r"^%s(?P<path>.+)$" % settings.MEDIA_URL.lstrip("/"),
+            serve_media,
+            name="media",
+        ),
+    ]
@@ -0,0 +1,5 @@
+"""
+micro benchmarks, run from the app dir against a throw away test database:
+
+    docker-compose run --rm app sh -c "python -m benchmarks.bench_recipe_list"
+"""
@@ -0,0 +1,57 @@
+"""the requests of one screen sent separately vs as one /api/batch/ request"""
+
+import json
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+SCREEN = [
+    "/api/recipe/recipes/",
+    "/api/recipe/tags/",
+    "/api/recipe/ingredients/",
+    "/api/user/me/",
+]
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+        from core.tests.factories import (
+            create_user,
+            create_tags,
+            create_ingredients,
+            create_recipes,
+        )
+
+        user = create_user("bench@example.com")
+        tags = create_tags(user, [f"tag {i}" for i in range(20)])
+        ingredients = create_ingredients(user, [f"ingredient {i}" for i in range(50)])
+        create_recipes(user, 50, tags=tags[:3], ingredients=ingredients[:8])
+        token = Token.objects.create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        def separate():
+            for path in SCREEN:
+                assert client.get(path).status_code == 200
+
+        def batched(concurrent):
+            body = json.dumps(
+                {"requests": [{"path": p} for p in SCREEN], "concurrent": concurrent}
+            )
+
+            def send():
+                res = client.post("/api/batch/", body, content_type="application/json")
+                assert res.status_code == 200
+
+            return send
+
+        print(f"{len(SCREEN)} requests, 50 recipes")
+        baseline = timeit(separate)
+        report("separate requests", baseline)
+        report("batch", timeit(batched(False)), baseline)
+        report("batch, concurrent reads", timeit(batched(True)), baseline)
+
+
+if __name__ == "__main__":
+    main()
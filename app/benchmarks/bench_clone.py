@@ -0,0 +1,52 @@
+"""copying a recipe as clients did (GET then POST) vs the clone endpoint"""
+
+import json
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+        from core.tests.factories import (
+            create_user,
+            create_tags,
+            create_ingredients,
+            create_recipes,
+        )
+
+        user = create_user("bench@example.com")
+        tags = create_tags(user, [f"tag {i}" for i in range(5)])
+        ingredients = create_ingredients(user, [f"ingredient {i}" for i in range(12)])
+        recipes = create_recipes(user, 20, tags=tags, ingredients=ingredients)
+        token = Token.objects.create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        url = f"/api/recipe/recipes/{recipes[0].pk}/"
+
+        def get_and_post():
+            recipe = client.get(url).json()
+            body = {k: v for k, v in recipe.items() if k not in ("id", "image")}
+            res = client.post("/api/recipe/recipes/", body, "application/json")
+            assert res.status_code == 201
+
+        def clone():
+            assert client.post(f"{url}clone/").status_code == 201
+
+        def clone_many():
+            body = json.dumps({"ids": [r.pk for r in recipes]})
+            res = client.post("/api/recipe/recipes/clone/", body, "application/json")
+            assert res.status_code == 201
+
+        print("one recipe, 5 tags and 12 ingredients")
+        baseline = timeit(get_and_post)
+        report("GET + POST", baseline)
+        report("POST clone/", timeit(clone), baseline)
+        print(f"{len(recipes)} recipes")
+        report("GET + POST each", baseline * len(recipes))
+        report("POST recipes/clone/", timeit(clone_many), baseline * len(recipes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""job throughput of one worker, claiming batches with SKIP LOCKED"""
+
+import time
+
+from benchmarks.utils import setup_django, test_database
+
+JOBS = 2000
+
+
+def noop():
+    pass
+
+
+def main():
+    setup_django()
+    from django.db import connection
+    from core import jobs
+    from core.models import Job
+
+    jobs.job("bench.noop")(noop)
+
+    threads = [1, 4, 8]
+    if not connection.features.has_select_for_update_skip_locked:
+        # no row locks on this database, concurrent jobs would just conflict
+        threads = [1]
+
+    with test_database():
+        for concurrency in threads:
+            Job.objects.bulk_create(Job(name="bench.noop") for _ in range(JOBS))
+            worker = jobs.Worker(concurrency=concurrency)
+            start = time.perf_counter()
+            processed = worker.run(burst=True)
+            elapsed = time.perf_counter() - start
+            name = f"one worker, {concurrency} thread(s)"
+            print(f"{name:<40} {processed / elapsed:10.0f} jobs/s")
+            Job.objects.all().delete()
+
+
+if __name__ == "__main__":
+    main()
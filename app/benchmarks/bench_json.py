@@ -0,0 +1,62 @@
+"""encode/decode throughput of the API json renderer and parser"""
+
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, timeit, report
+
+RECIPES = 2000
+
+
+def recipe_list_payload():
+    """a list response shaped like RecipeSerializer output"""
+    created = datetime.datetime(2022, 6, 18, 15, 54, tzinfo=datetime.timezone.utc)
+    return [
+        OrderedDict(
+            id=i,
+            title=f"recipe number {i} with a reasonably long title",
+            time_minutes=i % 120,
+            price=str(Decimal(i % 500) / 4),
+            link="https://example.com/recipes/recipe.pdf",
+            created=created + datetime.timedelta(minutes=i),
+            tags=[OrderedDict(id=j, name=f"tag {j}") for j in range(3)],
+            ingredients=[
+                OrderedDict(id=j, name=f"ingredient {j}") for j in range(8)
+            ],
+        )
+        for i in range(RECIPES)
+    ]
+
+
+def main():
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core import jsonlib
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer
+
+    if jsonlib.fast_backend() is None:
+        print("no fast json backend installed, both rows use the stdlib")
+
+    payload = recipe_list_payload()
+    body = JSONRenderer().render(payload)
+    size = len(body) / 1024 / 1024
+    print(f"{RECIPES} recipes, {size:.2f} MB rendered")
+
+    baseline = timeit(lambda: JSONRenderer().render(payload))
+    report("JSONRenderer", baseline)
+    fast = timeit(lambda: FastJSONRenderer().render(payload))
+    report("FastJSONRenderer", fast, baseline)
+    print(f"encode throughput {size / baseline:8.1f} MB/s -> {size / fast:8.1f} MB/s")
+
+    baseline = timeit(lambda: JSONParser().parse(io.BytesIO(body)))
+    report("JSONParser", baseline)
+    fast = timeit(lambda: FastJSONParser().parse(io.BytesIO(body)))
+    report("FastJSONParser", fast, baseline)
+
+
+if __name__ == "__main__":
+    main()
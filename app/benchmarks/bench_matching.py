@@ -0,0 +1,47 @@
+"""what can I cook and similar recipes over in memory indexes of 100k recipes"""
+
+import random
+
+from benchmarks.utils import setup_django, timeit, report
+
+RECIPES = 100000
+INGREDIENTS = 500
+PER_RECIPE = (3, 12)
+ON_HAND = 15
+
+
+def build_index():
+    from recipe.matching import RecipeSetIndex
+
+    rng = random.Random(42)
+    index = RecipeSetIndex()
+    for recipe_id in range(1, RECIPES + 1):
+        count = rng.randint(*PER_RECIPE)
+        index.add(recipe_id, rng.sample(range(INGREDIENTS), count))
+    return index
+
+
+def main():
+    setup_django()
+    index = build_index()
+    rng = random.Random(7)
+    on_hand = rng.sample(range(INGREDIENTS), ON_HAND)
+
+    print(f"{RECIPES} recipes, {INGREDIENTS} ingredients, {ON_HAND} on hand")
+    report("match, top 20", timeit(lambda: index.match(on_hand, limit=20)))
+    report("match, top 100", timeit(lambda: index.match(on_hand, limit=100)))
+
+    def add_and_remove():
+        index.add(RECIPES + 1, on_hand[:5])
+        index.remove(RECIPES + 1)
+
+    report("add and remove a recipe", timeit(add_and_remove))
+    report("similar, jaccard top 10", timeit(lambda: index.similar(1, limit=10)))
+    report(
+        "similar, cosine top 10",
+        timeit(lambda: index.similar(1, limit=10, metric="cosine")),
+    )
+
+
+if __name__ == "__main__":
+    main()
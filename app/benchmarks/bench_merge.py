@@ -0,0 +1,44 @@
+"""merging a tag used by many recipes, per recipe vs set based"""
+
+from benchmarks.utils import setup_django, test_database, best_of, report
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.db import transaction
+        from core.models import Tag
+        from core.tests.factories import create_user, create_tags, create_recipes
+        from recipe import merge
+
+        user = create_user("bench@example.com")
+
+        def per_recipe(target, source):
+            # what cleaning up through the recipe endpoints amounts to
+            with transaction.atomic():
+                for recipe in source.recipe_set.all():
+                    recipe.tags.remove(source)
+                    recipe.tags.add(target)
+                source.delete()
+
+        def set_based(target, source):
+            merge.merge(target, [source.pk])
+
+        for recipes in (100, 2000, 20000):
+
+            def prepare():
+                Tag.objects.filter(user=user).delete()
+                target, source = create_tags(user, ["tomato", "Tomatoes"])
+                create_recipes(user, recipes, tags=[source])
+                return target, source
+
+            print(f"{recipes} recipes")
+            baseline = None
+            if recipes <= 2000:
+                baseline = best_of(prepare, per_recipe)
+                report("per recipe", baseline)
+            report("recipe.merge", best_of(prepare, set_based), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""per request cost of the full MIDDLEWARE vs the routed API middleware"""
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+FULL_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+
+def chain_cost(middleware, path):
+    """a request through the middleware alone, the view returns at once"""
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from core.middleware import MiddlewareChain
+
+    def view(request):
+        for hook in chain.view_hooks:
+            hook(request, view, (), {})
+        return HttpResponse("{}", content_type="application/json")
+
+    chain = MiddlewareChain(middleware, view)
+    factory = RequestFactory()
+    return timeit(lambda: chain.handler(factory.get(path)), number=1000)
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.conf import settings
+        from django.test import Client, override_settings
+        from rest_framework.authtoken.models import Token
+        from core.tests.factories import create_user
+
+        token = Token.objects.create(user=create_user("bench@example.com"))
+
+        def request_cost():
+            client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+            return timeit(lambda: client.get("/api/user/me/"), number=200)
+
+        print("middleware only")
+        baseline = chain_cost(FULL_MIDDLEWARE, "/api/user/me/")
+        report("full MIDDLEWARE", baseline)
+        report(
+            "routed, /api/", chain_cost(settings.MIDDLEWARE, "/api/user/me/"), baseline
+        )
+
+        print("GET /api/user/me/ through the test client")
+        with override_settings(MIDDLEWARE=FULL_MIDDLEWARE):
+            baseline = request_cost()
+        report("full MIDDLEWARE", baseline)
+        report("routed, /api/", request_cost(), baseline)
+
+
+if __name__ == "__main__":
+    main()
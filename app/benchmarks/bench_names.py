@@ -0,0 +1,68 @@
+"""recipe writes naming known tags and ingredients, per name lookups vs recipe.names"""
+
+from unittest import mock
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.authtoken.models import Token
+        from core.tests.factories import create_user, create_tags, create_ingredients
+        from recipe import names
+
+        user = create_user("bench@example.com")
+        create_tags(user, [f"tag {i}" for i in range(200)])
+        create_ingredients(user, [f"ingredient {i}" for i in range(500)])
+        token = Token.objects.create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        payload = {
+            "title": "bench",
+            "time_minutes": 10,
+            "price": "3.00",
+            "tags": [{"name": f"tag {i}"} for i in range(5)],
+            "ingredients": [{"name": f"ingredient {i}"} for i in range(12)],
+        }
+
+        def write():
+            res = client.post("/api/recipe/recipes/", payload, "application/json")
+            assert res.status_code == 201
+
+        def cold():
+            names.tags.clear()
+            names.ingredients.clear()
+            write()
+
+        def get_or_create(cache, user, items):
+            # what the serializer did before, a lookup per name
+            model = cache.model.objects
+            return [model.get_or_create(user=user, name=n)[0].pk for n in items]
+
+        def per_name():
+            with mock.patch.object(names.NameCache, "resolve", get_or_create):
+                write()
+
+        variants = [
+            ("get_or_create per name", per_name),
+            ("map loaded every write", cold),
+            ("cached map", write),
+        ]
+        print("POST /api/recipe/recipes/, 5 tags and 12 ingredients")
+        for label, func in variants:
+            write()
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            print(f"{label}: {len(queries)} queries")
+
+        baseline = timeit(per_name)
+        report(variants[0][0], baseline)
+        for label, func in variants[1:]:
+            report(label, timeit(func), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""finding the changed recipes by polling the list vs relaying the outbox"""
+
+from benchmarks.utils import setup_django, test_database, timeit, best_of, report
+
+
+class NullSink:
+    def deliver(self, messages):
+        pass
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.db.models.signals import post_save
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+        from core import outbox
+        from core.models import Recipe
+        from core.tests.factories import create_user, create_tags, create_recipes
+        from recipe import signals
+
+        user = create_user("bench@example.com")
+        tags = create_tags(user, [f"tag {i}" for i in range(5)])
+        recipes = create_recipes(user, 2000, tags=tags)
+        token = Token.objects.create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        sink = NullSink()
+
+        def change():
+            outbox.pending().delete()
+            for recipe in recipes[:10]:
+                recipe.save()
+
+        def poll():
+            assert client.get("/api/recipe/recipes/").status_code == 200
+
+        def relay():
+            assert outbox.relay(sink) == 10
+
+        print(f"10 of {len(recipes)} recipes changed")
+        baseline = best_of(change, poll, repeat=5)
+        report("GET recipes/", baseline)
+        report("outbox.relay", best_of(change, relay, repeat=5), baseline)
+
+        print("the cost on writes")
+        recipe = recipes[0]
+        post_save.disconnect(signals.owned_object_saved_event, sender=Recipe)
+        baseline = timeit(recipe.save)
+        report("save() without the outbox", baseline)
+        post_save.connect(signals.owned_object_saved_event, sender=Recipe)
+        report("save() appending an event", timeit(recipe.save), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""recipe list serialization: DRF RecipeSerializer vs RecipeValuesSerializer"""
+
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+RECIPES = 1000
+TAGS_PER_RECIPE = 3
+INGREDIENTS_PER_RECIPE = 8
+
+
+def populate():
+    from django.contrib.auth import get_user_model
+    from core.models import Recipe, Tag, Ingredient
+
+    user = get_user_model().objects.create_user("bench@example.com", "password12")
+    tags = Tag.objects.bulk_create(
+        [Tag(user=user, name=f"tag {i}") for i in range(20)]
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=f"ingredient {i}") for i in range(100)]
+    )
+    recipes = Recipe.objects.bulk_create(
+        [
+            Recipe(
+                user=user,
+                title=f"recipe {i}",
+                time_minutes=i % 120,
+                price=Decimal(i % 500) / 7,
+                link="https://example.com/recipe.pdf",
+            )
+            for i in range(RECIPES)
+        ]
+    )
+    Recipe.tags.through.objects.bulk_create(
+        [
+            Recipe.tags.through(recipe=recipe, tag=tags[(i + j) % len(tags)])
+            for i, recipe in enumerate(recipes)
+            for j in range(TAGS_PER_RECIPE)
+        ]
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        [
+            Recipe.ingredients.through(
+                recipe=recipe, ingredient=ingredients[(i + j) % len(ingredients)]
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(INGREDIENTS_PER_RECIPE)
+        ]
+    )
+    return user
+
+
+def main():
+    setup_django()
+    with test_database():
+        from rest_framework.renderers import JSONRenderer
+        from core.models import Recipe
+        from recipe.serializers import RecipeSerializer
+        from recipe.fast_serializers import RecipeValuesSerializer
+
+        user = populate()
+
+        def queryset():
+            return Recipe.objects.filter(user=user).order_by("-id").distinct()
+
+        def drf():
+            return RecipeSerializer(queryset(), many=True).data
+
+        def values():
+            return RecipeValuesSerializer(queryset(), many=True).data
+
+        renderer = JSONRenderer()
+        assert renderer.render(drf()) == renderer.render(values())
+
+        print(f"{RECIPES} recipes, {TAGS_PER_RECIPE} tags, "
+              f"{INGREDIENTS_PER_RECIPE} ingredients each")
+        baseline = timeit(drf, number=3)
+        report("RecipeSerializer", baseline)
+        report("RecipeValuesSerializer", timeit(values, number=3), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""a week's shopping list, summed in python over the through rows vs grouped in SQL"""
+
+import random
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+RECIPES = 60
+INGREDIENTS_PER_RECIPE = 12
+
+
+def python_sum(user, recipe_ids):
+    """the merge clients did, over every through row"""
+    from core.models import RecipeIngredient
+    from recipe.shopping import UNITS
+
+    totals = {}
+    rows = RecipeIngredient.objects.filter(
+        recipe__user=user, recipe_id__in=recipe_ids
+    ).select_related("ingredient")
+    for row in rows:
+        unit, factor = UNITS[row.unit]
+        key = (row.ingredient.name, unit)
+        if row.quantity is not None:
+            totals[key] = totals.get(key, 0) + row.quantity * factor
+    return totals
+
+
+def main():
+    setup_django()
+    with test_database():
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+        from core.models import RecipeIngredient
+        from core.tests.factories import create_user, create_ingredients, create_recipe
+        from recipe.shopping import UNITS, shopping_list
+
+        rng = random.Random(1)
+        user = create_user("bench@example.com")
+        ingredients = create_ingredients(user, [f"ingredient {i}" for i in range(150)])
+        recipes = [create_recipe(user, title=f"r{i}") for i in range(RECIPES)]
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient,
+                quantity=Decimal(rng.randint(1, 500)),
+                unit=rng.choice(list(UNITS)),
+            )
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, INGREDIENTS_PER_RECIPE)
+        )
+        ids = [recipe.id for recipe in recipes]
+        token = Token.objects.create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        query = {"recipes": ",".join(map(str, ids))}
+
+        def endpoint():
+            assert client.get("/api/recipe/shopping-list/", query).status_code == 200
+
+        print(f"{RECIPES} recipes, {INGREDIENTS_PER_RECIPE} ingredients each")
+        baseline = timeit(lambda: python_sum(user, ids))
+        report("python over the through rows", baseline)
+        report("grouped query", timeit(lambda: shopping_list(user, ids)), baseline)
+        report("GET /api/recipe/shopping-list/", timeit(endpoint), baseline)
+
+
+if __name__ == "__main__":
+    main()
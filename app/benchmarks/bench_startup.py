@@ -0,0 +1,97 @@
+"""
+worker boot time, from `python -X importtime` of loading the wsgi app and
+its urls in a fresh interpreter
+
+    docker-compose run --rm app python -m benchmarks.bench_startup
+
+run it in the image, its python and app.settings are what the workers boot.
+some of the watched modules load in both modes: yaml through DRF's
+optional compat imports, drf-spectacular needs PyYAML installed, and
+django.contrib.admin.sites through the admin package, which API only
+workers keep installed for its LogEntry model (deleting a user cascades to
+their log entries).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BOOT = """
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+"""
+MODES = [
+    ("default", {}),
+    ("DJANGO_API_ONLY=1", {"DJANGO_API_ONLY": "1"}),
+]
+WATCHED = ["PIL", "drf_spectacular.openapi", "yaml", "django.contrib.admin.sites"]
+RUNS = 10
+TOP = 15
+
+
+def boot(env):
+    """returns (wall seconds, {module: (self us, cumulative us)})"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+    return elapsed, modules
+
+
+def report(name, env, out):
+    runs = [boot(env) for _ in range(RUNS)]
+    wall = min(elapsed for elapsed, _ in runs)
+    _, modules = min(runs, key=lambda run: run[0])
+    total = sum(own for own, _ in modules.values())
+    out.write(f"== {name}\n")
+    out.write(f"boot wall clock (best of {RUNS})      {wall * 1000:8.1f} ms\n")
+    out.write(f"import time                         {total / 1000:8.1f} ms\n")
+    out.write(f"modules imported                    {len(modules):8d}\n")
+    for module in WATCHED:
+        out.write(f"  {module:<34}{'imported' if module in modules else '-':>8}\n")
+    out.write(f"top {TOP} packages by import time\n")
+    packages = {}
+    for module, (own, _) in modules.items():
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    for package, own in sorted(packages.items(), key=lambda i: -i[1])[:TOP]:
+        out.write(f"  {package:<34}{own / 1000:8.1f} ms\n")
+    out.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+    out = sys.stdout
+    if args.output:
+        out = open(args.output, "w")
+    version = sys.version.split()[0]
+    out.write(f"python {version}, {os.environ['DJANGO_SETTINGS_MODULE']}\n\n")
+    for name, env in MODES:
+        report(name, env, out)
+    if args.output:
+        out.close()
+        with open(args.output) as f:
+            sys.stdout.write(f.read())
+
+
+if __name__ == "__main__":
+    main()
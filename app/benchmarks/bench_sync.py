@@ -0,0 +1,45 @@
+"""full recipe download vs the delta sync change feed after a few writes"""
+
+from benchmarks.utils import setup_django, test_database, timeit, report
+
+RECIPES = 2000
+CHANGED = 10
+
+
+def main():
+    setup_django()
+    with test_database():
+        from rest_framework.renderers import JSONRenderer
+        from core.models import Recipe
+        from core.tests.factories import create_user, create_tags, create_recipes
+        from recipe import sync
+        from recipe.fast_serializers import RecipeValuesSerializer
+
+        user = create_user("bench@example.com")
+        tags = create_tags(user, [f"tag {i}" for i in range(20)])
+        create_recipes(user, RECIPES, tags=tags[:3])
+        cursor = sync.changes(user.pk, limit=RECIPES * 2)["cursor"]
+        for recipe in Recipe.objects.filter(user=user)[:CHANGED]:
+            recipe.title += " (edited)"
+            recipe.save()
+        Recipe.objects.filter(user=user).last().delete()
+
+        renderer = JSONRenderer()
+
+        def full():
+            queryset = Recipe.objects.filter(user=user).order_by("-id")
+            return renderer.render(RecipeValuesSerializer(queryset).data)
+
+        def delta():
+            return renderer.render(sync.changes(user.pk, cursor))
+
+        print(f"{RECIPES} recipes, {CHANGED} edited and 1 deleted since the cursor")
+        print(f"full download {len(full()):>10} bytes")
+        print(f"delta         {len(delta()):>10} bytes")
+        baseline = timeit(full, number=3)
+        report("full recipe list", baseline)
+        report("changes since cursor", timeit(delta, number=3), baseline)
+
+
+if __name__ == "__main__":
+    main()
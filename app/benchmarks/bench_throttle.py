@@ -0,0 +1,38 @@
+"""cost of one token bucket throttle check"""
+
+from benchmarks.utils import setup_django, timeit, report
+
+CHECKS = 10000
+KEYS = 50000
+
+
+def main():
+    setup_django()
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+    from core import throttling
+
+    class View:
+        throttle_scope = "token"
+
+    view = View()
+    throttle = throttling.IPTokenBucketThrottle()
+    requests = [
+        Request(RequestFactory().post("/", REMOTE_ADDR=f"10.0.{i // 256}.{i % 256}"))
+        for i in range(KEYS)
+    ]
+
+    def check_same_key():
+        for _ in range(CHECKS):
+            throttle.allow_request(requests[0], view)
+
+    def check_many_keys():
+        for i in range(CHECKS):
+            throttle.allow_request(requests[i * 7 % KEYS], view)
+
+    report("memory store, one key (per check)", timeit(check_same_key) / CHECKS)
+    report("memory store, 50k keys (per check)", timeit(check_many_keys) / CHECKS)
+
+
+if __name__ == "__main__":
+    main()
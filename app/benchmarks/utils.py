@@ -0,0 +1,62 @@
+"""shared helpers for the benchmark scripts"""
+
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """creates the test database for the duration of the block"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timeit(func, repeat=5, number=10):
+    """returns the best per call time of `func` in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def best_of(prepare, func, repeat=3):
+    """
+    best time of one `func(*prepare())` call, without the prepare step,
+    `prepare` returning None calls `func()`
+    """
+    best = None
+    for _ in range(repeat):
+        args = prepare() or ()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(name, seconds, baseline=None):
+    line = f"{name:<40} {seconds * 1000:10.3f} ms"
+    if baseline:
+        line += f"  ({baseline / seconds:5.2f}x)"
+    print(line)
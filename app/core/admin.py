@@ -1,9 +1,56 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.signals import m2m_changed
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from core import models
 
 
+def estimated_count(model, using):
+    """the planner's row estimate for `model`'s table, None off postgres"""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # -1 until the table is first analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    counts unfiltered changelists from pg_class.reltuples instead of a
+    COUNT(*) over the whole table, small tables still get an exact count
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """changelist for tables with millions of rows"""
+
+    paginator = EstimatedCountPaginator
+    # skips the second COUNT(*) of the unfiltered table when searching
+    show_full_result_count = False
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    ordering = ["-id"]
+
+
 class UserAdmin(BaseUserAdmin):
     ordering = ["id"]
     list_display = ["email", "name"]
@@ -32,7 +79,60 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeIngredientInline(admin.TabularInline):
+    """the ingredients of a recipe with their amounts"""
+
+    model = models.RecipeIngredient
+    autocomplete_fields = ["ingredient"]
+    extra = 0
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ["title", "user", "time_minutes", "price"]
+    # prefix searches, served by the UPPER(title) pattern index
+    search_fields = ["^title"]
+    autocomplete_fields = ["tags"]
+    inlines = [RecipeIngredientInline]
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not models.RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        recipe = form.instance
+        ingredient_ids = recipe.ingredient_amounts.values_list(
+            "ingredient_id", flat=True
+        )
+        before = set(ingredient_ids)
+        super().save_formset(request, form, formset, change)
+        after = set(ingredient_ids.all())
+        # the inline writes the through rows itself, recipe.signals hears of
+        # them like it does of the related manager's adds and removes
+        for action, pk_set in [
+            ("post_remove", before - after),
+            ("post_add", after - before),
+        ]:
+            if pk_set:
+                m2m_changed.send(
+                    sender=models.RecipeIngredient,
+                    instance=recipe,
+                    action=action,
+                    reverse=False,
+                    model=models.Ingredient,
+                    pk_set=pk_set,
+                    using=recipe._state.db,
+                )
+
+
+class TagAdmin(LargeTableAdmin):
+    list_display = ["name", "user"]
+    search_fields = ["^name"]
+
+
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ["name", "user"]
+    search_fields = ["^name"]
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
@@ -0,0 +1,232 @@
+"""
+batched API requests
+
+    POST /api/batch/
+    {"requests": [{"method": "GET", "path": "/api/recipe/tags/"},
+                  {"method": "GET", "path": "/api/user/me/"}],
+     "concurrent": true}
+
+authenticates once and calls the views of the sub-requests directly, they
+skip the middleware and the token lookup, the responses come back in
+request order:
+
+    {"responses": [{"status": 200, "headers": {}, "body": [...]}, ...]}
+
+only the views in settings.BATCH_VIEWS can be reached. sub-requests stand
+on their own, a failing one doesn't undo the others. with `concurrent`,
+runs of consecutive GETs are spread over BATCH_CONCURRENCY threads, any
+other method waits for the reads before it and runs alone.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# connection details a sub-request shares with the batch, never credentials
+INHERITED_META = [
+    "REMOTE_ADDR",
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "HTTP_HOST",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT_LANGUAGE",
+    "HTTP_X_FORWARDED_FOR",
+    "HTTP_X_FORWARDED_PROTO",
+]
+# set by the rendering of the outer response
+DROPPED_HEADERS = {"content-type", "vary"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def batch_views():
+    return tuple(import_string(path) for path in settings.BATCH_VIEWS)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.BATCH_CONCURRENCY, thread_name_prefix="batch"
+            )
+        return _executor
+
+
+class SubRequest(HttpRequest):
+    """a request of a batch, authenticated as the batch's user"""
+
+    def __init__(self, parent, method, path, query="", body=None, headers=None):
+        super().__init__()
+        self.method = method
+        self.path = self.path_info = path
+        self.META = {
+            name: parent.META[name] for name in INHERITED_META if name in parent.META
+        }
+        self.META["QUERY_STRING"] = query
+        self.META["HTTP_ACCEPT"] = "application/json"
+        for name, value in (headers or {}).items():
+            self.META[f"HTTP_{name.upper().replace('-', '_')}"] = value
+        self.GET = QueryDict(query)
+
+        content = b"" if body is None else json.dumps(body).encode()
+        if body is not None:
+            self.META["CONTENT_TYPE"] = "application/json"
+        self.META["CONTENT_LENGTH"] = str(len(content))
+        self._stream = BytesIO(content)
+        self._read_started = False
+
+        self._scheme = parent.scheme
+        # picked up by rest_framework.request.Request instead of authenticating
+        self._force_auth_user = parent.user
+        self._force_auth_token = parent.auth
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+def not_found():
+    return {"status": status.HTTP_404_NOT_FOUND, "headers": {}, "body": None}
+
+
+def dispatch(parent, item):
+    """runs one sub-request, returns {"status", "headers", "body"}"""
+    path, _, query = item["path"].partition("?")
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return not_found()
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None or not issubclass(view_class, batch_views()):
+        return not_found()
+
+    request = SubRequest(
+        parent, item["method"], path, query, item.get("body"), item.get("headers")
+    )
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("batched %s %s failed", item["method"], item["path"])
+        return {
+            "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "headers": {},
+            "body": {"detail": "A server error occurred."},
+        }
+    headers = {
+        name: value
+        for name, value in response.items()
+        if name.lower() not in DROPPED_HEADERS
+    }
+    return {
+        "status": response.status_code,
+        "headers": headers,
+        "body": getattr(response, "data", None),
+    }
+
+
+def dispatch_in_thread(parent, item):
+    # a pool thread keeps its connections between batches like a request
+    # handling thread, with the same CONN_MAX_AGE cleanup around each use
+    close_old_connections()
+    try:
+        return dispatch(parent, item)
+    finally:
+        close_old_connections()
+
+
+def run(parent, items, concurrent=False):
+    """the responses of `items`, in order"""
+    # other connections can't see the writes of an open transaction
+    if not concurrent or connection.in_atomic_block or settings.BATCH_CONCURRENCY < 2:
+        return [dispatch(parent, item) for item in items]
+
+    executor = get_executor()
+    results = [None] * len(items)
+    reads = []
+
+    def wait_for_reads():
+        for i, future in reads:
+            results[i] = future.result()
+        reads.clear()
+
+    for i, item in enumerate(items):
+        if item["method"] == "GET":
+            reads.append((i, executor.submit(dispatch_in_thread, parent, item)))
+            continue
+        wait_for_reads()
+        results[i] = dispatch(parent, item)
+    wait_for_reads()
+    return results
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=["GET", "POST", "PUT", "PATCH", "DELETE"], default="GET"
+    )
+    path = serializers.RegexField(r"^/", help_text="Path and query string")
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_headers(self, value):
+        if any(name.lower() in ("authorization", "cookie") for name in value):
+            raise serializers.ValidationError("the batch's credentials are used")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    concurrent = serializers.BooleanField(
+        default=False, help_text="Run consecutive GET requests concurrently"
+    )
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"at most {settings.BATCH_MAX_REQUESTS} requests per batch"
+            )
+        return value
+
+
+class BatchResponseItemSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    responses = BatchResponseItemSerializer(many=True)
+
+
+class BatchView(APIView):
+    """runs several API requests in one, see core.batch"""
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=BatchSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(
+            {"responses": run(request, data["requests"], data["concurrent"])}
+        )
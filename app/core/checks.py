@@ -0,0 +1,26 @@
+"""
+deployment checks, run by `manage.py check --deploy`
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = [
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+]
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache(app_configs, **kw):
+    """the per user versions and pins need a cache every process sees"""
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "The default cache is kept per process, other workers keep using "
+            "stale name maps, matching indexes, stats and replica pins.",
+            hint="Set REDIS_URL to a redis server all processes share.",
+            id="core.W001",
+        )
+    ]
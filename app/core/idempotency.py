@@ -0,0 +1,150 @@
+"""
+Idempotency-Key support for POST actions
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        ...
+
+a request sending the header runs in one transaction with the insert of
+its core.IdempotencyKey row, unique per (user, key). a successful response
+is stored on the row and commits with the work it did, a retry finds the
+row and gets that response back without running the view again.
+
+a duplicate arriving while the first is still running blocks on the unique
+index until the first commits, then replays its response, or runs itself
+when the first rolled back. failed responses aren't stored, retrying them
+with the same key runs the view again. a key sent again with another
+method, path, query string or body gets a 422.
+
+rows expire after IDEMPOTENCY_KEY_TTL, `manage.py purge_idempotency_keys`
+deletes them.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Idempotency-Key was already used for a different request"
+    default_code = "idempotency_key_reused"
+
+
+def file_digest(value):
+    if not isinstance(value, UploadedFile):
+        return str(value)
+    digest = hashlib.sha256()
+    for chunk in value.chunks():
+        digest.update(chunk)
+    value.seek(0)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def fingerprint(request):
+    """
+    the method and path of `request` and a hash of its query string and
+    parsed body, uploaded files by their content
+    """
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=file_digest)
+    digest = hashlib.sha256(request.META.get("QUERY_STRING", "").encode())
+    digest.update(body.encode())
+    return f"{request.method} {digest.hexdigest()} {request.path}"[:512]
+
+
+def claim(user, key, fingerprint):
+    """
+    inserts the row of `key`, returns (new row, None), or (None, stored row)
+    when the key is in use
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request=fingerprint,
+                status_code=0,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, None
+    except IntegrityError:
+        stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if stored is not None and stored.expires_at > now:
+            return None, stored
+        if stored is not None:
+            # an expired key starts over
+            stored.delete()
+        return claim(user, key, fingerprint)
+
+
+def idempotent(method):
+    """makes a view method replay its response to requests repeating a key"""
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            message = (
+                f"Ensure this header has no more than {MAX_KEY_LENGTH} characters."
+            )
+            raise ValidationError({HEADER: message})
+
+        request_fingerprint = fingerprint(request)
+        with transaction.atomic():
+            record, stored = claim(request.user, key, request_fingerprint)
+            if stored is not None:
+                if stored.request != request_fingerprint:
+                    raise IdempotencyKeyReused()
+                return Response(
+                    stored.response,
+                    status=stored.status_code,
+                    headers={REPLAYED_HEADER: "true"},
+                )
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code >= 400:
+                # nothing to replay, the client fixes the request and retries
+                record.delete()
+            else:
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
+
+
+def purge(before=None, batch_size=1000):
+    """deletes the keys expired by `before`, now by default"""
+    before = before or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lt=before).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,283 @@
+"""
+background jobs
+
+    @job("recipe.resize_image")
+    def resize_image(recipe_id):
+        ...
+
+    enqueue("recipe.resize_image", {"recipe_id": recipe.id})
+
+jobs are core.models.Job rows, enqueued inside a transaction they only
+exist once it commits. workers (`manage.py run_worker`) claim batches
+with SELECT ... FOR UPDATE SKIP LOCKED, so any number of them share a
+queue without handing out a job twice. a claimed job belongs to its
+worker until `locked_until`, which a heartbeat pushes back while the job
+runs. if the worker dies the job is requeued once that visibility timeout
+passes. failures are retried with exponential backoff until the job's
+`max_attempts`.
+
+handlers are found in the `jobs` module of every installed app.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+_discovered = False
+
+
+def job(name):
+    """registers the decorated function as the handler of `name` jobs"""
+
+    def decorator(func):
+        registry[name] = func
+        return func
+
+    return decorator
+
+
+def autodiscover():
+    global _discovered
+    if not _discovered:
+        autodiscover_modules("jobs")
+        _discovered = True
+
+
+def enqueue(name, payload=None, queue="default", run_at=None, max_attempts=None):
+    """adds a job, the handler is called with `payload` as keyword arguments"""
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        queue=queue,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def backoff(attempts):
+    """seconds before retrying a job that failed `attempts` times"""
+    delay = settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return min(delay, settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def claim(worker_id, limit, queues=("default",), visibility_timeout=None):
+    """locks up to `limit` due jobs for `worker_id`, returns their ids"""
+    now = timezone.now()
+    timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, queue__in=queues, run_at__lte=now)
+            .order_by("run_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=timeout),
+            attempts=F("attempts") + 1,
+        )
+    return ids
+
+
+def requeue_expired(queues=("default",)):
+    """
+    hands the jobs of workers that outlived their visibility timeout back to
+    the queue, or fails them when out of attempts. returns the number requeued
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(
+        status=Job.RUNNING, queue__in=queues, locked_until__lt=now
+    )
+    released = {"locked_by": "", "locked_until": None}
+    error = "visibility timeout expired"
+    expired.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, finished_at=now, last_error=error, **released
+    )
+    return expired.update(status=Job.PENDING, last_error=error, **released)
+
+
+def beat(mine, timeout, stopped):
+    """
+    extends the visibility timeout of the running job `mine` every third of
+    it until `stopped` is set
+    """
+    try:
+        while not stopped.wait(timeout / 3):
+            mine.update(locked_until=timezone.now() + timedelta(seconds=timeout))
+    except Exception:
+        # the job is requeued once the timeout passes, it runs again at worst
+        logger.exception("heartbeat of %s failed", mine)
+    finally:
+        connection.close()
+
+
+@contextmanager
+def heartbeat(mine, timeout):
+    """keeps the running job `mine` locked for the duration of the block"""
+    stopped = threading.Event()
+    thread = threading.Thread(target=beat, args=(mine, timeout, stopped))
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job_id, worker_id, visibility_timeout=None):
+    """runs a job claimed by `worker_id`, returns its new status"""
+    autodiscover()
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    # a job taken over after its visibility timeout is no longer ours to update
+    mine = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=worker_id, attempts=job.attempts
+    )
+    released = {"locked_by": "", "locked_until": None}
+    timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+    try:
+        handler = registry.get(job.name)
+        if handler is None:
+            raise LookupError(f"no handler registered for {job.name!r}")
+        with heartbeat(mine, timeout):
+            handler(**job.payload)
+    except Exception:
+        logger.exception("job %s failed", job)
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            mine.update(
+                status=Job.FAILED, finished_at=now, last_error=error, **released
+            )
+            return Job.FAILED
+        mine.update(
+            status=Job.PENDING,
+            run_at=now + timedelta(seconds=backoff(job.attempts)),
+            last_error=error,
+            **released,
+        )
+        return Job.PENDING
+    mine.update(status=Job.DONE, finished_at=timezone.now(), **released)
+    return Job.DONE
+
+
+class Worker:
+    """
+    claims jobs from `queues` and runs up to `concurrency` of them at once in
+    a thread or process pool, every half visibility timeout it requeues the
+    expired jobs of dead workers
+    """
+
+    def __init__(
+        self,
+        queues=("default",),
+        concurrency=4,
+        mode="thread",
+        batch_size=None,
+        poll_interval=1.0,
+        visibility_timeout=None,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown worker mode {mode!r}")
+        self.queues = list(queues)
+        self.concurrency = concurrency
+        self.mode = mode
+        self.batch_size = batch_size or concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def stop(self):
+        """finishes the running jobs and returns from run()"""
+        self.stopping.set()
+
+    def executor(self):
+        if self.mode == "process":
+            # fresh interpreters, forked ones would share the database sockets
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix="job")
+
+    def run(self, burst=False):
+        """runs jobs until stop(), or with `burst` until the queues are empty"""
+        autodiscover()
+        running = set()
+        timeout = self.visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+        next_requeue = 0
+        with self.executor() as executor:
+            while not self.stopping.is_set():
+                if time.monotonic() >= next_requeue:
+                    # the jobs of dead workers, whether this one is busy or not
+                    requeue_expired(self.queues)
+                    next_requeue = time.monotonic() + timeout / 2
+                free = self.concurrency - len(running)
+                wanted = min(free, self.batch_size)
+                ids = []
+                if wanted:
+                    ids = claim(
+                        self.worker_id, wanted, self.queues, self.visibility_timeout
+                    )
+                for job_id in ids:
+                    running.add(
+                        executor.submit(
+                            run_job, job_id, self.worker_id, self.visibility_timeout
+                        )
+                    )
+                if ids and len(ids) == wanted and len(running) < self.concurrency:
+                    # a full batch, more may be waiting
+                    continue
+
+                if not running:
+                    if requeue_expired(self.queues):
+                        continue
+                    if burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                done, running = wait(
+                    running, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                self.collect(done)
+            self.collect(wait(running).done)
+        return self.processed
+
+    def collect(self, futures):
+        for future in futures:
+            self.processed += 1
+            try:
+                future.result()
+            except Exception:
+                # run_job itself failed, the job is requeued when it expires
+                logger.exception("worker %s lost a job", self.worker_id)
@@ -0,0 +1,55 @@
+"""
+json backend shared by the API renderer and parser
+
+settings.JSON_BACKEND picks the library, "orjson" (the default) is used
+when it is installed and the stdlib json module otherwise.
+"""
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JS_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+_encoder = JSONEncoder()
+
+
+def fast_backend():
+    """returns the fast json module in use or None for the stdlib fallback"""
+    if getattr(settings, "JSON_BACKEND", "orjson") == "orjson":
+        return orjson
+    return None
+
+
+def default(obj):
+    """
+    handles what orjson can't serialize natively (Decimal, lazy strings,
+    timedelta, querysets ...) exactly like DRF's JSONEncoder does
+    """
+    return _encoder.default(obj)
+
+
+def dumps(data, indent=False):
+    """serializes `data` to utf-8 bytes, `indent` pretty prints with 2 spaces"""
+    option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    ret = orjson.dumps(data, default=default, option=option)
+
+    # same as rest_framework.renderers.JSONRenderer, keep the output a
+    # strict javascript subset
+    for raw, escaped in JS_SEPARATORS:
+        if raw in ret:
+            ret = ret.replace(raw, escaped)
+    return ret
+
+
+def loads(data):
+    return orjson.loads(data)
@@ -0,0 +1,29 @@
+"""
+views imported on their first request
+
+the schema and docs views pull in drf_spectacular's generator, yaml and
+uritemplate, none of which an API request needs. routing them through
+`lazy_view` keeps those imports out of worker boot.
+"""
+
+import threading
+
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+
+def lazy_view(import_path, **initkwargs):
+    """routes to the class based view at `import_path`, imported when first hit"""
+    view = None
+    lock = threading.Lock()
+
+    @csrf_exempt
+    def view_func(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            with lock:
+                if view is None:
+                    view = import_string(import_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return view_func
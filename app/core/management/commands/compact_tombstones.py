@@ -0,0 +1,31 @@
+"""
+django command to compact the change feed's tombstones
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipe import sync
+
+
+class Command(BaseCommand):
+    """deletes tombstones past their retention, see recipe.sync"""
+
+    help = "Deletes change feed tombstones older than the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SYNC_TOMBSTONE_RETENTION_DAYS,
+            help="Keep the tombstones of the last DAYS days",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *ar, **kw):
+        before = timezone.now() - timedelta(days=kw["days"])
+        deleted = sync.compact(before, kw["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones~!"))
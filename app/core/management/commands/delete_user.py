@@ -0,0 +1,44 @@
+"""
+django command to delete a user and their data in batches
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from user import deletion
+
+
+class Command(BaseCommand):
+    """deletes a user in chunks, see user.deletion"""
+
+    help = "Deletes a user and everything they own in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue the deletion for run_worker instead of running it here",
+        )
+
+    def handle(self, *ar, **kw):
+        try:
+            user = get_user_model().objects.get_by_natural_key(kw["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"no user with email {kw['email']}")
+
+        progress = deletion.start(user, background=kw["background"])
+        if kw["background"]:
+            self.stdout.write(f"Queued deletion {progress.pk}")
+            return
+
+        def report(progress):
+            self.stdout.write(
+                f"{progress.recipes_deleted}/{progress.recipes_total} recipes, "
+                f"{progress.tags_deleted} tags, "
+                f"{progress.ingredients_deleted} ingredients deleted . . ."
+            )
+
+        deletion.run(progress, kw["chunk_size"], report)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {kw['email']}~!"))
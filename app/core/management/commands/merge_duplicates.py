@@ -0,0 +1,62 @@
+"""
+django command to merge a user's duplicate tags or ingredients
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tag, Ingredient
+from recipe import merge
+
+MODELS = {"tags": Tag, "ingredients": Ingredient}
+
+
+class Command(BaseCommand):
+    """merges tags or ingredients into one, see recipe.merge"""
+
+    help = (
+        "Merges SOURCES into TARGET, or with --case every group of names "
+        "that only differ in case into its oldest"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(MODELS))
+        parser.add_argument("email")
+        parser.add_argument("target", type=int, nargs="?")
+        parser.add_argument("sources", type=int, nargs="*")
+        parser.add_argument("--name", help="Rename the target")
+        parser.add_argument(
+            "--case",
+            action="store_true",
+            help="Merge the names that only differ in case or surrounding space",
+        )
+
+    def handle(self, *ar, **kw):
+        model = MODELS[kw["kind"]]
+        try:
+            user = get_user_model().objects.get_by_natural_key(kw["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"no user with email {kw['email']}")
+
+        if kw["case"] and kw["name"]:
+            raise CommandError("--name only goes with a TARGET")
+        if kw["case"]:
+            groups = merge.case_duplicates(model, user)
+        elif kw["target"] is not None and kw["sources"]:
+            groups = [[kw["target"], *kw["sources"]]]
+        else:
+            raise CommandError("give a TARGET and SOURCES, or --case")
+
+        merged = recipes = 0
+        for target_id, *source_ids in groups:
+            try:
+                target = model.objects.get(user=user, pk=target_id)
+            except model.DoesNotExist:
+                raise CommandError(f"no {kw['kind']} with id {target_id}")
+            counts = merge.merge(target, source_ids, kw["name"])
+            merged += counts[0]
+            recipes += counts[1]
+            self.stdout.write(f"{target.name}: merged {counts[0]} . . .")
+        self.stdout.write(
+            self.style.SUCCESS(f"Merged {merged} {kw['kind']} over {recipes} recipes~!")
+        )
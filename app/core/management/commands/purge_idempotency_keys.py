@@ -0,0 +1,20 @@
+"""
+django command to delete expired idempotency keys
+"""
+
+from django.core.management.base import BaseCommand
+
+from core import idempotency
+
+
+class Command(BaseCommand):
+    """deletes idempotency keys past IDEMPOTENCY_KEY_TTL, see core.idempotency"""
+
+    help = "Deletes the stored responses of expired idempotency keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *ar, **kw):
+        deleted = idempotency.purge(batch_size=kw["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} keys~!"))
@@ -0,0 +1,57 @@
+"""
+django command to relay the outbox's change events
+"""
+
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    """delivers outbox events to a sink until stopped, see core.outbox"""
+
+    help = "Delivers the outbox's change events to a sink in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sink",
+            default=settings.OUTBOX_SINK,
+            help="file:// or http(s):// url to deliver to (default: OUTBOX_SINK)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the outbox is empty",
+        )
+
+    def handle(self, *ar, **kw):
+        try:
+            sink = outbox.get_sink(kw["sink"])
+        except ValueError as error:
+            raise CommandError(str(error))
+        relay = outbox.Relay(
+            sink, batch_size=kw["batch_size"], poll_interval=kw["poll_interval"]
+        )
+
+        def stop(signum, frame):
+            # a second signal kills the relay right away
+            signal.signal(signum, signal.SIG_DFL)
+            relay.stop()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+
+        self.stdout.write(f"Relaying events to {kw['sink']} . . .")
+        delivered = relay.run(burst=kw["burst"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Delivered {delivered} events, compacted {relay.compacted}~!"
+            )
+        )
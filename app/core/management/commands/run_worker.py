@@ -0,0 +1,69 @@
+"""
+django command to run background jobs
+"""
+
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    """claims and runs jobs until stopped"""
+
+    help = "Runs background jobs from the given queues"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queue",
+            action="append",
+            dest="queues",
+            help="Queue to take jobs from, may be repeated (default: default)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY
+        )
+        parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Jobs claimed per query (default: concurrency)",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            help="Seconds before a claimed job is handed to another worker",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queues are empty",
+        )
+
+    def handle(self, *ar, **kw):
+        worker = Worker(
+            queues=kw["queues"] or ["default"],
+            concurrency=kw["concurrency"],
+            mode=kw["mode"],
+            batch_size=kw["batch_size"],
+            poll_interval=kw["poll_interval"],
+            visibility_timeout=kw["visibility_timeout"],
+        )
+
+        def stop(signum, frame):
+            # a second signal kills the worker right away
+            signal.signal(signum, signal.SIG_DFL)
+            worker.stop()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+
+        self.stdout.write(
+            f"Worker {worker.worker_id} running {worker.concurrency} jobs at once "
+            f"({worker.mode} pool) from {', '.join(worker.queues)} . . ."
+        )
+        processed = worker.run(burst=kw["burst"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs~!"))
@@ -0,0 +1,240 @@
+import gzip
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+DEFAULT_EXCLUDED_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+)
+
+
+def parse_accept_encoding(header):
+    """returns {coding: q} for an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, content):
+        return gzip.compress(content, compresslevel=self.level, mtime=0)
+
+    def compress_sequence(self, sequence):
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in sequence:
+            data = compressor.compress(chunk)
+            # sync flush so every chunk (e.g. an ndjson line) reaches the
+            # client without waiting for the deflate window to fill
+            yield data + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, content):
+        return brotli.compress(content, quality=self.quality)
+
+    def compress_sequence(self, sequence):
+        compressor = brotli.Compressor(quality=self.quality)
+        for chunk in sequence:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    brotli/gzip response compression, a configurable take on django's
+    GZipMiddleware.
+
+    settings:
+        COMPRESSION_MIN_SIZE: responses shorter than this are sent as is
+        COMPRESSION_GZIP_LEVEL: 1-9
+        COMPRESSION_BROTLI_QUALITY: 0-11, brotli is used when installed
+        COMPRESSION_EXCLUDED_CONTENT_TYPES: content type prefixes that are
+            already compressed (images and archives)
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.excluded_content_types = tuple(
+            getattr(
+                settings,
+                "COMPRESSION_EXCLUDED_CONTENT_TYPES",
+                DEFAULT_EXCLUDED_CONTENT_TYPES,
+            )
+        )
+        self.compressors = []
+        if brotli is not None:
+            quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4)
+            self.compressors.append(BrotliCompressor(quality))
+        level = getattr(settings, "COMPRESSION_GZIP_LEVEL", 6)
+        self.compressors.append(GzipCompressor(level))
+
+    def get_compressor(self, request):
+        """picks the first supported coding the client accepts"""
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        for compressor in self.compressors:
+            if accepted.get(compressor.encoding, accepted.get("*", 0)) > 0:
+                return compressor
+        return None
+
+    def is_compressible(self, response):
+        if response.has_header("Content-Encoding"):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type.lower().startswith(self.excluded_content_types):
+            return False
+        if response.streaming:
+            length = response.get("Content-Length")
+            return length is None or int(length) >= self.min_size
+        return len(response.content) >= self.min_size
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressor = self.get_compressor(request)
+        if compressor is None:
+            return response
+
+        if response.streaming:
+            # the compressed size is unknown until the stream is consumed
+            response.streaming_content = compressor.compress_sequence(
+                response.streaming_content
+            )
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = compressor.compress(response.content)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # the body changed so a strong ETag becomes weak (RFC 7232 2.1),
+        # conditional requests still match against it
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = compressor.encoding
+        return response
+
+
+class MiddlewareChain:
+    """
+    a middleware list wrapped around `get_response` the way django's
+    handler builds MIDDLEWARE, with its view, template response and
+    exception hooks collected in the same order
+    """
+
+    def __init__(self, paths, get_response):
+        handler = get_response
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+        for path in reversed(paths):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, "process_view"):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, "process_template_response"):
+                self.template_response_hooks.append(
+                    middleware.process_template_response
+                )
+            if hasattr(middleware, "process_exception"):
+                self.exception_hooks.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.handler = handler
+
+
+class RoutedMiddleware:
+    """
+    runs the middleware listed for the longest prefix of the request path
+    in settings.MIDDLEWARE_ROUTES, so token authenticated API routes skip
+    the session, CSRF and messages machinery the admin needs.
+
+    it stands in its routes' place in MIDDLEWARE and forwards django's
+    process_view, process_template_response and process_exception calls
+    to the chain of the request's route.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.routes = [
+            (prefix, MiddlewareChain(paths, get_response))
+            for prefix, paths in sorted(
+                settings.MIDDLEWARE_ROUTES.items(),
+                key=lambda route: len(route[0]),
+                reverse=True,
+            )
+        ]
+
+    def get_chain(self, request):
+        for prefix, chain in self.routes:
+            if request.path_info.startswith(prefix):
+                return chain
+        raise LookupError(f"no MIDDLEWARE_ROUTES entry for {request.path_info}")
+
+    def __call__(self, request):
+        return self.get_chain(request).handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in self.get_chain(request).view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for hook in self.get_chain(request).template_response_hooks:
+            response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for hook in self.get_chain(request).exception_hooks:
+            response = hook(request, exception)
+            if response:
+                return response
+        return None
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# admin prefix searches run UPPER(column::text) LIKE UPPER('term%'), only an
+# expression index with text_pattern_ops serves that LIKE
+INDEXES = [
+    ("core_recipe", "title", "recipe_title_search_idx"),
+    ("core_tag", "name", "tag_name_search_idx"),
+    ("core_ingredient", "name", "ingredient_name_search_idx"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column, name in INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} (UPPER({column}::text) text_pattern_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, _, name in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("core", "0009_accountdeletion"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
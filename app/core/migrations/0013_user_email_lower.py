@@ -0,0 +1,91 @@
+from django.db import migrations, models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+CONSTRAINT = models.UniqueConstraint(Lower("email"), name="user_email_lower_uniq")
+
+
+def dedupe_emails(apps, schema_editor):
+    """
+    of the users whose emails only differ in case the one that logged in last
+    keeps the address, the others are deactivated under a placeholder
+    address, their data stays for an admin to merge
+    """
+    User = apps.get_model("core", "User")
+    users = User.objects.annotate(email_lower=Lower("email"))
+    duplicated = list(
+        users.values("email_lower")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("email_lower", flat=True)
+    )
+    for start in range(0, len(duplicated), BATCH_SIZE):
+        with transaction.atomic():
+            seen = set()
+            for user in users.filter(
+                email_lower__in=duplicated[start : start + BATCH_SIZE]
+            ).order_by("email_lower", F("last_login").desc(nulls_last=True), "id"):
+                if user.email_lower not in seen:
+                    seen.add(user.email_lower)
+                    continue
+                User.objects.filter(pk=user.pk).update(
+                    email=f"duplicate-{user.pk}-{user.email_lower}"[:255],
+                    is_active=False,
+                )
+
+
+def lowercase_emails(apps, schema_editor):
+    User = apps.get_model("core", "User")
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                User.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:BATCH_SIZE]
+            )
+            if not ids:
+                return
+            User.objects.filter(id__in=ids).exclude(email=Lower("email")).update(
+                email=Lower("email")
+            )
+            last_id = ids[-1]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS user_email_lower_uniq "
+            "ON core_user (LOWER(email))"
+        )
+    else:
+        schema_editor.add_constraint(apps.get_model("core", "User"), CONSTRAINT)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS user_email_lower_uniq")
+    else:
+        schema_editor.remove_constraint(apps.get_model("core", "User"), CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+    # batches commit one by one, CREATE INDEX CONCURRENTLY can't run in a
+    # transaction
+    atomic = False
+
+    dependencies = [
+        ("core", "0012_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_emails, migrations.RunPython.noop),
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_index, drop_index)],
+            state_operations=[
+                migrations.AddConstraint(model_name="user", constraint=CONSTRAINT)
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.0.10 on 2026-10-19 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_user_email_lower"),
+    ]
+
+    operations = [
+        # takes over the auto created through table of Recipe.ingredients
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="RecipeIngredient",
+                    fields=[
+                        ("id", models.AutoField(primary_key=True, serialize=False)),
+                        (
+                            "recipe",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="ingredient_amounts",
+                                to="core.recipe",
+                            ),
+                        ),
+                        (
+                            "ingredient",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="core.ingredient",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "core_recipe_ingredients",
+                        "unique_together": {("recipe", "ingredient")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="recipe",
+                    name="ingredients",
+                    field=models.ManyToManyField(
+                        through="core.RecipeIngredient", to="core.ingredient"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="recipeingredient",
+            name="quantity",
+            field=models.DecimalField(
+                blank=True, decimal_places=3, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipeingredient",
+            name="unit",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "No unit"),
+                    ("g", "Grams"),
+                    ("kg", "Kilograms"),
+                    ("oz", "Ounces"),
+                    ("lb", "Pounds"),
+                    ("ml", "Millilitres"),
+                    ("l", "Litres"),
+                    ("tsp", "Teaspoons"),
+                    ("tbsp", "Tablespoons"),
+                    ("cup", "Cups"),
+                ],
+                default="",
+                max_length=8,
+            ),
+        ),
+    ]
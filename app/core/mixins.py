@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from core.routers import replicas_configured, set_replicas_enabled
+
+PIN_COOKIE = "primary_pin"
+
+
+def pin_cache_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+class ReplicaReadMixin:
+    """
+    sends the ORM reads of safe method requests to the read replicas.
+
+    a successful write pins the client to the primary for
+    REPLICA_PIN_SECONDS, by cookie and by user through the default cache,
+    so it reads its own writes while the replicas catch up. authentication
+    runs before the switch and stays on the primary.
+    """
+
+    def is_pinned_to_primary(self, request):
+        if request.COOKIES.get(PIN_COOKIE):
+            return True
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return bool(cache.get(pin_cache_key(user.pk)))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replicas_configured() and request.method in SAFE_METHODS:
+            set_replicas_enabled(not self.is_pinned_to_primary(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        set_replicas_enabled(False)
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            replicas_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax"
+            )
+            user = request.user
+            if user and user.is_authenticated:
+                cache.set(pin_cache_key(user.pk), 1, seconds)
+        return response
@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -17,6 +20,17 @@ def recipe_image_file_path(instance, filename):
 
 
 class UserManager(BaseUserManager):
+    @classmethod
+    def normalize_email(cls, email):
+        """lowercases the whole address, emails are case insensitive here"""
+        return super().normalize_email(email).lower()
+
+    def get_by_natural_key(self, username):
+        # matches the expression of the user_email_lower_uniq index
+        return self.alias(email_lower=Lower("email")).get(
+            email_lower=self.normalize_email(username)
+        )
+
     def create_user(self, email, password=None, **kw):
         """Creates and saves a new User"""
         if not email:
@@ -45,6 +59,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
     USERNAME_FIELD = "email"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower("email"), name="user_email_lower_uniq")
+        ]
+
+    def clean(self):
+        super().clean()
+        self.email = UserManager.normalize_email(self.email)
+
 
 class Recipe(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -54,8 +77,23 @@ class Recipe(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
-    ingredients = models.ManyToManyField("Ingredient")
+    ingredients = models.ManyToManyField("Ingredient", through="RecipeIngredient")
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # position in the user's change sequence, see recipe.sync
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # range filters and keyset pagination on the user's recipes,
+            # id breaks ties in the sort key
+            models.Index(
+                fields=["user", "time_minutes", "id"], name="recipe_user_time_idx"
+            ),
+            models.Index(fields=["user", "price", "id"], name="recipe_user_price_idx"),
+            models.Index(
+                fields=["user", "sync_seq", "id"], name="recipe_user_sync_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -66,6 +104,12 @@ class Tag(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "sync_seq", "id"], name="tag_user_sync_idx")
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -74,6 +118,240 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "sync_seq", "id"], name="ingredient_user_sync_idx"
+            )
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+
+class RecipeIngredient(models.Model):
+    """an ingredient of a recipe and how much of it the recipe takes"""
+
+    UNIT_CHOICES = [
+        ("", "No unit"),
+        ("g", "Grams"),
+        ("kg", "Kilograms"),
+        ("oz", "Ounces"),
+        ("lb", "Pounds"),
+        ("ml", "Millilitres"),
+        ("l", "Litres"),
+        ("tsp", "Teaspoons"),
+        ("tbsp", "Tablespoons"),
+        ("cup", "Cups"),
+    ]
+
+    # the table used to be the auto created one of Recipe.ingredients
+    id = models.AutoField(primary_key=True)
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="ingredient_amounts"
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    # no quantity means to taste
+    quantity = models.DecimalField(
+        max_digits=10, decimal_places=3, null=True, blank=True
+    )
+    unit = models.CharField(
+        max_length=8, choices=UNIT_CHOICES, blank=True, default=""
+    )
+
+    class Meta:
+        db_table = "core_recipe_ingredients"
+        unique_together = [("recipe", "ingredient")]
+
+    def __str__(self):
+        return f"{self.quantity or ''}{self.unit} {self.ingredient_id}".strip()
+
+
+class Job(models.Model):
+    """a unit of background work, run by `manage.py run_worker`, see core.jobs"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    queue = models.CharField(max_length=64, default="default")
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # workers only ever scan the claimable jobs, finished ones stay
+            # out of the index however many pile up
+            models.Index(
+                fields=["queue", "run_at", "id"],
+                name="job_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(
+                fields=["queue", "locked_until"],
+                name="job_running_idx",
+                condition=models.Q(status="running"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class AccountDeletion(models.Model):
+    """progress of a user's batched deletion, see user.deletion"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # kept once the user is gone
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    recipes_total = models.PositiveIntegerField(default=0)
+    recipes_deleted = models.PositiveIntegerField(default=0)
+    tags_deleted = models.PositiveIntegerField(default=0)
+    ingredients_deleted = models.PositiveIntegerField(default=0)
+    images_queued = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"deletion {self.id} ({self.status})"
+
+
+class SyncState(models.Model):
+    """a user's change sequence, see recipe.sync"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, on_delete=models.CASCADE
+    )
+    seq = models.BigIntegerField(default=0)
+    # tombstones up to this seq have been compacted away
+    horizon = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"sync state of user {self.user_id} at {self.seq}"
+
+
+class Tombstone(models.Model):
+    """a deleted recipe, tag or ingredient, kept for the change feed"""
+
+    RECIPE = "recipe"
+    TAG = "tag"
+    INGREDIENT = "ingredient"
+    KIND_CHOICES = [(RECIPE, "Recipe"), (TAG, "Tag"), (INGREDIENT, "Ingredient")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    sync_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "sync_seq", "id"], name="tombstone_user_sync_idx"
+            ),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.sync_seq}"
+
+
+class OutboxEvent(models.Model):
+    """
+    a change for downstream consumers, written in the transaction of the
+    change and relayed by `manage.py relay_events`, see core.outbox
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    RELATIONS = "relations"
+    ACTION_CHOICES = [
+        (CREATED, "Created"),
+        (UPDATED, "Updated"),
+        (DELETED, "Deleted"),
+        (RELATIONS, "Relations changed"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # no foreign key, the events of a deleted account still go out
+    user_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the relay only ever scans the undelivered events
+            models.Index(
+                fields=["id"],
+                name="outbox_pending_idx",
+                condition=models.Q(delivered_at=None),
+            ),
+            models.Index(
+                fields=["user_id", "id"],
+                name="outbox_pending_user_idx",
+                condition=models.Q(delivered_at=None),
+            ),
+            models.Index(
+                fields=["delivered_at"],
+                name="outbox_delivered_idx",
+                condition=models.Q(delivered_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} {self.action}"
+
+
+class IdempotencyKey(models.Model):
+    """the stored response of a request sent with an Idempotency-Key"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # method and path, a key is only replayed for the request it was made for
+    request = models.CharField(max_length=512)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotency_key_user_key_uniq"
+            )
+        ]
+        indexes = [models.Index(fields=["expires_at"], name="idempotency_expires_idx")]
+
+    def __str__(self):
+        return f"{self.key} -> {self.status_code}"
@@ -0,0 +1,258 @@
+"""
+transactional outbox, the change events of recipes, tags and ingredients
+
+    append([describe(recipe, OutboxEvent.UPDATED)])
+
+writes append core.models.OutboxEvent rows in their own transaction (see
+recipe.signals), so an event exists exactly when its change committed.
+`manage.py relay_events` then hands them to a sink in batches instead of
+consumers polling the recipe endpoints for what changed:
+
+    the oldest undelivered events are claimed with SELECT ... FOR UPDATE
+    SKIP LOCKED, any number of relays share the outbox
+    the sink gets them in id order, then they are marked delivered in the
+    same transaction
+
+a relay that dies or a sink that fails rolls the batch back and it is
+delivered again, consumers see every event at least once and dedupe by
+its id. a user's writes take their change sequence lock (recipe.sync)
+before appending, so their events' ids increase in commit order, and a
+relay stops at a user's events another relay holds earlier ones of. events
+of different users are not ordered. delivered events are compacted away
+after OUTBOX_RETENTION_HOURS.
+
+sinks are picked by the url scheme of OUTBOX_SINK, more are added with
+
+    @sink("kafka")
+    class KafkaSink:
+        def __init__(self, url): ...
+        def deliver(self, messages): ...
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from datetime import timedelta
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+SINKS = {}
+# seconds between compactions of a running relay
+COMPACT_INTERVAL = 60
+
+
+def sink(*schemes):
+    """registers the decorated class as the sink of `schemes` urls"""
+
+    def decorator(cls):
+        for scheme in schemes:
+            SINKS[scheme] = cls
+        return cls
+
+    return decorator
+
+
+def get_sink(url=None):
+    url = url or settings.OUTBOX_SINK
+    scheme = urlparse(url).scheme
+    if scheme not in SINKS:
+        raise ValueError(f"no outbox sink for {url!r}")
+    return SINKS[scheme](url)
+
+
+def encode(messages):
+    return [json.dumps(message, cls=DjangoJSONEncoder) for message in messages]
+
+
+@sink("file")
+class FileSink:
+    """appends the events to a file as json lines, synced to disk"""
+
+    def __init__(self, url):
+        self.path = urlparse(url).path
+
+    def deliver(self, messages):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as file:
+            file.writelines(line + "\n" for line in encode(messages))
+            file.flush()
+            os.fsync(file.fileno())
+
+
+@sink("http", "https")
+class HTTPSink:
+    """POSTs the events as {"events": [...]}, anything but a 2xx fails"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, messages):
+        body = '{"events": [%s]}' % ", ".join(encode(messages))
+        request = urllib.request.Request(
+            self.url,
+            data=body.encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        # urlopen raises on 4xx and 5xx
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def snapshot(instance):
+    """the concrete field values of `instance`, ready for json"""
+    return {
+        field.attname: field.get_prep_value(field.value_from_object(instance))
+        for field in instance._meta.concrete_fields
+        if field.attname not in ("id", "user_id", "sync_seq")
+    }
+
+
+def describe(instance, action, payload=None):
+    """the unsaved event of `action` on a user's object"""
+    if payload is None:
+        payload = {} if action == OutboxEvent.DELETED else snapshot(instance)
+    return OutboxEvent(
+        user_id=instance.user_id,
+        kind=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        payload=payload,
+    )
+
+
+def append(events):
+    """adds `events` to the outbox, in the caller's transaction"""
+    return OutboxEvent.objects.bulk_create(events)
+
+
+def message(event):
+    return {
+        "id": event.id,
+        "user_id": event.user_id,
+        "kind": event.kind,
+        "object_id": event.object_id,
+        "action": event.action,
+        "payload": event.payload,
+        "created_at": event.created_at,
+    }
+
+
+def pending():
+    return OutboxEvent.objects.filter(delivered_at=None)
+
+
+def in_order(events):
+    """
+    the claimed `events` that can go out now, a user's events stop before
+    the first earlier one another relay holds
+    """
+    held = (
+        pending()
+        .filter(user_id__in={event.user_id for event in events})
+        .filter(id__lt=events[-1].id)
+        .exclude(id__in=[event.id for event in events])
+        .values("user_id")
+        .annotate(first=Min("id"))
+        .values_list("user_id", "first")
+    )
+    first_held = dict(held)
+    return [
+        event
+        for event in events
+        if event.user_id not in first_held or event.id < first_held[event.user_id]
+    ]
+
+
+def relay(sink, batch_size=None):
+    """delivers the next batch of events to `sink`, returns how many"""
+    limit = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        events = list(
+            pending().select_for_update(skip_locked=True).order_by("id")[:limit]
+        )
+        if not events:
+            return 0
+        events = in_order(events)
+        if events:
+            sink.deliver([message(event) for event in events])
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                delivered_at=timezone.now()
+            )
+    return len(events)
+
+
+def compact(before=None, batch_size=1000):
+    """
+    deletes the events delivered before `before`, by default the retention
+    period. returns the number deleted
+    """
+    if before is None:
+        before = timezone.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects.filter(delivered_at__lt=before)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+
+class Relay:
+    """relays batches of events to `sink` and compacts the delivered ones"""
+
+    def __init__(self, sink, batch_size=None, poll_interval=1.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.delivered = 0
+        self.compacted = 0
+        self.compacted_at = None
+
+    def stop(self):
+        """finishes the current batch and returns from run()"""
+        self.stopping.set()
+
+    def compact(self):
+        now = time.monotonic()
+        if self.compacted_at is None or now - self.compacted_at >= COMPACT_INTERVAL:
+            self.compacted += compact()
+            self.compacted_at = now
+
+    def run(self, burst=False):
+        """relays until stop(), or with `burst` until the outbox is empty"""
+        while not self.stopping.is_set():
+            try:
+                delivered = relay(self.sink, self.batch_size)
+            except Exception:
+                # the batch rolled back, it goes out again next time
+                logger.exception("relaying events failed")
+                if burst:
+                    raise
+                self.stopping.wait(self.poll_interval)
+                continue
+            self.delivered += delivered
+            if delivered:
+                continue
+            self.compact()
+            if burst:
+                break
+            self.stopping.wait(self.poll_interval)
+        return self.delivered
@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core import jsonlib
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by core.jsonlib, same fallbacks as FastJSONRenderer"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if jsonlib.fast_backend() is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                data = data.decode(encoding)
+            return jsonlib.loads(data)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+
+from core import jsonlib
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by core.jsonlib, falls back to the stdlib encoder
+    when no fast backend is installed or the output options can't be
+    matched (indent other than 2, ascii only or non compact output, non
+    strict floats)
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            jsonlib.fast_backend() is None
+            or indent not in (None, 2)
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return jsonlib.dumps(data, indent=indent is not None)
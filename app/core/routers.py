@@ -0,0 +1,61 @@
+"""
+read replica routing
+
+reads go to one of settings.REPLICA_DATABASES only while a view has
+opted in (see core.mixins.ReplicaReadMixin or `use_replicas()`),
+everything else, writes, auth lookups and reads inside a transaction,
+stays on the primary "default" database.
+"""
+
+import random
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = Local()
+
+
+def replicas_enabled():
+    return getattr(_state, "use_replicas", False)
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """routes reads in the block to the replicas when `enabled`"""
+    previous = replicas_enabled()
+    _state.use_replicas = enabled
+    try:
+        yield
+    finally:
+        _state.use_replicas = previous
+
+
+def set_replicas_enabled(enabled):
+    _state.use_replicas = enabled
+
+
+def replicas_configured():
+    return bool(getattr(settings, "REPLICA_DATABASES", []))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "REPLICA_DATABASES", [])
+        if not replicas or not replicas_enabled():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # reads inside a transaction must see its writes
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,29 @@
+"""test runner for `manage.py test`, set as settings.TEST_RUNNER"""
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    hashes passwords with MD5 while testing, the real hasher's work factor
+    is most of the time spent creating test users. each process gets its own
+    cache, the --parallel workers would otherwise share REDIS_URL's keys for
+    the same user ids and clear each other's entries
+    """
+
+    fast_password_hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    test_caches = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+    def setup_test_environment(self, **kw):
+        super().setup_test_environment(**kw)
+        self._overrides = override_settings(
+            PASSWORD_HASHERS=self.fast_password_hashers, CACHES=self.test_caches
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kw):
+        self._overrides.disable()
+        super().teardown_test_environment(**kw)
@@ -0,0 +1,80 @@
+"""
+test data factories
+
+meant for setUpTestData, rows created there are shared by every test of the
+class and rolled back once at the end. the bulk helpers skip save() and
+signals, tests of signal driven behaviour create their rows normally.
+"""
+
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from core.models import Recipe, Tag, Ingredient
+
+PASSWORD = "password123"
+RECIPE_DEFAULTS = {
+    "title": "sample title",
+    "time_minutes": 22,
+    "price": Decimal("5.25"),
+    "description": "sample description",
+    "link": "http://sample.com/what.pdf",
+}
+
+_emails = itertools.count(1)
+
+
+def unique_email():
+    return f"user{next(_emails)}@example.com"
+
+
+def create_user(email=None, password=PASSWORD, **params):
+    return get_user_model().objects.create_user(
+        email or unique_email(), password, **params
+    )
+
+
+def create_users(count, password=PASSWORD):
+    """bulk creates `count` users sharing one password hash"""
+    hashed = make_password(password)
+    return get_user_model().objects.bulk_create(
+        get_user_model()(email=unique_email(), password=hashed) for _ in range(count)
+    )
+
+
+def create_tags(user, names):
+    return Tag.objects.bulk_create(Tag(user=user, name=name) for name in names)
+
+
+def create_ingredients(user, names):
+    return Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=name) for name in names
+    )
+
+
+def create_recipe(user, **params):
+    return Recipe.objects.create(user=user, **{**RECIPE_DEFAULTS, **params})
+
+
+def create_recipes(user, count, tags=(), ingredients=(), **params):
+    """
+    bulk creates `count` recipes titled "recipe <n>", each linked to all of
+    `tags` and `ingredients`
+    """
+    recipes = Recipe.objects.bulk_create(
+        Recipe(user=user, **{**RECIPE_DEFAULTS, "title": f"recipe {i}", **params})
+        for i in range(count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes
+        for tag in tags
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredient.id)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    return recipes
@@ -1,19 +1,37 @@
-from django.test import TestCase, Client
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
+from core.admin import EstimatedCountPaginator
+from core.models import OutboxEvent, Recipe
+from core.tests.factories import (
+    create_user,
+    create_recipes,
+    create_tags,
+    create_ingredients,
+)
+from recipe import matching
+
 
 class AdminSiteTests(TestCase):
-    def setUp(self):
-        self.client = Client()
-        self.admin_user = get_user_model().objects.create_superuser(
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = get_user_model().objects.create_superuser(
             email="admin@example.com", password="Pa$$w0rd!",
         )
-        self.client.force_login(self.admin_user)
-        self.user = get_user_model().objects.create_user(
+        cls.user = get_user_model().objects.create_user(
             email="user@example.com", password="Pa$$w0rd!", name="Test User"
         )
 
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
     def test_users_list(self):
         "test users are listed on page"
         url = reverse("admin:core_user_changelist")
@@ -33,3 +51,124 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class RecipeAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="Pa$$w0rd!"
+        )
+        cls.user = create_user("user@example.com")
+        (cls.tag,) = create_tags(cls.user, ["Breakfast"])
+        for title in ["Pancakes", "Porridge", "Steak"]:
+            create_recipes(cls.user, 1, tags=[cls.tag], title=title)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+    def test_changelist_loads_users_in_one_query(self):
+        url = reverse("admin:core_recipe_changelist")
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        self.assertContains(res, "Porridge")
+        self.assertContains(res, self.user.email)
+        user_queries = [q for q in queries if 'FROM "core_user"' in q["sql"]]
+        # only the session's user, the recipes come joined with theirs
+        self.assertEqual(len(user_queries), 1)
+
+    def test_prefix_search(self):
+        url = reverse("admin:core_recipe_changelist")
+
+        res = self.client.get(url, {"q": "p"})
+
+        self.assertContains(res, "Pancakes")
+        self.assertNotContains(res, "Steak")
+
+    def test_tag_autocomplete(self):
+        url = reverse("admin:autocomplete")
+        params = {
+            "term": "break",
+            "app_label": "core",
+            "model_name": "recipe",
+            "field_name": "tags",
+        }
+
+        res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["results"][0]["text"], "Breakfast")
+
+    def test_ingredient_autocomplete(self):
+        create_ingredients(self.user, ["Flour"])
+        url = reverse("admin:autocomplete")
+        params = {
+            "term": "fl",
+            "app_label": "core",
+            "model_name": "recipeingredient",
+            "field_name": "ingredient",
+        }
+
+        res = self.client.get(url, params)
+
+        self.assertEqual(res.json()["results"][0]["text"], "Flour")
+
+    def test_ingredients_edited_inline(self):
+        matching.ingredients.clear()
+        self.addCleanup(matching.ingredients.clear)
+        recipe = Recipe.objects.get(title="Pancakes")
+        # the change form keeps the stored image
+        Recipe.objects.filter(pk=recipe.pk).update(image="uploads/recipe/p.jpg")
+        (flour,) = create_ingredients(self.user, ["Flour"])
+        matching.ingredients.get(self.user.pk)
+        url = reverse("admin:core_recipe_change", args=[recipe.pk])
+        self.assertContains(self.client.get(url), "ingredient_amounts-__prefix__-ingredient")
+        prefix = "ingredient_amounts"
+        data = {
+            "user": self.user.pk,
+            "title": "Pancakes",
+            "description": "",
+            "time_minutes": 10,
+            "price": "5.00",
+            "link": "",
+            "tags": [self.tag.pk],
+            f"{prefix}-TOTAL_FORMS": 1,
+            f"{prefix}-INITIAL_FORMS": 0,
+            f"{prefix}-0-recipe": recipe.pk,
+            f"{prefix}-0-ingredient": flour.pk,
+            f"{prefix}-0-quantity": "200",
+            f"{prefix}-0-unit": "g",
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(url, data)
+
+        self.assertEqual(res.status_code, 302)
+        amount = recipe.ingredient_amounts.get()
+        self.assertEqual(
+            (amount.ingredient, amount.quantity, amount.unit),
+            (flour, Decimal("200"), "g"),
+        )
+        self.assertTrue(
+            OutboxEvent.objects.filter(
+                object_id=recipe.pk,
+                payload={"field": "ingredients", "added": [flour.pk]},
+            ).exists()
+        )
+        index = matching.ingredients.get(self.user.pk)
+        self.assertEqual(index.match([flour.pk]), [(recipe.pk, 1, 1)])
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1000)
+    def test_estimated_count(self):
+        queryset = Recipe.objects.order_by("id")
+
+        with patch("core.admin.estimated_count", return_value=5000000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 5000000)
+            # filtered and small tables are counted exactly
+            filtered = queryset.filter(title="Steak")
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 1)
+        with patch("core.admin.estimated_count", return_value=10):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 3)
@@ -0,0 +1,174 @@
+"""tests for the batch request endpoint"""
+
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import batch
+from core.models import Recipe
+from core.tests.factories import (
+    create_user,
+    create_tags,
+    create_ingredients,
+    create_recipe,
+)
+
+BATCH_URL = reverse("batch")
+SCREEN = [
+    {"path": "/api/recipe/recipes/"},
+    {"path": "/api/recipe/tags/"},
+    {"path": "/api/recipe/ingredients/"},
+    {"path": "/api/user/me/"},
+]
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(name="cook")
+        cls.token = Token.objects.create(user=cls.user)
+        create_tags(cls.user, ["vegan", "quick"])
+        create_ingredients(cls.user, ["salt"])
+        create_recipe(cls.user, title="soup")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def batch(self, requests, **params):
+        res = self.client.post(
+            BATCH_URL, {"requests": requests, **params}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.json()["responses"]
+
+    def test_auth_required(self):
+        res = APIClient().post(BATCH_URL, {"requests": SCREEN}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_responses_match_separate_requests(self):
+        responses = self.batch(SCREEN)
+
+        self.assertEqual([r["status"] for r in responses], [200] * 4)
+        for item, response in zip(SCREEN, responses):
+            self.assertEqual(response["body"], self.client.get(item["path"]).json())
+        self.assertEqual(responses[3]["body"]["name"], "cook")
+
+    def test_authenticates_once(self):
+        with mock.patch.object(
+            TokenAuthentication,
+            "authenticate_credentials",
+            autospec=True,
+            side_effect=TokenAuthentication.authenticate_credentials,
+        ) as authenticate:
+            self.batch(SCREEN)
+
+        self.assertEqual(authenticate.call_count, 1)
+
+    def test_writes_run_in_order(self):
+        responses = self.batch(
+            [
+                {
+                    "method": "POST",
+                    "path": "/api/recipe/recipes/",
+                    "body": {"time_minutes": "soon"},
+                },
+                {
+                    "method": "POST",
+                    "path": "/api/recipe/recipes/",
+                    "body": {"title": "stew", "time_minutes": 5, "price": "1.00"},
+                },
+                {"path": "/api/recipe/recipes/?ordering=-id"},
+            ],
+            concurrent=True,
+        )
+
+        self.assertEqual(responses[0]["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_minutes", responses[0]["body"])
+        self.assertEqual(responses[1]["status"], status.HTTP_201_CREATED)
+        self.assertEqual(responses[2]["body"][0]["title"], "stew")
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_query_string_and_headers(self):
+        responses = self.batch(
+            [
+                {
+                    "method": "POST",
+                    "path": "/api/recipe/recipes/",
+                    "body": {"title": "pie"},
+                    "headers": {"Idempotency-Key": "k"},
+                },
+                {
+                    "method": "POST",
+                    "path": "/api/recipe/recipes/",
+                    "body": {"title": "pie"},
+                    "headers": {"Idempotency-Key": "k"},
+                },
+                {"path": "/api/recipe/tags/?assigned_only=1"},
+            ]
+        )
+
+        self.assertEqual(responses[0]["body"], responses[1]["body"])
+        self.assertEqual(responses[1]["headers"]["Idempotent-Replayed"], "true")
+        self.assertEqual(responses[2]["body"], [])
+
+    def test_only_batch_views_reachable(self):
+        responses = self.batch(
+            [
+                {"path": "/api/nowhere/"},
+                {"method": "POST", "path": "/api/user/create/", "body": {}},
+                {"method": "POST", "path": "/api/batch/", "body": {"requests": []}},
+            ]
+        )
+
+        self.assertEqual([r["status"] for r in responses], [404] * 3)
+
+    def test_invalid_batches(self):
+        too_many = [{"path": "/api/recipe/tags/"}] * 21
+        credentials = [
+            {"path": "/api/user/me/", "headers": {"Authorization": "Token other"}}
+        ]
+
+        for requests in [[], too_many, credentials, [{"path": "api/user/me/"}]]:
+            res = self.client.post(BATCH_URL, {"requests": requests}, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sub_request_error_is_contained(self):
+        with mock.patch(
+            "recipe.views.TagViewSet.list", side_effect=RuntimeError("boom")
+        ), self.assertLogs("core.batch", "ERROR"):
+            responses = self.batch(SCREEN[1:3])
+
+        self.assertEqual([r["status"] for r in responses], [500, 200])
+
+
+class ConcurrentBatchTests(TransactionTestCase):
+    def setUp(self):
+        self.user = create_user()
+        create_tags(self.user, ["vegan"])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(BATCH_CONCURRENCY=3)
+    def test_reads_run_in_pool(self):
+        with mock.patch.object(
+            batch, "dispatch_in_thread", wraps=batch.dispatch_in_thread
+        ) as in_thread:
+            res = self.client.post(
+                BATCH_URL,
+                {"requests": SCREEN + SCREEN, "concurrent": True},
+                format="json",
+            )
+
+        self.assertEqual(in_thread.call_count, 8)
+        responses = res.json()["responses"]
+        self.assertEqual([r["status"] for r in responses], [200] * 8)
+        self.assertEqual(responses[1]["body"][0]["name"], "vegan")
+        self.assertEqual(responses[1], responses[5])
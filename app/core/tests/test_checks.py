@@ -0,0 +1,18 @@
+"""tests for the deployment checks"""
+
+from django.test import SimpleTestCase, override_settings
+
+from core import checks
+
+REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_warns(self):
+        self.assertEqual(
+            [warning.id for warning in checks.shared_cache(None)], ["core.W001"]
+        )
+
+    @override_settings(CACHES=REDIS)
+    def test_shared_cache(self):
+        self.assertEqual(checks.shared_cache(None), [])
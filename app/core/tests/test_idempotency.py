@@ -0,0 +1,178 @@
+"""tests for Idempotency-Key support"""
+
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import IdempotencyKey, Recipe
+from core.tests.factories import create_user, create_recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+PAYLOAD = {"title": "soup", "time_minutes": 10, "price": "2.50"}
+
+
+class IdempotencyKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, key, url=RECIPES_URL, payload=PAYLOAD, **kw):
+        return self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY=key, **kw)
+
+    def test_retry_replays_response(self):
+        first = self.post("abc")
+        second = self.post("abc")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertFalse(first.has_header("Idempotent-Replayed"))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_without_key_or_with_other_keys(self):
+        self.client.post(RECIPES_URL, PAYLOAD)
+        self.client.post(RECIPES_URL, PAYLOAD)
+        self.post("one")
+        self.post("two")
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+
+    def test_keys_are_per_user(self):
+        self.post("shared")
+        other = APIClient()
+        other.force_authenticate(create_user())
+
+        res = other.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY="shared")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_key_reused_for_other_request(self):
+        self.post("abc")
+        recipe = create_recipe(self.user)
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+
+        res = self.post("abc", url, {"image": "not an image"}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_key_reused_with_other_body_or_query(self):
+        self.post("abc")
+
+        res = self.post("abc", payload={**PAYLOAD, "title": "stew"})
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        res = self.post("abc", f"{RECIPES_URL}?source=app")
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        res = self.post("abc", payload=dict(reversed(PAYLOAD.items())))
+        self.assertEqual(res["Idempotent-Replayed"], "true")
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        res = self.post("abc", payload={"time_minutes": "soon"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post("abc")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_expired_key_runs_again(self):
+        self.post("abc")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(1))
+
+        res = self.post("abc")
+
+        self.assertFalse(res.has_header("Idempotent-Replayed"))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_key_too_long(self):
+        res = self.post("x" * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_upload_stored_once(self):
+        recipe = create_recipe(self.user)
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+        responses, saves = [], []
+        for _ in range(2):
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+                Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+                image_file.seek(0)
+                payload = {"image": image_file}
+                with mock.patch.object(
+                    Recipe.image.field.storage,
+                    "save",
+                    wraps=Recipe.image.field.storage.save,
+                ) as save:
+                    responses.append(self.post("img", url, payload, format="multipart"))
+                saves.append(save.call_count)
+        recipe.refresh_from_db()
+        self.addCleanup(recipe.image.delete)
+
+        self.assertEqual(saves, [1, 0])
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_purge_command(self):
+        self.post("old")
+        self.post("new")
+        IdempotencyKey.objects.filter(key="old").update(
+            expires_at=timezone.now() - timedelta(1)
+        )
+        out = StringIO()
+
+        call_command("purge_idempotency_keys", stdout=out)
+
+        self.assertIn("Deleted 1 keys", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key")), [("new",)])
+
+
+class ConcurrentIdempotencyKeyTests(TransactionTestCase):
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_concurrent_duplicates_run_once(self):
+        # sqlite locks the whole database, the wait on the unique index
+        # needs a real one
+        user = create_user()
+        barrier = threading.Barrier(4)
+        responses = []
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                responses.append(
+                    client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY="race")
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in responses], [201] * 4)
+        self.assertEqual(len({r.data["id"] for r in responses}), 1)
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 1)
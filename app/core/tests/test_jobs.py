@@ -0,0 +1,197 @@
+"""tests for background jobs"""
+
+import time
+from datetime import timedelta
+from contextlib import nullcontext
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.job("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@jobs.job("tests.slow")
+def slow(seconds):
+    time.sleep(seconds)
+    calls.append(jobs.requeue_expired())
+
+
+@jobs.job("tests.sleep")
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+@jobs.job("tests.explode")
+def explode():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=60)
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_locks_due_jobs_in_order(self):
+        first = jobs.enqueue("tests.record", {"value": 1})
+        second = jobs.enqueue("tests.record", {"value": 2})
+        jobs.enqueue("tests.record", run_at=timezone.now() + timedelta(hours=1))
+        jobs.enqueue("tests.record", queue="other")
+
+        self.assertEqual(jobs.claim("w1", 10), [first.id, second.id])
+        self.assertEqual(jobs.claim("w2", 10), [])
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.RUNNING)
+        self.assertEqual(first.locked_by, "w1")
+        self.assertEqual(first.attempts, 1)
+
+    def test_run_job(self):
+        job = jobs.enqueue("tests.record", {"value": "hi"})
+        jobs.claim("w1", 1)
+
+        self.assertEqual(jobs.run_job(job.id, "w1"), Job.DONE)
+
+        job.refresh_from_db()
+        self.assertEqual(calls, ["hi"])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.locked_by, "")
+
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue("tests.explode", max_attempts=2)
+        jobs.claim("w1", 1)
+        before = timezone.now()
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.run_job(job.id, "w1"), Job.PENDING)
+        job.refresh_from_db()
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.claim("w1", 1)
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.run_job(job.id, "w1"), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff(self):
+        self.assertEqual([jobs.backoff(n) for n in range(1, 6)], [10, 20, 40, 60, 60])
+
+    def test_unknown_job_is_retried(self):
+        job = jobs.enqueue("tests.missing")
+        jobs.claim("w1", 1)
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.run_job(job.id, "w1"), Job.PENDING)
+        job.refresh_from_db()
+        self.assertIn("no handler registered", job.last_error)
+
+    def test_expired_job_requeued_and_stale_worker_ignored(self):
+        job = jobs.enqueue("tests.record", {"value": 1}, max_attempts=2)
+        jobs.claim("w1", 1, visibility_timeout=1)
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(jobs.requeue_expired(), 1)
+        self.assertEqual(jobs.claim("w2", 1), [job.id])
+        # w1 wakes up after losing the job, its result is dropped
+        jobs.run_job(job.id, "w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_by, "w2")
+
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(jobs.requeue_expired(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+
+class WorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_burst(self, **kw):
+        for value in range(20):
+            jobs.enqueue("tests.record", {"value": value})
+        jobs.enqueue("tests.explode", max_attempts=1)
+
+        worker = jobs.Worker(poll_interval=0.01, **kw)
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(worker.run(burst=True), 21)
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 20)
+        self.assertEqual(Job.objects.filter(status=Job.FAILED).count(), 1)
+
+    def test_burst_runs_every_job(self):
+        self.run_burst(concurrency=1)
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_concurrent_jobs(self):
+        # sqlite locks whole tables, concurrent jobs need a real database
+        self.run_burst(concurrency=3, batch_size=2)
+
+    def test_heartbeat_extends_the_lock(self):
+        job = jobs.enqueue("tests.record", {"value": 1})
+        jobs.claim("worker", 1, visibility_timeout=1)
+        locked_until = Job.objects.get(pk=job.pk).locked_until
+
+        with jobs.heartbeat(Job.objects.filter(pk=job.pk), 3):
+            time.sleep(1.5)
+
+        job.refresh_from_db()
+        self.assertGreater(job.locked_until, locked_until + timedelta(seconds=2))
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    @override_settings(JOB_VISIBILITY_TIMEOUT=1)
+    def test_heartbeat_keeps_a_slow_job(self):
+        # sqlite locks whole tables, the handler would race the heartbeat
+        job = jobs.enqueue("tests.slow", {"seconds": 1.5})
+
+        self.assertEqual(jobs.Worker(poll_interval=0.01).run(burst=True), 1)
+
+        # still locked when the handler looked, past its first timeout
+        self.assertEqual(calls, [0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    @patch("core.jobs.heartbeat", lambda mine, timeout: nullcontext())
+    @patch("core.jobs.requeue_expired", return_value=0)
+    def test_requeues_expired_jobs_while_busy(self, requeue_expired):
+        jobs.enqueue("tests.sleep", {"seconds": 0.5})
+        worker = jobs.Worker(concurrency=1, poll_interval=0.01, visibility_timeout=0.2)
+
+        worker.run(burst=True)
+
+        # every 0.1s while the job runs, not only once the worker is idle
+        self.assertGreaterEqual(requeue_expired.call_count, 4)
+
+    def test_run_worker_command(self):
+        jobs.enqueue("tests.record", {"value": "cmd"})
+        out = StringIO()
+
+        call_command("run_worker", "--burst", "--concurrency=2", stdout=out)
+
+        self.assertEqual(calls, ["cmd"])
+        self.assertIn("Processed 1 jobs", out.getvalue())
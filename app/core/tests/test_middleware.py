@@ -0,0 +1,185 @@
+"""tests for the response compression and routed middleware"""
+
+import gzip
+import json
+import zlib
+from unittest import skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import middleware
+from core.middleware import (
+    CompressionMiddleware,
+    RoutedMiddleware,
+    parse_accept_encoding,
+)
+from core.tests.factories import create_user
+
+PAYLOAD = json.dumps(
+    [{"id": i, "title": "sample recipe", "price": "5.25"} for i in range(200)]
+).encode()
+
+
+def get_response_for(response):
+    return lambda request: response
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_GZIP_LEVEL=6)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept_encoding="gzip"):
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(get_response_for(response))(request)
+
+    def test_parse_accept_encoding(self):
+        accepted = parse_accept_encoding("gzip;q=0.5, br, identity;q=0")
+        self.assertEqual(accepted, {"gzip": 0.5, "br": 1.0, "identity": 0.0})
+
+    def test_gzip_large_json(self):
+        response = self.process(HttpResponse(PAYLOAD, content_type="application/json"))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), PAYLOAD)
+
+    def test_response_below_min_size_untouched(self):
+        response = self.process(HttpResponse(b"[]", content_type="application/json"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b"[]")
+
+    @override_settings(COMPRESSION_MIN_SIZE=10)
+    def test_min_size_setting(self):
+        body = b'{"a": "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"}'
+        response = self.process(HttpResponse(body, content_type="application/json"))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_not_accepted_untouched(self):
+        response = self.process(
+            HttpResponse(PAYLOAD, content_type="application/json"),
+            accept_encoding="gzip;q=0",
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_images_are_skipped(self):
+        response = self.process(HttpResponse(b"\x00" * 4096, content_type="image/jpeg"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_strong_etag_is_weakened(self):
+        response = HttpResponse(PAYLOAD, content_type="application/json")
+        response["ETag"] = '"abc"'
+        response = self.process(response)
+
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_streaming_ndjson_compressed_per_chunk(self):
+        lines = [json.dumps({"id": i}).encode() + b"\n" for i in range(50)]
+        response = self.process(
+            StreamingHttpResponse(iter(lines), content_type="application/x-ndjson")
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = list(response.streaming_content)
+        for line, chunk in zip(lines, chunks):
+            # every chunk is decodable on its own once it arrives
+            self.assertEqual(decompressor.decompress(chunk), line)
+        self.assertEqual(gzip.decompress(b"".join(chunks)), b"".join(lines))
+
+    @skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_brotli_preferred(self):
+        response = self.process(
+            HttpResponse(PAYLOAD, content_type="application/json"),
+            accept_encoding="gzip, deflate, br",
+        )
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content), PAYLOAD)
+
+
+class Marker:
+    """records which route's middleware saw the request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.seen = getattr(request, "seen", []) + [self.name]
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.GET.get("short_circuit") == self.name:
+            return HttpResponse(self.name)
+
+
+class ApiMarker(Marker):
+    name = "api"
+
+
+class DefaultMarker(Marker):
+    name = "default"
+
+
+@override_settings(
+    MIDDLEWARE_ROUTES={
+        "/api/": [f"{__name__}.ApiMarker"],
+        "/api/admin/": [f"{__name__}.DefaultMarker", f"{__name__}.ApiMarker"],
+        "": [f"{__name__}.DefaultMarker"],
+    }
+)
+class RoutedMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = RoutedMiddleware(lambda request: HttpResponse("view"))
+
+    def test_longest_prefix_wins(self):
+        for path, seen in [
+            ("/api/recipe/", ["api"]),
+            ("/api/admin/x", ["default", "api"]),
+            ("/admin/", ["default"]),
+        ]:
+            request = self.factory.get(path)
+            self.middleware(request)
+            self.assertEqual(request.seen, seen)
+
+    def test_view_hooks_of_the_route(self):
+        request = self.factory.get("/api/recipe/", {"short_circuit": "api"})
+        response = self.middleware.process_view(request, None, (), {})
+        self.assertEqual(response.content, b"api")
+
+        request = self.factory.get("/admin/", {"short_circuit": "api"})
+        self.assertIsNone(self.middleware.process_view(request, None, (), {}))
+
+
+class RoutedMiddlewareStackTests(TestCase):
+    def test_api_skips_sessions(self):
+        client = APIClient()
+        client.force_authenticate(create_user())
+
+        res = client.get(reverse("recipe:tag-list"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(hasattr(res.wsgi_request, "session"))
+        self.assertFalse(hasattr(res.wsgi_request, "_messages"))
+
+    def test_admin_keeps_sessions_and_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+
+        res = client.get(reverse("admin:login"))
+        self.assertTrue(hasattr(res.wsgi_request, "session"))
+        self.assertIn("csrftoken", res.cookies)
+
+        res = client.post(reverse("admin:login"), {"username": "a", "password": "b"})
+        self.assertEqual(res.status_code, 403)
@@ -1,6 +1,11 @@
 from decimal import Decimal
+from importlib import import_module
+from django.apps import apps
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from unittest.mock import patch
 
 from core import models
@@ -20,17 +25,33 @@ class ModelTests(TestCase):
         self.assertTrue(user.check_password(password))
 
     def test_new_user_normalized(self):
-        """tests if the email provided is normalized when creating a new user"""
+        """tests if the email provided is lowercased when creating a new user"""
         emails = [
             ["test1@exaMple.com", "test1@example.com"],
-            ["Test2@ExaMple.com", "Test2@example.com"],
-            ["TEST3@EXAMPLE.COM", "TEST3@example.com"],
+            ["Test2@ExaMple.com", "test2@example.com"],
+            ["TEST3@EXAMPLE.COM", "test3@example.com"],
             # etc etc
         ]
         for email, expected in emails:
             user = get_user_model().objects.create_user(email, "Pa$$w0rd!")
             self.assertEqual(user.email, expected)
 
+    def test_natural_key_ignores_case(self):
+        user = create_user("cook@example.com")
+
+        with CaptureQueriesContext(connection) as queries:
+            found = get_user_model().objects.get_by_natural_key("Cook@Example.COM")
+
+        self.assertEqual(found, user)
+        self.assertIn("LOWER(", queries[0]["sql"].upper())
+
+    def test_email_unique_regardless_of_case(self):
+        create_user("cook@example.com")
+        User = get_user_model()
+
+        with self.assertRaises(IntegrityError):
+            User.objects.bulk_create([User(email="Cook@example.com")])
+
     def test_user_without_email_raises_value_error(self):
         with self.assertRaises(ValueError):
             get_user_model().objects.create_user("", "Pa$$w0rd!")
@@ -73,3 +94,36 @@ class ModelTests(TestCase):
         file_path = models.recipe_image_file_path(None, "example.jpg")
 
         self.assertEqual(file_path, f"uploads/recipe/{uuid}.jpg")
+
+
+class EmailMigrationTests(TestCase):
+    migration = import_module("core.migrations.0013_user_email_lower")
+
+    def setUp(self):
+        # the users below predate the index, it comes back with the rollback
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX user_email_lower_uniq")
+        User = get_user_model()
+        now = timezone.now()
+        self.users = User.objects.bulk_create(
+            [
+                User(email="Cook@example.com"),
+                User(email="cook@example.com", last_login=now),
+                User(email="COOK@example.com"),
+                User(email="Baker@example.com"),
+            ]
+        )
+
+    def test_dedupe_and_lowercase(self):
+        self.migration.dedupe_emails(apps, None)
+        self.migration.lowercase_emails(apps, None)
+
+        emails = {u.pk: u for u in get_user_model().objects.all()}
+        first, last_login, third, other = (emails[u.pk] for u in self.users)
+        self.assertEqual(last_login.email, "cook@example.com")
+        self.assertTrue(last_login.is_active)
+        self.assertEqual(first.email, f"duplicate-{first.pk}-cook@example.com")
+        self.assertEqual(third.email, f"duplicate-{third.pk}-cook@example.com")
+        self.assertFalse(first.is_active or third.is_active)
+        self.assertEqual(other.email, "baker@example.com")
+        self.assertTrue(other.is_active)
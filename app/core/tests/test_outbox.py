@@ -0,0 +1,201 @@
+"""tests for relaying the outbox"""
+
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from urllib.error import HTTPError
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from core import outbox
+from core.models import OutboxEvent
+
+
+class ListSink:
+    def __init__(self):
+        self.messages = []
+
+    def deliver(self, messages):
+        self.messages += messages
+
+    def ids(self):
+        return [message["id"] for message in self.messages]
+
+
+class FailingSink:
+    def deliver(self, messages):
+        raise ConnectionError("consumer down")
+
+
+def add_event(user_id, object_id=1, action=OutboxEvent.UPDATED, **fields):
+    return OutboxEvent.objects.create(
+        user_id=user_id, kind="recipe", object_id=object_id, action=action, **fields
+    )
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """a local consumer, records the posted bodies"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.bodies.append(json.loads(body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *ar):
+        pass
+
+
+class RelayTests(TestCase):
+    def test_relay_in_id_order(self):
+        events = [add_event(user_id) for user_id in (2, 1, 2)]
+        sink = ListSink()
+
+        self.assertEqual(outbox.relay(sink, 2), 2)
+        self.assertEqual(outbox.relay(sink, 2), 1)
+        self.assertEqual(outbox.relay(sink, 2), 0)
+
+        self.assertEqual(sink.ids(), [event.id for event in events])
+        self.assertFalse(outbox.pending().exists())
+        self.assertEqual(
+            set(sink.messages[0]),
+            {"id", "user_id", "kind", "object_id", "action", "payload", "created_at"},
+        )
+
+    def test_failed_delivery_is_retried(self):
+        event = add_event(1)
+
+        with self.assertRaises(ConnectionError):
+            outbox.relay(FailingSink())
+
+        sink = ListSink()
+        outbox.relay(sink)
+        self.assertEqual(sink.ids(), [event.id])
+
+    def test_stops_at_events_held_by_another_relay(self):
+        held, later = add_event(1), add_event(1)
+        other = add_event(2)
+
+        # `held` is claimed by another relay, which goes on with user 1
+        self.assertEqual(outbox.in_order([later, other]), [other])
+        self.assertEqual(outbox.in_order([held, later, other]), [held, later, other])
+
+    def test_compact(self):
+        now = timezone.now()
+        add_event(1, delivered_at=now - timedelta(hours=25))
+        recent = add_event(1, delivered_at=now - timedelta(hours=1))
+        pending = add_event(1)
+
+        self.assertEqual(outbox.compact(batch_size=1), 1)
+
+        self.assertEqual(
+            sorted(OutboxEvent.objects.values_list("id", flat=True)),
+            [recent.id, pending.id],
+        )
+
+
+class SinkTests(TestCase):
+    def setUp(self):
+        self.events = [add_event(1, payload={"price": "5.25"}), add_event(2)]
+
+    def test_file_sink(self):
+        path = Path(tempfile.mkdtemp()) / "outbox" / "events.jsonl"
+        sink = outbox.get_sink(f"file://{path}")
+
+        outbox.relay(sink, 1)
+        outbox.relay(sink, 1)
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual([line["id"] for line in lines], [e.id for e in self.events])
+        self.assertEqual(lines[0]["payload"], {"price": "5.25"})
+
+    def serve(self, status):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        server.bodies, server.status = [], status
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_port}/events"
+
+    def test_http_sink(self):
+        server, url = self.serve(204)
+
+        outbox.relay(outbox.get_sink(url))
+
+        self.assertEqual(
+            [event["id"] for event in server.bodies[0]["events"]],
+            [event.id for event in self.events],
+        )
+
+    def test_http_sink_error_keeps_events(self):
+        server, url = self.serve(503)
+
+        with self.assertRaises(HTTPError):
+            outbox.relay(outbox.get_sink(url))
+
+        self.assertEqual(outbox.pending().count(), 2)
+
+    def test_unknown_sink(self):
+        with self.assertRaises(ValueError):
+            outbox.get_sink("kafka://broker/topic")
+
+
+class RelayCommandTests(TransactionTestCase):
+    def test_relay_events_command(self):
+        add_event(1)
+        add_event(1, delivered_at=timezone.now() - timedelta(days=2))
+        path = Path(tempfile.mkdtemp()) / "events.jsonl"
+        out = StringIO()
+
+        call_command("relay_events", "--burst", f"--sink=file://{path}", stdout=out)
+
+        self.assertEqual(len(path.read_text().splitlines()), 1)
+        self.assertIn("Delivered 1 events, compacted 1~!", out.getvalue())
+
+    def test_unknown_sink(self):
+        with self.assertRaises(CommandError):
+            call_command("relay_events", "--burst", "--sink=ftp://nowhere")
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_concurrent_relays_keep_a_users_order(self):
+        # sqlite locks whole tables, concurrent relays need a real database
+        first, second = add_event(1), add_event(1)
+        other = add_event(2)
+        entered, release = threading.Event(), threading.Event()
+
+        class BlockingSink(ListSink):
+            def deliver(self, messages):
+                entered.set()
+                release.wait(5)
+                super().deliver(messages)
+
+        blocking = BlockingSink()
+
+        def relay():
+            try:
+                outbox.relay(blocking, 1)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=relay)
+        thread.start()
+        entered.wait(5)
+        sink = ListSink()
+        try:
+            self.assertEqual(outbox.relay(sink), 1)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(blocking.ids(), [first.id])
+        self.assertEqual(sink.ids(), [other.id])
+        outbox.relay(sink)
+        self.assertEqual(sink.ids(), [other.id, second.id])
@@ -0,0 +1,89 @@
+"""tests the fast json renderer and parser against DRF's stdlib ones"""
+
+import datetime
+import io
+from decimal import Decimal
+from unittest import skipIf
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import jsonlib
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOAD = [
+    {
+        "id": 1,
+        "title": "Pancakes \u2028 ü \u2029",
+        "price": Decimal("5.25"),
+        "created": datetime.datetime(
+            2022, 6, 18, 15, 54, 1, 123, tzinfo=datetime.timezone.utc
+        ),
+        "day": datetime.date(2022, 6, 18),
+        "label": gettext_lazy("lazy"),
+        "tags": [{"id": 2, "name": "Breakfast"}],
+        "missing": None,
+    }
+]
+
+
+@skipIf(jsonlib.orjson is None, "orjson is not installed")
+class FastJSONRendererTests(SimpleTestCase):
+    def test_output_matches_stdlib_renderer(self):
+        expected = JSONRenderer().render(PAYLOAD)
+        actual = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(actual, expected)
+
+    def test_indent_2_matches_stdlib_renderer(self):
+        media_type = "application/json; indent=2"
+        expected = JSONRenderer().render(PAYLOAD, media_type)
+        actual = FastJSONRenderer().render(PAYLOAD, media_type)
+
+        self.assertEqual(actual, expected)
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parse(self):
+        stream = io.BytesIO('{"name": "Tomato ü", "price": 1.5}'.encode())
+        data = FastJSONParser().parse(stream)
+
+        self.assertEqual(data, {"name": "Tomato ü", "price": 1.5})
+
+    def test_parse_invalid_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": '))
+
+    def test_parse_rejects_nan_like_stdlib(self):
+        with self.assertRaises(ParseError):
+            JSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+
+class StdlibFallbackTests(SimpleTestCase):
+    @override_settings(JSON_BACKEND="json")
+    def test_json_backend_setting_uses_stdlib(self):
+        self.assertIsNone(jsonlib.fast_backend())
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD)
+        )
+        data = FastJSONParser().parse(io.BytesIO(b'{"id": 1}'))
+        self.assertEqual(data, {"id": 1})
+
+    def test_missing_library_uses_stdlib(self):
+        with self.settings(JSON_BACKEND="orjson"):
+            original, jsonlib.orjson = jsonlib.orjson, None
+            try:
+                self.assertIsNone(jsonlib.fast_backend())
+                self.assertEqual(
+                    FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD)
+                )
+            finally:
+                jsonlib.orjson = original
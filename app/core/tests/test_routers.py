@@ -0,0 +1,97 @@
+"""tests for read replica routing"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.mixins import PIN_COOKIE, pin_cache_key
+from core.models import Recipe
+from core.tests.utils import TempDirMixin
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+@override_settings(REPLICA_DATABASES=["replica0"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_stay_on_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_reads_go_to_replica_when_enabled(self):
+        with routers.use_replicas():
+            self.assertEqual(self.router.db_for_read(Recipe), "replica0")
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        with routers.use_replicas():
+            self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_writes_and_migrations_on_primary(self):
+        with routers.use_replicas():
+            self.assertEqual(self.router.db_for_write(Recipe), "default")
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate("replica0", "core"))
+
+
+@override_settings(REPLICA_DATABASES=["replica0"], REPLICA_PIN_SECONDS=15)
+class ReplicaReadMixinTests(TempDirMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "password12"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_inside_transaction_stay_on_primary(self):
+        # TestCase wraps every test in a transaction
+        with routers.use_replicas():
+            self.assertEqual(routers.ReplicaRouter().db_for_read(Recipe), "default")
+
+    @patch("core.mixins.set_replicas_enabled")
+    def test_safe_request_enables_replicas(self, patched_set):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(patched_set.call_args_list[0].args, (True,))
+        self.assertEqual(patched_set.call_args_list[-1].args, (False,))
+
+    @patch("core.mixins.set_replicas_enabled")
+    def test_write_pins_to_primary(self, patched_set):
+        res = self.client.post(RECIPES_URL, {"title": "soup", "price": "1.00"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE, res.cookies)
+        self.assertEqual(res.cookies[PIN_COOKIE]["max-age"], 15)
+        self.assertTrue(cache.get(pin_cache_key(self.user.pk)))
+
+        patched_set.reset_mock()
+        self.client.get(RECIPES_URL)
+        self.assertEqual(patched_set.call_args_list[0].args, (False,))
+
+    @patch("core.mixins.set_replicas_enabled")
+    def test_user_pin_without_cookie(self, patched_set):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.shared_cache() as other:
+            # the write went through another worker
+            other.set(pin_cache_key(self.user.pk), 1, 15)
+            client.get(RECIPES_URL)
+
+        self.assertEqual(patched_set.call_args_list[0].args, (False,))
+
+    def test_failed_write_does_not_pin(self):
+        res = self.client.post(RECIPES_URL, {"price": "not a price"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(PIN_COOKIE, res.cookies)
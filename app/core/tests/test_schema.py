@@ -0,0 +1,58 @@
+"""tests for the prebuilt openapi schema"""
+
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+SCHEMA_URL = reverse("api_schema")
+PREBUILT = """
+openapi: 3.0.3
+info:
+  title: prebuilt
+  version: 1.0.0
+paths: {}
+"""
+
+
+class SchemaViewTests(SimpleTestCase):
+    @override_settings(SCHEMA_FILE="")
+    def test_generated_without_schema_file(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"/api/recipe/recipes/", res.content)
+
+    @override_settings(SCHEMA_FILE="")
+    def test_operation_ids_unique(self):
+        res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        operation_ids = [
+            operation["operationId"]
+            for path in json.loads(res.content)["paths"].values()
+            for operation in path.values()
+        ]
+        self.assertEqual(len(operation_ids), len(set(operation_ids)))
+        self.assertIn("recipe_recipes_clone", operation_ids)
+        self.assertIn("recipe_recipes_clone_many", operation_ids)
+
+    def test_prebuilt_schema_served(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False) as f:
+            f.write(PREBUILT)
+        self.addCleanup(os.remove, f.name)
+
+        with override_settings(SCHEMA_FILE=f.name):
+            res = self.client.get(SCHEMA_URL)
+            json_res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"title: prebuilt", res.content)
+        self.assertNotIn(b"/api/recipe/", res.content)
+        self.assertEqual(json.loads(json_res.content)["info"]["title"], "prebuilt")
+
+    def test_docs(self):
+        res = self.client.get(reverse("api-docs"))
+
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,121 @@
+"""tests for the token bucket throttles"""
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.models import Recipe
+
+CREATE_USER_URL = reverse("user:create")
+RATES = {
+    **settings.REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {"user_create": "2/min", "recipe_upload": "1/min"},
+}
+
+
+class BucketTests(SimpleTestCase):
+    def test_consume_and_refill(self):
+        allowed, bucket = throttling.consume(None, 2, 1.0, 100.0)
+        self.assertTrue(allowed)
+        allowed, bucket = throttling.consume(bucket, 2, 1.0, 100.0)
+        self.assertTrue(allowed)
+        allowed, bucket = throttling.consume(bucket, 2, 1.0, 100.5)
+        self.assertFalse(allowed)
+        allowed, bucket = throttling.consume(bucket, 2, 1.0, 101.0)
+        self.assertTrue(allowed)
+
+    def test_refill_capped_at_capacity(self):
+        allowed, bucket = throttling.consume((0, 0.0), 3, 1.0, 1000.0)
+        self.assertTrue(allowed)
+        self.assertEqual(bucket, (2, 1000.0))
+
+    def test_memory_store_evicts_least_recently_seen(self):
+        store = throttling.MemoryBucketStore(shards=1, max_keys_per_shard=2)
+        store.consume("a", 1, 0.001, 0)
+        store.consume("b", 1, 0.001, 0)
+        store.consume("a", 1, 0.001, 0)
+        store.consume("c", 1, 0.001, 0)
+
+        self.assertEqual(list(store.shards[0][1]), ["a", "c"])
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("10/min"), (10, 60))
+        self.assertEqual(throttling.parse_rate("60/hour"), (60, 3600))
+
+
+@override_settings(REST_FRAMEWORK=RATES)
+class ThrottledViewsTests(TestCase):
+    def setUp(self):
+        throttling.memory_store.clear()
+        cache.clear()
+        self.addCleanup(throttling.memory_store.clear)
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+
+    def assert_create_user_throttled(self):
+        for _ in range(2):
+            res = self.client.post(CREATE_USER_URL, {})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(CREATE_USER_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", res)
+
+    def test_create_user_throttled_per_ip(self):
+        self.assert_create_user_throttled()
+
+        res = self.client.post(CREATE_USER_URL, {}, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_forwarded_for_header_ignored_without_proxies(self):
+        for ip in ["1.1.1.1", "2.2.2.2"]:
+            self.client.post(CREATE_USER_URL, {}, HTTP_X_FORWARDED_FOR=ip)
+
+        res = self.client.post(CREATE_USER_URL, {}, HTTP_X_FORWARDED_FOR="3.3.3.3")
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK={**RATES, "NUM_PROXIES": 1})
+    def test_forwarded_for_entry_of_the_proxy(self):
+        # the client made up the first entries, the proxy appended the last
+        for spoofed in ["1.1.1.1", "2.2.2.2", "3.3.3.3"]:
+            res = self.client.post(
+                CREATE_USER_URL, {}, HTTP_X_FORWARDED_FOR=f"{spoofed}, 10.0.0.7"
+            )
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(CREATE_USER_URL, {}, HTTP_X_FORWARDED_FOR="10.0.0.8")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE_STORE="cache")
+    def test_cache_store(self):
+        self.assert_create_user_throttled()
+
+    def test_tokens_refill(self):
+        with patch.object(throttling.TokenBucketThrottle, "timer", return_value=0):
+            self.assert_create_user_throttled()
+        with patch.object(throttling.TokenBucketThrottle, "timer", return_value=30):
+            res = self.client.post(CREATE_USER_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_throttled_per_user(self):
+        user = get_user_model().objects.create_user("user@example.com", "password12")
+        recipe = Recipe.objects.create(user=user, title="soup")
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+        self.client.force_authenticate(user)
+
+        res = self.client.post(url, {"image": "not an image"}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(url, {"image": "not an image"}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # other recipe endpoints have no budget
+        res = self.client.get(reverse("recipe:recipe-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,103 @@
+"""tests for media file serving"""
+
+import os
+import uuid
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from core.tests.utils import TempDirMixin
+from core.views import parse_range, IMMUTABLE_CACHE_CONTROL
+
+CONTENT = bytes(range(256)) * 40
+
+
+def media_url(path):
+    return f"/static/media/{path}"
+
+
+@override_settings(MEDIA_SERVE_MODE="file")
+class ServeMediaTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        media_root = self.make_temp_dir()
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.name = f"uploads/recipe/{uuid.uuid4()}.jpg"
+        self.path = os.path.join(media_root, self.name)
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(CONTENT)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+
+    def test_full_file(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertEqual(res["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+
+    def test_range_request(self):
+        res = self.client.get(media_url(self.name), HTTP_RANGE="bytes=100-199")
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT[100:200])
+        self.assertEqual(res["Content-Range"], f"bytes 100-199/{len(CONTENT)}")
+        self.assertEqual(res["Content-Length"], "100")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(media_url(self.name), HTTP_RANGE="bytes=999999-")
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_stale_if_range_serves_full_file(self):
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_RANGE="bytes=0-9",
+            HTTP_IF_RANGE=http_date(0),
+        )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_not_modified(self):
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_IF_MODIFIED_SINCE=http_date(os.stat(self.path).st_mtime + 60),
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_missing_file_and_traversal_404(self):
+        self.assertEqual(self.client.get(media_url("nope.jpg")).status_code, 404)
+        res = self.client.get(media_url("../../../etc/passwd"))
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(
+        MEDIA_SERVE_MODE="x-accel-redirect",
+        MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/",
+    )
+    def test_x_accel_redirect(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+
+    @override_settings(MEDIA_SERVE_MODE="x-sendfile")
+    def test_x_sendfile(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res["X-Sendfile"], self.path)
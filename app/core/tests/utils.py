@@ -0,0 +1,29 @@
+"""helpers shared by the test modules"""
+
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.test import override_settings
+
+
+class TempDirMixin:
+    def make_temp_dir(self):
+        """a directory removed once the test is done"""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        return path
+
+    @contextmanager
+    def shared_cache(self):
+        """
+        runs the block on a file based default cache and yields a second
+        client of it, the cache client of another process
+        """
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+        location = self.make_temp_dir()
+        with override_settings(
+            CACHES={"default": {"BACKEND": backend, "LOCATION": location}}
+        ):
+            yield caches.create_connection("default")
@@ -0,0 +1,130 @@
+"""
+token bucket throttles
+
+a view sets `throttle_scope` and the scope's rate comes from
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"], "10/min" is a bucket of 10
+tokens refilled at 10 per minute. every key costs one (tokens, timestamp)
+tuple, kept by settings.THROTTLE_STORE:
+    "memory": sharded in process dicts, least recently seen keys are evicted
+    "cache": the default django cache, shared between workers
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """parses "10/min" into (10, 60) like DRF's rate throttles"""
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
+
+
+def consume(bucket, capacity, rate, now):
+    """
+    takes a token from `bucket` (tokens, last refill time or None for a new
+    key), returns (allowed, updated bucket)
+    """
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens, last = bucket
+        tokens = min(capacity, tokens + (now - last) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return allowed, (tokens, now)
+
+
+class MemoryBucketStore:
+    def __init__(self, shards=16, max_keys_per_shard=10000):
+        self.max_keys_per_shard = max_keys_per_shard
+        self.shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def consume(self, key, capacity, rate, now):
+        lock, buckets = self.shards[zlib.crc32(key.encode()) % len(self.shards)]
+        with lock:
+            allowed, bucket = consume(buckets.pop(key, None), capacity, rate, now)
+            buckets[key] = bucket
+            if len(buckets) > self.max_keys_per_shard:
+                # an evicted key comes back with a full bucket, the least
+                # recently seen ones have refilled the most anyway
+                buckets.popitem(last=False)
+        return allowed, bucket[0]
+
+    def clear(self):
+        for lock, buckets in self.shards:
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore:
+    """shared between processes, read modify write so bursts may overshoot"""
+
+    def consume(self, key, capacity, rate, now):
+        cache_key = f"throttle:{key}"
+        allowed, bucket = consume(cache.get(cache_key), capacity, rate, now)
+        # a bucket idle long enough to refill completely is dropped
+        cache.set(cache_key, bucket, timeout=int(capacity / rate) + 1)
+        return allowed, bucket[0]
+
+
+memory_store = MemoryBucketStore()
+cache_store = CacheBucketStore()
+
+
+def get_store():
+    if getattr(settings, "THROTTLE_STORE", "memory") == "cache":
+        return cache_store
+    return memory_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """throttles by the view's `throttle_scope`, subclasses pick the key"""
+
+    timer = time.time
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError(".get_ident_key() must be overridden")
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+
+        capacity, duration = parse_rate(rate)
+        refill = capacity / duration
+        key = f"{scope}:{self.get_ident_key(request)}"
+        allowed, tokens = get_store().consume(key, capacity, refill, self.timer())
+        if not allowed:
+            self.wait_seconds = (1 - tokens) / refill
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request):
+        return f"ip:{self.get_ident(request)}"
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """per user, falls back to the client ip for anonymous requests"""
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
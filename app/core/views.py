@@ -0,0 +1,152 @@
+"""
+media file serving
+
+settings.MEDIA_SERVE_MODE picks how files under MEDIA_URL are delivered:
+    "file": in process FileResponse, full responses go through the wsgi
+        server's file wrapper (sendfile zero copy under gunicorn), single
+        byte ranges are supported
+    "x-accel-redirect": hands the file over to nginx through an internal
+        location at MEDIA_ACCEL_REDIRECT_PREFIX
+    "x-sendfile": hands the file over to apache/lighttpd through X-Sendfile
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# recipe_image_file_path names files after a uuid4, a name is never reused
+# for other content so those files can be cached forever
+IMMUTABLE_NAME_RE = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.\w+)?$"
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def get_cache_control(path):
+    if IMMUTABLE_NAME_RE.match(posixpath.basename(path)):
+        return IMMUTABLE_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def parse_range(header, size):
+    """
+    returns (start, end) inclusive for a single `bytes=` range, None when
+    the header should be ignored and raises ValueError when unsatisfiable
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # suffix range, the last `end` bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def read_range(file, start, length):
+    file.seek(start)
+    try:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_response(request, fullpath, statobj, content_type):
+    """FileResponse with single range support"""
+    size = statobj.st_size
+    last_modified = http_date(statobj.st_mtime)
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if range_header and (not if_range or if_range == last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, "rb"), content_type=content_type)
+    else:
+        # bounded iterator, the wsgi file wrapper would send past the range
+        # on servers that don't honour Content-Length
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(fullpath, "rb"), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response.headers["Content-Length"] = str(end - start + 1)
+    response.headers["Last-Modified"] = last_modified
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve_media(request, path):
+    """serves a file below MEDIA_ROOT according to MEDIA_SERVE_MODE"""
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("not found")
+
+    mode = settings.MEDIA_SERVE_MODE
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or "application/octet-stream"
+
+    if mode == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Accel-Redirect"] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + path
+        )
+    elif mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Sendfile"] = fullpath
+    else:
+        statobj = os.stat(fullpath)
+        if not was_modified_since(
+            request.META.get("HTTP_IF_MODIFIED_SINCE"),
+            statobj.st_mtime,
+            statobj.st_size,
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = file_response(request, fullpath, statobj, content_type)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+
+    response.headers["Cache-Control"] = get_cache_control(path)
+    return response
@@ -0,0 +1,106 @@
+"""
+copies of a user's recipes, to start a variant from
+
+the recipe rows are copied with one bulk insert and their tags and
+ingredients (with the amounts) with one INSERT ... SELECT per through
+table, nothing is looked up by name again. the outbox gets the created
+and relations events a recipe made through the API would have sent.
+
+a copy points at the original's image file instead of copying it: files
+are named after a uuid4 and never overwritten, a new upload gets a new
+file, and they are only removed with the user's account, along with every
+recipe using them.
+"""
+
+from functools import partial
+
+from django.db import connection, transaction
+
+from core import outbox
+from core.models import Recipe, OutboxEvent
+from recipe import matching, stats, sync
+
+COPIED_FIELDS = ["description", "time_minutes", "price", "link"]
+TITLE_SUFFIX = " (copy)"
+
+
+def copy_title(title):
+    max_length = Recipe._meta.get_field("title").max_length
+    return title[: max_length - len(TITLE_SUFFIX)] + TITLE_SUFFIX
+
+
+def copy_relations(through, copies):
+    """
+    copies the through rows of the originals onto the copies in one
+    INSERT ... SELECT, `copies` maps original to copy ids
+    """
+    quote = connection.ops.quote_name
+    table = quote(through._meta.db_table)
+    recipe = quote(through._meta.get_field("recipe").column)
+    columns = ", ".join(
+        quote(field.column)
+        for field in through._meta.local_concrete_fields
+        if not field.primary_key and field.name != "recipe"
+    )
+    cases = " ".join(["WHEN %s THEN %s"] * len(copies))
+    placeholders = ", ".join(["%s"] * len(copies))
+    sql = (
+        f"INSERT INTO {table} ({recipe}, {columns}) "
+        f"SELECT CASE {recipe} {cases} END, {columns} FROM {table} "
+        f"WHERE {recipe} IN ({placeholders})"
+    )
+    params = [id for pair in copies.items() for id in pair] + list(copies)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def relation_events(through, field, copies):
+    """the outbox events of the relations copied onto `copies`"""
+    column = Recipe._meta.get_field(field).m2m_reverse_name()
+    related = {}
+    rows = through.objects.filter(recipe__in=copies).order_by(column)
+    for recipe_id, related_id in rows.values_list("recipe_id", column):
+        related.setdefault(recipe_id, []).append(related_id)
+    return [
+        outbox.describe(
+            copy, OutboxEvent.RELATIONS, {"field": field, "added": related[copy.pk]}
+        )
+        for copy in copies
+        if copy.pk in related
+    ]
+
+
+@transaction.atomic
+def clone(user, recipe_ids, title=None):
+    """
+    copies the user's recipes of `recipe_ids`, ordered by id, titled
+    `title` or "<title> (copy)". returns the copies
+    """
+    originals = list(Recipe.objects.filter(user=user, id__in=recipe_ids).order_by("id"))
+    if not originals:
+        return []
+
+    # bulk_create skips the signals that number changes for recipe.sync
+    seq = sync.next_seq(user.pk)
+    copies = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=title or copy_title(original.title),
+            image=original.image.name,
+            sync_seq=seq,
+            **{name: getattr(original, name) for name in COPIED_FIELDS},
+        )
+        for original in originals
+    )
+    ids = {original.pk: copy.pk for original, copy in zip(originals, copies)}
+    events = [outbox.describe(copy, OutboxEvent.CREATED) for copy in copies]
+    for field in ("tags", "ingredients"):
+        through = Recipe._meta.get_field(field).remote_field.through
+        copy_relations(through, ids)
+        events += relation_events(through, field, copies)
+    outbox.append(events)
+
+    stats.invalidate(user.pk)
+    for registry in (matching.ingredients, matching.features):
+        transaction.on_commit(partial(registry.invalidate, user.pk))
+    return copies
@@ -0,0 +1,149 @@
+"""
+read only serializers that build API output straight from .values() rows
+
+they skip DRF's per field to_representation calls, nested serializer
+instantiation and model instance creation, output matches the DRF
+serializers in recipe.serializers exactly.
+"""
+
+import decimal
+from operator import itemgetter
+
+from django.db import models
+from rest_framework.settings import api_settings
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def _decimal_accessor(field):
+    """mirrors rest_framework.fields.DecimalField.to_representation"""
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.Context(prec=field.max_digits)
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return lambda value: None if value is None else value.quantize(
+            exponent, context=context
+        )
+
+    def to_representation(value):
+        if value is None:
+            return ""
+        return "{:f}".format(value.quantize(exponent, context=context))
+
+    return to_representation
+
+
+def _compile_accessors(model, field_names):
+    """returns a converter per field, None when the db value is used as is"""
+    accessors = []
+    for name in field_names:
+        field = model._meta.get_field(name)
+        if isinstance(field, models.DecimalField):
+            accessors.append(_decimal_accessor(field))
+        else:
+            accessors.append(None)
+    return accessors
+
+
+class ValuesSerializer:
+    """
+    read only serializer over a queryset, `fields` are concrete model
+    fields, `nested` maps m2m field names to a ValuesSerializer subclass
+    """
+
+    model = None
+    fields = []
+    nested = {}
+
+    _accessors = None
+
+    def __init__(self, instance, many=True):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def _get_accessors(cls):
+        if cls.__dict__.get("_accessors") is None:
+            cls._accessors = _compile_accessors(cls.model, cls.fields)
+        return cls._accessors
+
+    @classmethod
+    def build_rows(cls, rows):
+        """converts value tuples ordered like `fields` into dicts"""
+        fields = cls.fields
+        accessors = cls._get_accessors()
+        if not any(accessors):
+            return [dict(zip(fields, row)) for row in rows]
+
+        pairs = list(zip(fields, accessors))
+        return [
+            {
+                name: value if accessor is None else accessor(value)
+                for (name, accessor), value in zip(pairs, row)
+            }
+            for row in rows
+        ]
+
+    def _nested_rows(self, name, ids):
+        """
+        returns {parent id: [nested dicts]} read from the m2m through table,
+        ordered by target id like the nested serializers of recipe.serializers
+        """
+        serializer = self.nested[name]
+        field = self.model._meta.get_field(name)
+        through = field.remote_field.through
+        parent = f"{field.m2m_field_name()}_id"
+        target = field.m2m_reverse_field_name()
+
+        rows = (
+            through.objects.filter(**{f"{parent}__in": ids})
+            .order_by(parent, f"{target}_id")
+            .values_list(parent, *[f"{target}__{f}" for f in serializer.fields])
+        )
+        rows = list(rows)
+        grouped = {}
+        parents = map(itemgetter(0), rows)
+        nested = serializer.build_rows([row[1:] for row in rows])
+        for parent_id, item in zip(parents, nested):
+            grouped.setdefault(parent_id, []).append(item)
+        return grouped
+
+    def to_representation(self, queryset):
+        data = self.build_rows(queryset.values_list(*self.fields))
+        if not self.nested or not data:
+            return data
+
+        ids = [item["id"] for item in data]
+        for name in self.nested:
+            grouped = self._nested_rows(name, ids)
+            for item in data:
+                item[name] = grouped.get(item["id"], [])
+        return data
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation(self.instance)
+        return self.to_representation(
+            self.model.objects.filter(pk=self.instance.pk)
+        )[0]
+
+
+class TagValuesSerializer(ValuesSerializer):
+    model = Tag
+    fields = ["id", "name"]
+
+
+class IngredientValuesSerializer(ValuesSerializer):
+    model = Ingredient
+    fields = ["id", "name"]
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+    """same output as recipe.serializers.RecipeSerializer"""
+
+    model = Recipe
+    fields = ["id", "title", "time_minutes", "price", "link"]
+    nested = {
+        "tags": TagValuesSerializer,
+        "ingredients": IngredientValuesSerializer,
+    }
@@ -0,0 +1,10 @@
+from django.core.files.storage import default_storage
+
+from core.jobs import job
+
+
+@job("recipe.delete_images")
+def delete_images(names):
+    """removes image files of deleted recipes"""
+    for name in names:
+        default_storage.delete(name)
@@ -0,0 +1,317 @@
+"""
+recipe matching over per user inverted indexes
+
+every recipe of a user gets a bit position and every item (an ingredient,
+or a tag/ingredient feature) a python int bitmap of the recipes holding
+it. a query adds the bitmaps of its items into bit sliced counters, then
+ranks whole groups of recipes sharing (set size, overlap) at once, so it
+costs a few big int operations per item instead of a pass over python
+objects.
+
+    ingredients: ingredient ids, "what can I cook" coverage ranking
+    features: ("tag", id) and ("ingredient", id), "more like this"
+
+indexes live in process, bounded by MATCHING_INDEX_MAX_USERS, and are
+updated incrementally by recipe.signals once writes commit. a per user
+version in the default cache makes other processes rebuild after a write
+they didn't see.
+
+an update only replaces the bitmaps and item sets of the recipes and items
+it touches, under the index's lock. queries hold the lock too, so they see
+an update whole or not at all.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Recipe
+
+
+def iter_bits(bitmap):
+    """yields the set bit positions of `bitmap`, lowest first"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def add_to_counter(planes, bitmap):
+    """adds one to the bit sliced counter `planes` wherever `bitmap` is set"""
+    carry = bitmap
+    for i, plane in enumerate(planes):
+        planes[i] = plane ^ carry
+        carry &= plane
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def counter_equals(planes, value, universe):
+    """bitmap of the positions where the counter equals `value`"""
+    result = universe
+    for i, plane in enumerate(planes):
+        result &= plane if value >> i & 1 else ~plane
+    if value >> len(planes):
+        return 0
+    return result
+
+
+def jaccard(overlap, size, query_size):
+    return overlap / (size + query_size - overlap)
+
+
+def cosine(overlap, size, query_size):
+    return overlap / math.sqrt(size * query_size)
+
+
+SIMILARITY_METRICS = {"jaccard": jaccard, "cosine": cosine}
+
+
+class RecipeSetIndex:
+    def __init__(self, version=None):
+        self.version = version
+        self.lock = threading.RLock()
+        self.positions = {}
+        self.recipe_ids = []
+        self.recipe_items = {}
+        self.bitmaps = {}
+        # size -> bitmap of the recipes with that many items
+        self.sizes = {}
+        self.universe = 0
+
+    @classmethod
+    def build(cls, rows, version=None):
+        """builds the index from (recipe id, item) pairs"""
+        index = cls(version)
+        for recipe_id, item in rows:
+            index.recipe_items.setdefault(recipe_id, set()).add(item)
+        for recipe_id, items in index.recipe_items.items():
+            bit = 1 << index._position(recipe_id)
+            for item in items:
+                index.bitmaps[item] = index.bitmaps.get(item, 0) | bit
+            index._set_size(bit, 0, len(items))
+        return index
+
+    def _position(self, recipe_id):
+        position = self.positions.get(recipe_id)
+        if position is None:
+            position = self.positions[recipe_id] = len(self.recipe_ids)
+            self.recipe_ids.append(recipe_id)
+        return position
+
+    def _set_size(self, bit, old, new):
+        if old:
+            self.sizes[old] &= ~bit
+            if not self.sizes[old]:
+                del self.sizes[old]
+        if new:
+            self.sizes[new] = self.sizes.get(new, 0) | bit
+            self.universe |= bit
+        else:
+            self.universe &= ~bit
+
+    def add(self, recipe_id, items):
+        current = self.recipe_items.get(recipe_id, set())
+        new = set(items) - current
+        if not new:
+            return
+        bit = 1 << self._position(recipe_id)
+        for item in new:
+            self.bitmaps[item] = self.bitmaps.get(item, 0) | bit
+        self._set_size(bit, len(current), len(current) + len(new))
+        self.recipe_items[recipe_id] = current | new
+
+    def remove(self, recipe_id, items=None):
+        """removes some or, with None, all items of a recipe"""
+        current = self.recipe_items.get(recipe_id)
+        if not current:
+            return
+        removed = current if items is None else current & set(items)
+        if not removed:
+            return
+        bit = 1 << self.positions[recipe_id]
+        for item in removed:
+            bitmap = self.bitmaps[item] & ~bit
+            if bitmap:
+                self.bitmaps[item] = bitmap
+            else:
+                del self.bitmaps[item]
+        remaining = current - removed
+        self._set_size(bit, len(current), len(remaining))
+        if remaining:
+            self.recipe_items[recipe_id] = remaining
+        else:
+            # the bit position stays reserved, it is reused if the recipe
+            # gets items again
+            del self.recipe_items[recipe_id]
+
+    def remove_item(self, item):
+        bitmap = self.bitmaps.get(item, 0)
+        for position in iter_bits(bitmap):
+            self.remove(self.recipe_ids[position], [item])
+
+    def rank(self, items, score, limit, exclude=None):
+        """
+        returns [(recipe id, overlap, set size)] for the recipes sharing at
+        least one of `items`, ordered by score(overlap, size) descending,
+        then overlap descending, then smaller sets, then recipe id
+        """
+        with self.lock:
+            return self._rank(set(items), score, limit, exclude)
+
+    def _rank(self, items, score, limit, exclude):
+        planes = []
+        for item in items:
+            bitmap = self.bitmaps.get(item)
+            if bitmap:
+                add_to_counter(planes, bitmap)
+        if not planes:
+            return []
+
+        universe = self.universe
+        if exclude in self.positions:
+            universe &= ~(1 << self.positions[exclude])
+        most = min(len(items), max(self.sizes, default=0))
+        overlaps = {
+            overlap: counter_equals(planes, overlap, universe)
+            for overlap in range(1, most + 1)
+        }
+        groups = sorted(
+            (
+                (score(overlap, size), overlap, -size)
+                for size in self.sizes
+                for overlap in range(1, min(size, most) + 1)
+            ),
+            reverse=True,
+        )
+
+        results = []
+        for _, overlap, negative_size in groups:
+            size = -negative_size
+            bitmap = self.sizes[size] & overlaps[overlap]
+            ids = sorted(self.recipe_ids[position] for position in iter_bits(bitmap))
+            results += [(recipe_id, overlap, size) for recipe_id in ids]
+            if len(results) >= limit:
+                return results[:limit]
+        return results
+
+    def match(self, items, limit=20):
+        """
+        coverage ranking, the share of a recipe's items found in `items`,
+        ties go to fewer missing items
+        """
+        return self.rank(items, lambda have, size: (have / size, have - size), limit)
+
+    def similar(self, recipe_id, limit=10, metric="jaccard"):
+        """recipes ranked by set similarity to `recipe_id`"""
+        similarity = SIMILARITY_METRICS[metric]
+        with self.lock:
+            items = self.recipe_items.get(recipe_id, set())
+            return self.rank(
+                items,
+                lambda overlap, size: similarity(overlap, size, len(items)),
+                limit,
+                exclude=recipe_id,
+            )
+
+
+def ingredient_rows(user_id):
+    return (
+        Recipe.ingredients.through.objects.filter(recipe__user_id=user_id)
+        .order_by("recipe_id")
+        .values_list("recipe_id", "ingredient_id")
+    )
+
+
+def feature_rows(user_id):
+    tags = (
+        Recipe.tags.through.objects.filter(recipe__user_id=user_id)
+        .order_by("recipe_id")
+        .values_list("recipe_id", "tag_id")
+    )
+    for recipe_id, tag_id in tags:
+        yield recipe_id, ("tag", tag_id)
+    for recipe_id, ingredient_id in ingredient_rows(user_id):
+        yield recipe_id, ("ingredient", ingredient_id)
+
+
+class IndexRegistry:
+    """the loaded RecipeSetIndex of each user, least recently used evicted"""
+
+    def __init__(self, name, load_rows):
+        self.name = name
+        self.load_rows = load_rows
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def version_key(self, user_id):
+        return f"{self.name}-version:{user_id}"
+
+    def get_version(self, user_id):
+        return cache.get_or_set(self.version_key(user_id), 0, None)
+
+    def bump_version(self, user_id):
+        key = self.version_key(user_id)
+        cache.add(key, 0, None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # evicted between add and incr
+            cache.set(key, 1, None)
+            return 1
+
+    def get(self, user_id):
+        """the user's index, rebuilt when another process changed their data"""
+        version = self.get_version(user_id)
+        with self.lock:
+            index = self.indexes.get(user_id)
+            if index is not None and index.version == version:
+                self.indexes.move_to_end(user_id)
+                return index
+
+        index = RecipeSetIndex.build(self.load_rows(user_id), version)
+        with self.lock:
+            self.indexes[user_id] = index
+            self.indexes.move_to_end(user_id)
+            while len(self.indexes) > settings.MATCHING_INDEX_MAX_USERS:
+                self.indexes.popitem(last=False)
+        return index
+
+    def update(self, user_id, apply):
+        """
+        applies a committed change to the loaded index and publishes the new
+        version, a process without the index loaded just builds it later
+        """
+        version = self.bump_version(user_id)
+        with self.lock:
+            index = self.indexes.get(user_id)
+        if index is None:
+            return
+        # the index's lock is never taken while holding the registry's
+        with index.lock:
+            if index.version == version - 1:
+                apply(index)
+                index.version = version
+                return
+        # missed somebody else's change, rebuild on next use
+        with self.lock:
+            if self.indexes.get(user_id) is index:
+                del self.indexes[user_id]
+
+    def invalidate(self, user_id):
+        """for changes too big to apply, every process rebuilds on next use"""
+        self.bump_version(user_id)
+        with self.lock:
+            self.indexes.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+
+
+ingredients = IndexRegistry("ingredient-index", ingredient_rows)
+features = IndexRegistry("feature-index", feature_rows)
@@ -0,0 +1,124 @@
+"""
+merging duplicate tags or ingredients ("tomato", "Tomatoes") into one
+
+the recipes of the sources are moved onto the target with a few set
+based statements over the through table, however many recipes there are:
+
+    the sources' rows in recipes that already have the target go
+    of several sources in one recipe the first row stays
+    the remaining rows are pointed at the target
+
+a recipe keeps the target's amount when both had one, a row that stays
+without a quantity takes the amount of the first going row that has one.
+the sources are then deleted, which leaves tombstones and drops the stats
+and name caches through recipe.signals, the moved recipes get a new change
+number and an outbox event, and the matching indexes are rebuilt once it
+all commits.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef, Subquery
+from django.db.models.functions import Lower, Trim
+
+from core import outbox
+from core.models import Recipe, Tag, Ingredient, OutboxEvent
+from recipe import matching, sync
+
+FIELDS = {Tag: "tags", Ingredient: "ingredients"}
+INDEXES = {
+    Tag: [matching.features],
+    Ingredient: [matching.ingredients, matching.features],
+}
+
+
+def keep_amounts(kept, dropped):
+    """
+    gives the rows of `kept` without a quantity the amount of the first row
+    of `dropped` with one in the same recipe
+    """
+    donor = dropped.filter(
+        recipe_id=OuterRef("recipe_id"), quantity__isnull=False
+    ).order_by("id")
+    kept.filter(quantity=None).filter(Exists(donor)).update(
+        quantity=Subquery(donor.values("quantity")[:1]),
+        unit=Subquery(donor.values("unit")[:1]),
+    )
+
+
+@transaction.atomic
+def merge(target, source_ids, name=None):
+    """
+    merges the objects of `source_ids` owned by the target's user into
+    `target`, renamed to `name` if given. returns the number of merged
+    sources and of recipes that had one
+    """
+    model = type(target)
+    user_id = target.user_id
+    # locks in the order recipe writes take them, the user's sequence row
+    # before the tags and ingredients, else a merge and a recipe update can
+    # deadlock. a concurrent merge of the same sources waits for this one
+    seq = sync.next_seq(user_id)
+    sources = list(
+        model.objects.select_for_update()
+        .filter(user_id=user_id, id__in=source_ids)
+        .exclude(pk=target.pk)
+        .values_list("id", flat=True)
+    )
+
+    through = Recipe._meta.get_field(FIELDS[model]).remote_field.through
+    column = model._meta.model_name
+    rows = through.objects.filter(**{f"{column}__in": sources})
+    recipes = Recipe.objects.filter(id__in=rows.values("recipe_id")).update(
+        sync_seq=seq
+    )
+    if recipes:
+        recipe_ids = list(rows.values_list("recipe_id", flat=True).distinct())
+        has_target = through.objects.filter(**{column: target.pk})
+        dropped = rows.filter(recipe_id__in=has_target.values("recipe_id"))
+        if model is Ingredient:
+            keep_amounts(has_target, dropped)
+        dropped.delete()
+        first = rows.values("recipe_id").annotate(first=Min("id")).values("first")
+        if model is Ingredient:
+            keep_amounts(rows.filter(id__in=first), rows.exclude(id__in=first))
+        rows.exclude(id__in=first).delete()
+        rows.update(**{column: target.pk})
+        payload = {"field": FIELDS[model], "added": [target.pk], "removed": sources}
+        outbox.append(
+            [
+                OutboxEvent(
+                    user_id=user_id,
+                    kind="recipe",
+                    object_id=recipe_id,
+                    action=OutboxEvent.RELATIONS,
+                    payload=payload,
+                )
+                for recipe_id in sorted(recipe_ids)
+            ]
+        )
+
+    model.objects.filter(pk__in=sources).delete()
+    if name is not None and name != target.name:
+        target.name = name
+        target.save()
+
+    if recipes:
+        for registry in INDEXES[model]:
+            transaction.on_commit(partial(registry.invalidate, user_id))
+    return len(sources), recipes
+
+
+def case_duplicates(model, user):
+    """
+    ids of the user's objects whose names only differ in case or
+    surrounding space, a list per name, oldest first
+    """
+    objects = model.objects.filter(user=user).annotate(key=Lower(Trim("name")))
+    duplicated = objects.values("key").annotate(count=Count("id")).filter(count__gt=1)
+    groups = {}
+    rows = objects.filter(key__in=duplicated.values("key")).order_by("id")
+    for pk, key in rows.values_list("id", "key"):
+        groups.setdefault(key, []).append(pk)
+    return list(groups.values())
@@ -0,0 +1,146 @@
+"""
+per user name -> id maps of tags and ingredients for the nested writes of
+RecipeSerializer
+
+a user's map is loaded in one query on their first write and kept in
+process, bounded by NAME_CACHE_MAX_USERS, so a write only goes to the
+database for names the user never used. recipe.signals drops the map when
+one of the user's tags or ingredients is saved or deleted, and again once
+that commits, a per user version in the default cache makes other
+processes, management commands included, reload too. a transaction that
+changed a user's names reads their map from the database, it isn't kept in
+case the transaction rolls back.
+
+hits, misses and loads are counted per process, see `NameCache.stats`.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient
+
+
+class NameCache:
+    """the name -> id map of each user, least recently used evicted"""
+
+    def __init__(self, model):
+        self.model = model
+        self.name = f"{model._meta.model_name}-names"
+        self.maps = OrderedDict()
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(["hits", "misses", "loads", "evictions"], 0)
+        # users whose names the open transaction of this thread changed
+        self.local = threading.local()
+
+    def pending(self):
+        if not connection.in_atomic_block:
+            # committed or rolled back since
+            self.local.users = set()
+        elif not hasattr(self.local, "users"):
+            self.local.users = set()
+        return self.local.users
+
+    def version_key(self, user_id):
+        return f"{self.name}-version:{user_id}"
+
+    def get_version(self, user_id):
+        return cache.get_or_set(self.version_key(user_id), 0, None)
+
+    def bump_version(self, user_id):
+        key = self.version_key(user_id)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # evicted between add and incr
+            cache.set(key, 1, None)
+
+    def load(self, user_id):
+        names = {}
+        rows = self.model.objects.filter(user_id=user_id).order_by("-id")
+        # the oldest of same named rows wins
+        for pk, name in rows.values_list("id", "name"):
+            names[name] = pk
+        return names
+
+    def get(self, user_id):
+        """the user's map, reloaded when another process changed their data"""
+        if user_id in self.pending():
+            with self.lock:
+                self.counts["loads"] += 1
+            return self.load(user_id)
+
+        version = self.get_version(user_id)
+        with self.lock:
+            entry = self.maps.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.maps.move_to_end(user_id)
+                return entry[1]
+
+        names = self.load(user_id)
+        with self.lock:
+            self.counts["loads"] += 1
+            self.maps[user_id] = (version, names)
+            self.maps.move_to_end(user_id)
+            while len(self.maps) > settings.NAME_CACHE_MAX_USERS:
+                self.maps.popitem(last=False)
+                self.counts["evictions"] += 1
+        return names
+
+    def resolve(self, user, names):
+        """ids of the user's objects called `names`, missing ones are created"""
+        known = self.get(user.pk)
+        ids = []
+        misses = 0
+        for name in names:
+            pk = known.get(name)
+            if pk is None:
+                misses += 1
+                pk = self.model.objects.get_or_create(user=user, name=name)[0].pk
+            ids.append(pk)
+        with self.lock:
+            self.counts["hits"] += len(ids) - misses
+            self.counts["misses"] += misses
+        return ids
+
+    def drop(self, user_id):
+        with self.lock:
+            self.maps.pop(user_id, None)
+
+    def committed(self, user_id):
+        self.pending().discard(user_id)
+        self.drop(user_id)
+        self.bump_version(user_id)
+
+    def invalidate(self, user_id):
+        """
+        drops the user's map now and once the change commits, for whoever
+        loaded it in between
+        """
+        self.drop(user_id)
+        if connection.in_atomic_block:
+            self.pending().add(user_id)
+        transaction.on_commit(partial(self.committed, user_id))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts, users=len(self.maps))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+    def clear(self):
+        self.local.users = set()
+        with self.lock:
+            self.maps.clear()
+            for name in self.counts:
+                self.counts[name] = 0
+
+
+tags = NameCache(Tag)
+ingredients = NameCache(Ingredient)
@@ -0,0 +1,104 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    forward only keyset pagination on the view's `get_ordering()`, a
+    (sort key, id) tuple. the cursor carries the last row's sort value and
+    id so every page is an index range scan instead of an OFFSET.
+
+    opt in, only used when the request sends `page_size` or `cursor`.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([str(value), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return field.to_python(value), int(pk)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, queryset, key, value, pk):
+        name = key.lstrip("-")
+        lookup = "lt" if key.startswith("-") else "gt"
+        if name in ("pk", "id"):
+            return queryset.filter(**{f"pk__{lookup}": pk})
+        return queryset.filter(
+            Q(**{f"{name}__{lookup}": value}) | Q(**{name: value, f"pk__{lookup}": pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = view.get_ordering()
+        key = ordering[0]
+        name = key.lstrip("-")
+        field = queryset.model._meta.get_field("id" if name == "pk" else name)
+
+        cursor = self.decode_cursor(request, field)
+        if cursor is not None:
+            queryset = self.keyset_filter(queryset, key, *cursor)
+
+        keys = list(
+            queryset.order_by(*ordering).values_list(name, "pk")[: self.page_size + 1]
+        )
+        self.has_next = len(keys) > self.page_size
+        keys = keys[: self.page_size]
+        self.next_key = keys[-1] if keys and self.has_next else None
+        # the page itself keeps the view's ordering and serializer
+        return queryset.order_by(*ordering).filter(pk__in=[pk for _, pk in keys])
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(*self.next_key)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -1,6 +1,17 @@
+from django.db import models
 from rest_framework import serializers
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, RecipeIngredient
+from recipe import names
+
+
+class RelatedListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # a related manager returns its rows in no particular order
+        value = super().get_attribute(instance)
+        if isinstance(value, models.Manager):
+            return value.order_by("id")
+        return value
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -8,6 +19,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ["id", "name"]
         read_only_fields = ["id"]
+        list_serializer_class = RelatedListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -15,6 +27,30 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ["id", "name"]
         read_only_fields = ["id"]
+        list_serializer_class = RelatedListSerializer
+
+
+class MergeSerializer(serializers.Serializer):
+    """other tags or ingredients of the user to merge into one"""
+
+    MAX_SOURCES = 1000
+
+    sources = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_SOURCES,
+        help_text="IDS merged into this one and deleted",
+    )
+    name = serializers.CharField(
+        max_length=255, required=False, help_text="Renames the merged one"
+    )
+
+
+class MergeResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    merged = serializers.IntegerField(help_text="Sources merged and deleted")
+    recipes = serializers.IntegerField(help_text="Recipes that had a source")
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -28,17 +64,23 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def _get_or_create_tags(self, tags, recipe):
         auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, **tag,)
-            recipe.tags.add(tag_obj)
+        recipe.tags.add(*names.tags.resolve(auth_user, [tag["name"] for tag in tags]))
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, create = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ids = names.ingredients.resolve(auth_user, [i["name"] for i in ingredients])
+        recipe.ingredients.add(*ids)
+
+        amounts = {
+            pk: (item.get("quantity"), item.get("unit", ""))
+            for pk, item in zip(ids, ingredients)
+            if item.get("quantity") is not None or item.get("unit")
+        }
+        if amounts:
+            rows = list(recipe.ingredient_amounts.filter(ingredient_id__in=amounts))
+            for row in rows:
+                row.quantity, row.unit = amounts[row.ingredient_id]
+            RecipeIngredient.objects.bulk_update(rows, ["quantity", "unit"])
 
     def create(self, validated_data):
         tags = validated_data.pop("tags", [])
@@ -64,11 +106,194 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
+class RecipeFilterSerializer(serializers.Serializer):
+    """validates the range and ordering query params of the recipe list"""
+
+    ORDERING_FIELDS = ["id", "time_minutes", "price"]
+    ORDERING_CHOICES = ORDERING_FIELDS + [f"-{f}" for f in ORDERING_FIELDS]
+
+    time_minutes__gte = serializers.IntegerField(required=False)
+    time_minutes__lte = serializers.IntegerField(required=False)
+    price__gte = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    price__lte = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, default="-id")
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """query params of the what can I cook ranking"""
+
+    ingredients = serializers.CharField(
+        help_text="Comma seperated list of ingredient IDS on hand"
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate_ingredients(self, value):
+        try:
+            return [int(str_id) for str_id in value.split(",")]
+        except ValueError:
+            raise serializers.ValidationError("expected comma seperated IDS")
+
+
+class CookableRecipeSerializer(RecipeSerializer):
+    """a recipe ranked by the share of its ingredients on hand"""
+
+    coverage = serializers.FloatField()
+    matched_count = serializers.IntegerField()
+    missing_count = serializers.IntegerField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + [
+            "coverage",
+            "matched_count",
+            "missing_count",
+        ]
+
+
+class SimilarQuerySerializer(serializers.Serializer):
+    """query params of the similar recipes ranking"""
+
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    metric = serializers.ChoiceField(
+        choices=["jaccard", "cosine"], default="jaccard"
+    )
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    """a recipe ranked by the tags and ingredients it shares with another"""
+
+    similarity = serializers.FloatField()
+    shared_count = serializers.IntegerField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["similarity", "shared_count"]
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """query params of the change feed"""
+
+    since = serializers.CharField(
+        required=False, help_text="Cursor of the previous sync, omit for all data"
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=1000, required=False)
+
+
+class DeletedSerializer(serializers.Serializer):
+    recipes = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+
+
+class SyncSerializer(serializers.Serializer):
+    """a page of the change feed, created and updated objects and deletes"""
+
+    cursor = serializers.CharField()
+    has_more = serializers.BooleanField()
+    tags = TagSerializer(many=True)
+    ingredients = IngredientSerializer(many=True)
+    recipes = RecipeSerializer(many=True)
+    deleted = DeletedSerializer()
+
+
+class NameCacheCountsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    hit_rate = serializers.FloatField(allow_null=True)
+    loads = serializers.IntegerField()
+    evictions = serializers.IntegerField()
+    users = serializers.IntegerField(help_text="Users with a loaded map")
+
+
+class NameCacheStatsSerializer(serializers.Serializer):
+    tags = NameCacheCountsSerializer()
+    ingredients = NameCacheCountsSerializer()
+
+
+class IngredientAmountListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # the amounts are on the through rows
+        return instance.ingredient_amounts.select_related("ingredient").order_by(
+            "ingredient_id"
+        )
+
+
+class IngredientAmountSerializer(serializers.ModelSerializer):
+    """an ingredient of a recipe with the amount it takes"""
+
+    id = serializers.IntegerField(source="ingredient_id", read_only=True)
+    name = serializers.CharField(source="ingredient.name", max_length=255)
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ["id", "name", "quantity", "unit"]
+        extra_kwargs = {"quantity": {"min_value": 0}}
+        list_serializer_class = IngredientAmountListSerializer
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        return {"name": value.pop("ingredient")["name"], **value}
+
+
 class RecipeDetailSerializer(RecipeSerializer):
+    ingredients = IngredientAmountSerializer(many=True, required=False)
+
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ["description", "image"]
 
 
+class CloneSerializer(serializers.Serializer):
+    title = serializers.CharField(
+        max_length=255, required=False, help_text='Defaults to "<title> (copy)"'
+    )
+
+
+class BulkCloneSerializer(serializers.Serializer):
+    MAX_RECIPES = 100
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_RECIPES
+    )
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    """query params of the shopping list"""
+
+    MAX_RECIPES = 200
+
+    recipes = serializers.CharField(
+        help_text="Comma seperated list of recipe IDS, repeat an ID to count "
+        "it more than once"
+    )
+
+    def validate_recipes(self, value):
+        try:
+            ids = [int(str_id) for str_id in value.split(",")]
+        except ValueError:
+            raise serializers.ValidationError("expected comma seperated IDS")
+        if len(ids) > self.MAX_RECIPES:
+            raise serializers.ValidationError(
+                f"at most {self.MAX_RECIPES} recipes per list"
+            )
+        return ids
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.DecimalField(
+        max_digits=None, decimal_places=3, allow_null=True
+    )
+    unit = serializers.CharField(help_text="g, ml or empty for a count")
+    recipe_count = serializers.IntegerField()
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    items = ShoppingListItemSerializer(many=True)
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """for uplaoding images to recipies"""
 
@@ -77,3 +302,34 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image"]
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": "True"}}
+
+
+class PriceBucketSerializer(serializers.Serializer):
+    min_price = serializers.DecimalField(max_digits=7, decimal_places=2)
+    max_price = serializers.DecimalField(max_digits=7, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class TopItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """aggregated stats over the authenticated user's recipes"""
+
+    recipe_count = serializers.IntegerField()
+    avg_time_minutes = serializers.FloatField(allow_null=True)
+    min_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    max_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    avg_price = serializers.DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+    price_histogram = PriceBucketSerializer(many=True)
+    top_tags = TopItemSerializer(many=True)
+    top_ingredients = TopItemSerializer(many=True)
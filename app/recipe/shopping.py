@@ -0,0 +1,96 @@
+"""
+shopping list over several of a user's recipes
+
+quantities are converted to grams, millilitres or plain counts and
+summed per ingredient in one grouped query. a recipe listed twice counts
+twice. an ingredient used in units that don't convert into each other
+(200 g and 2 cups of flour) gets a line per unit, one without any
+quantity is listed once with none, to taste.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    DecimalField,
+    F,
+    Sum,
+    Value,
+    When,
+)
+
+from core.models import Recipe, RecipeIngredient
+
+# unit -> (unit it is summed in, how many of those it is)
+UNITS = {
+    "": ("", Decimal(1)),
+    "g": ("g", Decimal(1)),
+    "kg": ("g", Decimal(1000)),
+    "oz": ("g", Decimal("28.3495")),
+    "lb": ("g", Decimal("453.592")),
+    "ml": ("ml", Decimal(1)),
+    "l": ("ml", Decimal(1000)),
+    "tsp": ("ml", Decimal("4.92892")),
+    "tbsp": ("ml", Decimal("14.7868")),
+    "cup": ("ml", Decimal("236.588")),
+}
+AMOUNT = DecimalField(max_digits=20, decimal_places=6)
+
+
+def unit_case(value):
+    """`value(unit)` for each unit, as a CASE over the unit column"""
+    return Case(
+        *[When(unit=unit, then=value(unit)) for unit in UNITS],
+        default=None,
+    )
+
+
+def shopping_list(user, recipe_ids):
+    """the summed ingredients of the user's `recipe_ids`, ordered by name"""
+    servings = Counter(recipe_ids)
+    recipes = Recipe.objects.filter(user=user, id__in=servings).values("id")
+    # only repeated recipes need a multiplier
+    multiplier = Case(
+        *[
+            When(recipe_id=recipe_id, then=Value(count))
+            for recipe_id, count in servings.items()
+            if count > 1
+        ],
+        default=Value(1),
+    )
+    rows = (
+        RecipeIngredient.objects.filter(recipe__in=recipes)
+        .annotate(
+            base_unit=unit_case(lambda u: Value(UNITS[u][0], CharField())),
+            amount=F("quantity")
+            * unit_case(lambda u: Value(UNITS[u][1], AMOUNT))
+            * multiplier,
+        )
+        .values("ingredient_id", "ingredient__name", "base_unit")
+        .annotate(
+            quantity=Sum("amount", output_field=AMOUNT),
+            recipe_count=Count("recipe_id", distinct=True),
+        )
+        .order_by("ingredient__name", "ingredient_id", "base_unit")
+    )
+
+    items = []
+    for row in rows:
+        item = {
+            "id": row["ingredient_id"],
+            "name": row["ingredient__name"],
+            "quantity": row["quantity"],
+            "unit": row["base_unit"] if row["quantity"] is not None else "",
+            "recipe_count": row["recipe_count"],
+        }
+        if items and items[-1]["id"] == item["id"]:
+            # drop the to taste line when there are amounts too
+            if item["quantity"] is None:
+                continue
+            if items[-1]["quantity"] is None:
+                items.pop()
+        items.append(item)
+    return items
@@ -0,0 +1,248 @@
+"""
+keeps per user caches, indexes, the change sequence and the outbox in step
+with writes
+"""
+
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import outbox
+from core.models import Recipe, Tag, Ingredient, OutboxEvent
+from recipe import matching, names, stats, sync
+
+
+def on_commit_update_index(registry, user_id, apply):
+    transaction.on_commit(partial(registry.update, user_id, apply))
+
+
+def relation_changes(action, reverse, pk, pk_set, item):
+    """
+    turns an m2m_changed signal into an index update, `item` maps a related
+    object id to the item it is indexed as
+    """
+
+    def apply(index):
+        if action == "post_clear":
+            if reverse:
+                index.remove_item(item(pk))
+            else:
+                index.remove(pk)
+            return
+        update = index.add if action == "post_add" else index.remove
+        if reverse:
+            for recipe_id in pk_set:
+                update(recipe_id, [item(pk)])
+        else:
+            update(pk, [item(related_id) for related_id in pk_set])
+
+    return apply
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_changed(sender, instance, **kw):
+    stats.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kw):
+    names.tags.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kw):
+    names.ingredients.invalidate(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, **kw):
+    if action.startswith("post_"):
+        stats.invalidate(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set, **kw):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    pk = instance.pk
+    on_commit_update_index(
+        matching.ingredients,
+        instance.user_id,
+        relation_changes(action, reverse, pk, pk_set, lambda id: id),
+    )
+    on_commit_update_index(
+        matching.features,
+        instance.user_id,
+        relation_changes(action, reverse, pk, pk_set, lambda id: ("ingredient", id)),
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kw):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    on_commit_update_index(
+        matching.features,
+        instance.user_id,
+        relation_changes(action, reverse, instance.pk, pk_set, lambda id: ("tag", id)),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kw):
+    pk = instance.pk
+    for registry in (matching.ingredients, matching.features):
+        on_commit_update_index(registry, instance.user_id, lambda i: i.remove(pk))
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kw):
+    pk = instance.pk
+    on_commit_update_index(
+        matching.ingredients, instance.user_id, lambda i: i.remove_item(pk)
+    )
+    on_commit_update_index(
+        matching.features,
+        instance.user_id,
+        lambda i: i.remove_item(("ingredient", pk)),
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kw):
+    pk = instance.pk
+    on_commit_update_index(
+        matching.features, instance.user_id, lambda i: i.remove_item(("tag", pk))
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=Ingredient)
+def owned_object_saving(sender, instance, raw, **kw):
+    if not raw:
+        instance.sync_seq = sync.next_seq(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def owned_object_saved(sender, instance, raw, update_fields, **kw):
+    if not raw and update_fields is not None and "sync_seq" not in update_fields:
+        sender.objects.filter(pk=instance.pk).update(sync_seq=instance.sync_seq)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_deleted(sender, instance, **kw):
+    # the through rows go with it, clients drop a deleted tag or ingredient
+    # from their recipes themselves
+    sync.record_deletion(instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_membership_changed(sender, instance, action, reverse, pk_set, **kw):
+    if reverse and action == "pre_clear":
+        # the recipes are gone from the through table after the clear
+        field = instance._meta.model_name
+        recipe_ids = sender.objects.filter(**{field: instance}).values("recipe_id")
+    elif action in ("post_add", "post_remove") and pk_set:
+        recipe_ids = pk_set if reverse else [instance.pk]
+    elif action == "post_clear" and not reverse:
+        recipe_ids = [instance.pk]
+    else:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        sync_seq=sync.next_seq(instance.user_id)
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kw):
+    # deleting the user's rows in the cascade left tombstones behind
+    sync.forget(instance.pk)
+    names.tags.drop(instance.pk)
+    names.ingredients.drop(instance.pk)
+
+
+# the outbox receivers come last, after the ones above took the user's change
+# sequence lock, see core.outbox
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def owned_object_saved_event(sender, instance, created, raw, **kw):
+    if not raw:
+        action = OutboxEvent.CREATED if created else OutboxEvent.UPDATED
+        outbox.append([outbox.describe(instance, action)])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_deleted_event(sender, instance, **kw):
+    outbox.append([outbox.describe(instance, OutboxEvent.DELETED)])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_membership_event(sender, instance, action, reverse, pk_set, **kw):
+    field = "tags" if sender is Recipe.tags.through else "ingredients"
+    change = {"post_add": "added", "post_remove": "removed"}.get(action)
+    if reverse and action == "pre_clear":
+        column = instance._meta.model_name
+        rows = sender.objects.filter(**{column: instance})
+        recipe_ids = list(rows.values_list("recipe_id", flat=True))
+        payload = {"field": field, "removed": [instance.pk]}
+    elif reverse and change:
+        recipe_ids, payload = pk_set, {"field": field, change: [instance.pk]}
+    elif change and pk_set:
+        recipe_ids, payload = [instance.pk], {"field": field, change: sorted(pk_set)}
+    elif action == "post_clear" and not reverse:
+        recipe_ids, payload = [instance.pk], {"field": field, "cleared": True}
+    else:
+        return
+    outbox.append(
+        [
+            OutboxEvent(
+                user_id=instance.user_id,
+                kind="recipe",
+                object_id=recipe_id,
+                action=OutboxEvent.RELATIONS,
+                payload=payload,
+            )
+            for recipe_id in sorted(recipe_ids or [])
+        ]
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted_event(sender, instance, **kw):
+    # consumers drop everything of the account, the batched deletion in
+    # user.deletion sends no signals for the rows themselves
+    outbox.append(
+        [
+            OutboxEvent(
+                user_id=instance.pk,
+                kind="user",
+                object_id=instance.pk,
+                action=OutboxEvent.DELETED,
+            )
+        ]
+    )
@@ -0,0 +1,92 @@
+"""
+per user recipe statistics computed with aggregate queries
+
+results are cached per user in the default cache and dropped by
+recipe.signals on any write to the user's recipes, tags or ingredients,
+right away and again once it commits, for a read that cached the numbers
+from before.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, DecimalField, F, Max, Min, Value
+from django.db.models.functions import Floor
+
+from core.models import Recipe, Tag, Ingredient
+
+TOP_ITEMS = 5
+
+
+def cache_key(user_id):
+    return f"recipe-stats:{user_id}"
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+    transaction.on_commit(partial(cache.delete, cache_key(user_id)))
+
+
+def price_histogram(recipes, width):
+    """counts recipes per price bucket of `width`, grouped in the database"""
+    buckets = (
+        recipes.annotate(
+            bucket=Floor(
+                F("price") / Value(width),
+                output_field=DecimalField(max_digits=7, decimal_places=0),
+            )
+        )
+        .values("bucket")
+        .annotate(count=Count("id"))
+        .order_by("bucket")
+    )
+    return [
+        {
+            "min_price": row["bucket"] * width,
+            "max_price": (row["bucket"] + 1) * width,
+            "count": row["count"],
+        }
+        for row in buckets
+    ]
+
+
+def top_items(model, user):
+    """the user's most used tags or ingredients"""
+    return list(
+        model.objects.filter(user=user, recipe__isnull=False)
+        .values("id", "name")
+        .annotate(recipe_count=Count("recipe"))
+        .order_by("-recipe_count", "name")[:TOP_ITEMS]
+    )
+
+
+def compute_stats(user):
+    recipes = Recipe.objects.filter(user=user)
+    stats = recipes.aggregate(
+        recipe_count=Count("id"),
+        avg_time_minutes=Avg("time_minutes"),
+        min_price=Min("price"),
+        max_price=Max("price"),
+        avg_price=Avg("price"),
+    )
+    stats["price_histogram"] = price_histogram(
+        recipes, settings.RECIPE_STATS_PRICE_BUCKET
+    )
+    stats["top_tags"] = top_items(Tag, user)
+    stats["top_ingredients"] = top_items(Ingredient, user)
+    return stats
+
+
+def get_stats(user, serialize):
+    """
+    returns the cached stats for `user`, `serialize` turns the raw
+    aggregates into what gets cached and returned
+    """
+    key = cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = serialize(compute_stats(user))
+        cache.set(key, stats, settings.RECIPE_STATS_CACHE_SECONDS)
+    return stats
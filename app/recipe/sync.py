@@ -0,0 +1,187 @@
+"""
+delta sync for offline clients
+
+every write of a user's recipe, tag or ingredient stores the next number
+of their change sequence (core.SyncState) in the row's `sync_seq`, tag and
+ingredient membership changes renumber the recipe and deletes leave a
+Tombstone. `changes()` pages through everything after a cursor in
+(seq, kind, id) order, so a client downloads what changed since its last
+sync instead of its whole library.
+
+the sequence row stays locked until the writing transaction commits, so a
+user's writes commit in sequence order and a cursor can't skip one that
+was still in flight. the views write in transaction.atomic() for that.
+
+tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are compacted away,
+cursors from before them get a 410 and the client syncs from scratch.
+"""
+
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+
+from core.models import Recipe, Tag, Ingredient, SyncState, Tombstone
+from recipe import fast_serializers
+
+# feed order of the rows sharing a seq, tombstones last
+SOURCES = [Tag, Ingredient, Recipe, Tombstone]
+END = len(SOURCES)
+TOMBSTONE_KINDS = {
+    Recipe: Tombstone.RECIPE,
+    Tag: Tombstone.TAG,
+    Ingredient: Tombstone.INGREDIENT,
+}
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Cursor predates the retained deletions, sync without `since`"
+    default_code = "cursor_expired"
+
+
+def next_seq(user_id):
+    """takes the user's next change number, locks their sequence row"""
+    quote = connection.ops.quote_name
+    table = quote(SyncState._meta.db_table)
+    seq = quote("seq")
+    sql = (
+        f"UPDATE {table} SET {seq} = {seq} + 1 "
+        f"WHERE {quote('user_id')} = %s RETURNING {seq}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id])
+        row = cursor.fetchone()
+    if row is None:
+        SyncState.objects.get_or_create(user_id=user_id)
+        return next_seq(user_id)
+    return row[0]
+
+
+def record_deletion(instance):
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        kind=TOMBSTONE_KINDS[type(instance)],
+        object_id=instance.pk,
+        sync_seq=next_seq(instance.user_id),
+    )
+
+
+def forget(user_id):
+    """drops the sync state of a deleted user"""
+    Tombstone.objects.filter(user_id=user_id).delete()
+    SyncState.objects.filter(user_id=user_id).delete()
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(encoded):
+    try:
+        seq, rank, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        return int(seq), int(rank), int(pk)
+    except Exception:
+        raise NotFound("Invalid cursor")
+
+
+def after(queryset, rank, position):
+    """the rows of source `rank` that come after `position`"""
+    seq, position_rank, pk = position
+    if rank > position_rank:
+        return queryset.filter(sync_seq__gte=seq)
+    if rank == position_rank:
+        return queryset.filter(Q(sync_seq__gt=seq) | Q(sync_seq=seq, id__gt=pk))
+    return queryset.filter(sync_seq__gt=seq)
+
+
+def changes(user_id, cursor=None, limit=None):
+    """
+    up to `limit` changes after `cursor`, everything from the start without
+    one. returns {"cursor", "has_more", "tags", "ingredients", "recipes",
+    "deleted"}, the returned cursor continues where this page ends
+    """
+    limit = limit or settings.SYNC_PAGE_SIZE
+    state = SyncState.objects.filter(user_id=user_id).values("seq", "horizon")
+    state = state.first() or {"seq": 0, "horizon": 0}
+    position = (-1, END, 0)
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        if state["horizon"] and position[:2] < (state["horizon"], END):
+            raise CursorExpired()
+
+    # the head is read first, later writes are left for the next sync
+    head = state["seq"]
+    keys = []
+    for rank, model in enumerate(SOURCES):
+        rows = model.objects.filter(user_id=user_id, sync_seq__lte=head)
+        rows = after(rows, rank, position).order_by("sync_seq", "id")
+        keys += [
+            (seq, rank, pk)
+            for seq, pk in rows.values_list("sync_seq", "id")[: limit + 1]
+        ]
+    keys.sort()
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    ids = [[] for _ in SOURCES]
+    for _, rank, pk in keys:
+        ids[rank].append(pk)
+
+    def serialize(serializer, rank):
+        if not ids[rank]:
+            return []
+        queryset = serializer.model.objects.filter(pk__in=ids[rank])
+        return serializer(queryset.order_by("sync_seq", "id")).data
+
+    deleted = {"recipes": [], "tags": [], "ingredients": []}
+    if ids[END - 1]:
+        tombstones = Tombstone.objects.filter(pk__in=ids[END - 1])
+        tombstones = tombstones.order_by("sync_seq", "id")
+        for kind, object_id in tombstones.values_list("kind", "object_id"):
+            deleted[f"{kind}s"].append(object_id)
+
+    return {
+        "cursor": encode_cursor(keys[-1] if has_more else (head, END, 0)),
+        "has_more": has_more,
+        "tags": serialize(fast_serializers.TagValuesSerializer, 0),
+        "ingredients": serialize(fast_serializers.IngredientValuesSerializer, 1),
+        "recipes": serialize(fast_serializers.RecipeValuesSerializer, 2),
+        "deleted": deleted,
+    }
+
+
+def compact(before=None, batch_size=1000):
+    """
+    deletes the tombstones older than `before`, by default the retention
+    period, and moves each user's horizon past them. returns the number
+    deleted
+    """
+    if before is None:
+        days = settings.SYNC_TOMBSTONE_RETENTION_DAYS
+        before = timezone.now() - timedelta(days=days)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Tombstone.objects.filter(deleted_at__lt=before)
+                .order_by("id")
+                .values_list("id", "user_id", "sync_seq")[:batch_size]
+            )
+            if not rows:
+                return deleted
+            horizons = {}
+            for _, user_id, seq in rows:
+                horizons[user_id] = max(horizons.get(user_id, 0), seq)
+            for user_id, seq in horizons.items():
+                SyncState.objects.filter(user_id=user_id, horizon__lt=seq).update(
+                    horizon=seq
+                )
+            Tombstone.objects.filter(id__in=[row[0] for row in rows]).delete()
+            deleted += len(rows)
@@ -0,0 +1,124 @@
+"""tests for cloning recipes"""
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeIngredient
+from core.tests.factories import (
+    create_user,
+    create_tags,
+    create_ingredients,
+    create_recipe,
+    create_recipes,
+)
+from recipe import matching
+
+CLONE_MANY_URL = reverse("recipe:recipe-clone-many")
+
+
+def clone_url(recipe_id):
+    return reverse("recipe:recipe-clone", args=[recipe_id])
+
+
+class CloneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tags = create_tags(cls.user, ["vegan", "quick"])
+        cls.flour, cls.salt = create_ingredients(cls.user, ["flour", "salt"])
+        cls.recipe = create_recipe(
+            cls.user, title="bread", image="uploads/recipe/abc.jpg"
+        )
+        cls.recipe.tags.add(*cls.tags)
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=cls.recipe,
+                    ingredient=cls.flour,
+                    quantity=Decimal("500"),
+                    unit="g",
+                ),
+                RecipeIngredient(recipe=cls.recipe, ingredient=cls.salt),
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_clone(self):
+        with self.assertNumQueries(13):
+            res = self.client.post(clone_url(self.recipe.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        copy = Recipe.objects.get(pk=res.data["id"])
+        self.assertNotEqual(copy.pk, self.recipe.pk)
+        self.assertEqual(copy.title, "bread (copy)")
+        self.assertEqual(copy.image.name, self.recipe.image.name)
+        self.assertEqual(list(copy.tags.order_by("id")), self.tags)
+        self.assertEqual(
+            list(
+                copy.ingredient_amounts.order_by("ingredient_id").values_list(
+                    "ingredient_id", "quantity", "unit"
+                )
+            ),
+            [(self.flour.pk, Decimal("500"), "g"), (self.salt.pk, None, "")],
+        )
+        self.assertGreater(copy.sync_seq, self.recipe.sync_seq)
+        self.assertEqual(res.data["ingredients"][0]["quantity"], "500.000")
+
+    def test_clone_title(self):
+        res = self.client.post(clone_url(self.recipe.pk), {"title": "rye bread"})
+
+        self.assertEqual(res.data["title"], "rye bread")
+
+    def test_clone_other_users_recipe(self):
+        other = create_recipe(create_user())
+
+        res = self.client.post(clone_url(other.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_clone_many(self):
+        recipes = create_recipes(self.user, 3, tags=self.tags[:1])
+        ids = [recipe.pk for recipe in recipes]
+
+        res = self.client.post(CLONE_MANY_URL, {"ids": ids}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [r["title"] for r in res.data], [f"{r.title} (copy)" for r in recipes]
+        )
+        self.assertEqual([r["tags"][0]["name"] for r in res.data], ["vegan"] * 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 7)
+
+    def test_clone_many_unknown_ids(self):
+        other = create_recipe(create_user())
+
+        res = self.client.post(
+            CLONE_MANY_URL, {"ids": [self.recipe.pk, other.pk]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_matching_index_sees_clone(self):
+        cache.clear()
+        matching.ingredients.clear()
+        self.addCleanup(matching.ingredients.clear)
+        matching.ingredients.get(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(clone_url(self.recipe.pk))
+
+        index = matching.ingredients.get(self.user.pk)
+        self.assertEqual(
+            sorted(m[0] for m in index.match([self.flour.pk, self.salt.pk])),
+            [self.recipe.pk, res.data["id"]],
+        )
@@ -0,0 +1,83 @@
+"""tests the read only values serializers against the DRF serializers"""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag
+from core.tests.factories import create_user, create_tags, create_ingredients
+from recipe.serializers import RecipeSerializer, TagSerializer
+from recipe.fast_serializers import RecipeValuesSerializer, TagValuesSerializer
+
+
+class ValuesSerializerConformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user@example.com", "password12")
+        cls.tags = create_tags(cls.user, ["Breakfast", "Vegan", "Quick"])
+        cls.ingredients = create_ingredients(cls.user, ["Oats", "Milk", "Honey"])
+        prices = [Decimal("5.5"), Decimal("0"), Decimal("999.99"), Decimal("1.05")]
+        for i, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=cls.user,
+                title=f"recipe {i} é\"quoted\"",
+                time_minutes=i * 7,
+                price=price,
+                link="" if i % 2 else "https://example.com/r.pdf",
+            )
+            recipe.tags.add(*cls.tags[: i % 4])
+            recipe.ingredients.add(*cls.ingredients[: (i + 1) % 4])
+
+    def test_recipe_list_output_is_identical(self):
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id").distinct()
+        expected = JSONRenderer().render(RecipeSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(
+            RecipeValuesSerializer(queryset, many=True).data
+        )
+
+        self.assertEqual(actual, expected)
+
+    def test_single_recipe_output_is_identical(self):
+        recipe = Recipe.objects.filter(user=self.user).order_by("id").last()
+        expected = JSONRenderer().render(RecipeSerializer(recipe).data)
+        actual = JSONRenderer().render(RecipeValuesSerializer(recipe, many=False).data)
+
+        self.assertEqual(actual, expected)
+
+    def test_nested_ordered_by_id(self):
+        recipe = Recipe.objects.create(user=self.user, title="added backwards")
+        for tag in reversed(self.tags):
+            recipe.tags.add(tag)
+        for ingredient in reversed(self.ingredients):
+            recipe.ingredients.add(ingredient)
+
+        with CaptureQueriesContext(connection) as queries:
+            expected = RecipeSerializer(recipe).data
+        actual = RecipeValuesSerializer(recipe, many=False).data
+
+        # without ORDER BY the database may return them in any order
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all("ORDER BY" in query["sql"] for query in queries))
+
+        self.assertEqual([t["id"] for t in expected["tags"]], [t.id for t in self.tags])
+        self.assertEqual(
+            [i["id"] for i in expected["ingredients"]],
+            [i.id for i in self.ingredients],
+        )
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_tag_list_output_is_identical(self):
+        queryset = Tag.objects.filter(user=self.user).order_by("-name")
+        expected = JSONRenderer().render(TagSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(TagValuesSerializer(queryset, many=True).data)
+
+        self.assertEqual(actual, expected)
+
+    def test_empty_queryset(self):
+        queryset = Recipe.objects.none()
+
+        self.assertEqual(RecipeValuesSerializer(queryset, many=True).data, [])
@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
@@ -8,6 +7,7 @@ from rest_framework.test import APIClient
 from decimal import Decimal
 
 from core.models import Ingredient, Recipe
+from core.tests.factories import create_user
 from recipe.serializers import IngredientSerializer
 
 INGREDIENT_URL = reverse("recipe:ingredient-list")
@@ -17,10 +17,6 @@ def detail_url(ingredient_id):
     return reverse("recipe:ingredient-detail", args=[ingredient_id])
 
 
-def create_user(email="email@example.com", password="password"):
-    return get_user_model().objects.create_user(email=email, password=password)
-
-
 class PublicIngredientsAPITests(TestCase):
     """UnAuthenticated endpoints tests"""
 
@@ -32,8 +28,11 @@ class PublicIngredientsAPITests(TestCase):
 class PrivateIngredientsAPITests(TestCase):
     """Authenticated endpoitns tests"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("email@example.com", "password")
+
     def setUp(self):
-        self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -0,0 +1,257 @@
+"""tests for the recipe set indexes, what can I cook and similar recipes"""
+
+import threading
+import tracemalloc
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.factories import create_user, create_ingredients
+from core.tests.utils import TempDirMixin
+from recipe import matching
+
+COOKABLE_URL = reverse("recipe:recipe-cookable")
+
+
+def similar_url(recipe_id):
+    return reverse("recipe:recipe-similar", args=[recipe_id])
+
+
+class IngredientIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = matching.RecipeSetIndex()
+        self.index.add(1, [10, 11])  # pancakes: eggs, flour
+        self.index.add(2, [10, 11, 12, 13])  # cake: eggs, flour, sugar, butter
+        self.index.add(3, [10])  # boiled eggs
+        self.index.add(4, [14, 15])  # salad
+
+    def test_counter(self):
+        planes = []
+        for bitmap in [0b0111, 0b0110, 0b0100]:
+            matching.add_to_counter(planes, bitmap)
+
+        self.assertEqual(matching.counter_equals(planes, 1, 0b1111), 0b0001)
+        self.assertEqual(matching.counter_equals(planes, 2, 0b1111), 0b0010)
+        self.assertEqual(matching.counter_equals(planes, 3, 0b1111), 0b0100)
+        self.assertEqual(matching.counter_equals(planes, 4, 0b1111), 0)
+
+    def test_ranked_by_coverage_then_missing(self):
+        results = self.index.match([10, 11])
+
+        self.assertEqual(results, [(1, 2, 2), (3, 1, 1), (2, 2, 4)])
+
+    def test_limit_and_no_match(self):
+        self.assertEqual(len(self.index.match([10], limit=1)), 1)
+        self.assertEqual(self.index.match([99]), [])
+
+    def test_incremental_remove(self):
+        self.index.remove(1, [11])
+        self.assertEqual(self.index.match([11]), [(2, 1, 4)])
+
+        self.index.remove(2)
+        self.index.remove_item(10)
+        self.assertEqual(self.index.match([10, 11, 12]), [])
+        self.assertEqual(self.index.sizes, {2: 1 << 3})
+
+    def test_ties_ordered_by_recipe_id(self):
+        self.index.add(9, [20])
+        self.index.add(7, [20])
+
+        self.assertEqual(self.index.match([20]), [(7, 1, 1), (9, 1, 1)])
+
+    def test_similar(self):
+        self.assertEqual(self.index.similar(1), [(2, 2, 4), (3, 1, 1)])
+        # cosine favours the small boiled eggs recipe over the cake
+        self.assertEqual(self.index.similar(3, metric="cosine"), [(1, 1, 2), (2, 1, 4)])
+        self.assertEqual(self.index.similar(4), [])
+        self.assertEqual(self.index.similar(99), [])
+
+
+class IndexRegistryTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # 20000 recipes with one of 50 ingredients each
+        self.registry = matching.IndexRegistry(
+            "test-index", lambda user_id: ((i, i % 50) for i in range(20000))
+        )
+        self.index = self.registry.get(1)
+
+    def test_update_only_touches_changed_entries(self):
+        tracemalloc.start()
+        try:
+            self.registry.update(1, lambda index: index.add(7, [100]))
+            allocated = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        # a few 20000 bit bitmaps, copying the per recipe maps takes megabytes
+        self.assertLess(allocated, 64 * 1024)
+        self.assertIs(self.registry.get(1), self.index)
+        self.assertEqual(self.index.match([100]), [(7, 1, 2)])
+
+    def test_update_waits_for_running_query(self):
+        update = threading.Thread(
+            target=self.registry.update, args=(1, lambda index: index.add(7, [100]))
+        )
+        with self.index.lock:
+            update.start()
+            update.join(0.1)
+            self.assertTrue(update.is_alive())
+            self.assertEqual(self.index.match([100]), [])
+        update.join()
+
+        self.assertEqual(self.index.match([100]), [(7, 1, 2)])
+
+
+class CookableAPITests(TempDirMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user@example.com", "password12")
+        cls.eggs, cls.flour, cls.sugar = create_ingredients(
+            cls.user, ["eggs", "flour", "sugar"]
+        )
+
+    def setUp(self):
+        cache.clear()
+        matching.ingredients.clear()
+        self.addCleanup(matching.ingredients.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, price=Decimal("2.00")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def get(self, ingredients):
+        ids = ",".join(str(i.id) for i in ingredients)
+        return self.client.get(COOKABLE_URL, {"ingredients": ids})
+
+    def test_ranking(self):
+        pancakes = self.create_recipe("pancakes", [self.eggs, self.flour])
+        cake = self.create_recipe("cake", [self.eggs, self.flour, self.sugar])
+        other = get_user_model().objects.create_user("o@example.com", "password12")
+        Recipe.objects.create(user=other, title="not mine").ingredients.add(self.eggs)
+
+        res = self.get([self.eggs, self.flour])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data], [pancakes.id, cake.id])
+        self.assertEqual(res.data[0]["coverage"], 1.0)
+        self.assertEqual(res.data[1]["missing_count"], 1)
+        self.assertEqual(res.data[1]["title"], "cake")
+        self.assertEqual(len(res.data[1]["ingredients"]), 3)
+
+    def test_index_updated_on_change(self):
+        recipe = self.create_recipe("meringue", [self.eggs])
+        self.assertEqual(len(self.get([self.eggs]).data), 1)
+
+        with self.assertNumQueries(3):
+            # served from the loaded index, only the matched recipes, their
+            # tags and ingredients are read for the response
+            self.get([self.eggs])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients.remove(self.eggs)
+            self.sugar.recipe_set.add(recipe)
+        self.assertEqual(self.get([self.eggs]).data, [])
+        self.assertEqual(self.get([self.sugar]).data[0]["id"], recipe.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.get([self.sugar]).data, [])
+
+    def test_rebuilt_after_change_in_other_process(self):
+        recipe = self.create_recipe("meringue", [self.eggs])
+        with self.shared_cache() as other:
+            self.get([self.eggs])
+
+            # a write seen only by another process bumps the shared version
+            # through its own cache client
+            Recipe.ingredients.through.objects.create(
+                recipe=recipe, ingredient=self.sugar
+            )
+            with patch.object(matching, "cache", other):
+                matching.ingredients.bump_version(self.user.pk)
+
+            res = self.get([self.eggs])
+        self.assertEqual(res.data[0]["missing_count"], 1)
+
+    def test_invalid_params(self):
+        res = self.client.get(COOKABLE_URL, {"ingredients": "eggs"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(COOKABLE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SimilarAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user@example.com", "password12")
+        cls.eggs, cls.flour = create_ingredients(cls.user, ["eggs", "flour"])
+        cls.dessert = Tag.objects.create(user=cls.user, name="dessert")
+
+    def setUp(self):
+        cache.clear()
+        matching.features.clear()
+        self.addCleanup(matching.features.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, ingredients=(), tags=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, price=Decimal("2.00")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients.add(*ingredients)
+            recipe.tags.add(*tags)
+        return recipe
+
+    def test_ranked_by_shared_tags_and_ingredients(self):
+        crepes = self.create_recipe("crepes", [self.eggs, self.flour], [self.dessert])
+        pancakes = self.create_recipe("pancakes", [self.eggs, self.flour])
+        omelette = self.create_recipe("omelette", [self.eggs])
+        self.create_recipe("water")
+
+        res = self.client.get(similar_url(pancakes.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data], [crepes.id, omelette.id])
+        self.assertEqual(res.data[0]["shared_count"], 2)
+        self.assertEqual(res.data[0]["similarity"], round(2 / 3, 4))
+        self.assertEqual(res.data[1]["similarity"], 0.5)
+
+    def test_index_updated_on_tag_changes(self):
+        cake = self.create_recipe("cake", tags=[self.dessert])
+        pie = self.create_recipe("pie", tags=[self.dessert])
+        self.assertEqual(self.client.get(similar_url(cake.id)).data[0]["id"], pie.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dessert.delete()
+        self.assertEqual(self.client.get(similar_url(cake.id)).data, [])
+
+    def test_other_users_recipe_not_found(self):
+        other = get_user_model().objects.create_user("o@example.com", "password12")
+        recipe = Recipe.objects.create(user=other, title="not mine")
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_metric(self):
+        recipe = self.create_recipe("cake")
+
+        res = self.client.get(similar_url(recipe.id), {"metric": "euclid"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,226 @@
+"""tests for merging tags and ingredients"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeIngredient, Tag, Ingredient, Tombstone
+from core.tests.factories import (
+    create_user,
+    create_tags,
+    create_ingredients,
+    create_recipe,
+    create_recipes,
+)
+from recipe import matching, merge
+
+
+def merge_url(kind, pk):
+    return reverse(f"recipe:{kind}-merge", args=[pk])
+
+
+class MergeTagsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tomato, cls.tomatoes, cls.toms, cls.other = create_tags(
+            cls.user, ["tomato", "Tomatoes", "toms", "basil"]
+        )
+        cls.both = create_recipe(cls.user, title="both")
+        cls.both.tags.add(cls.tomato, cls.tomatoes, cls.other)
+        cls.sources = create_recipe(cls.user, title="sources")
+        cls.sources.tags.add(cls.tomatoes, cls.toms)
+        cls.untouched = create_recipe(cls.user, title="untouched")
+        cls.untouched.tags.add(cls.other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, target, sources, **params):
+        return self.client.post(
+            merge_url("tag", target.pk),
+            {"sources": [s.pk for s in sources], **params},
+            format="json",
+        )
+
+    def test_merge(self):
+        seqs = dict(Recipe.objects.values_list("id", "sync_seq"))
+        res = self.post(self.tomato, [self.tomatoes, self.toms], name="Tomato")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {"id": self.tomato.pk, "name": "Tomato", "merged": 2, "recipes": 2},
+        )
+        self.assertEqual(
+            sorted(self.both.tags.values_list("name", flat=True)), ["Tomato", "basil"]
+        )
+        self.assertEqual(list(self.sources.tags.all()), [self.tomato])
+        self.assertFalse(Tag.objects.filter(pk__in=[self.tomatoes.pk, self.toms.pk]))
+        self.assertEqual(
+            Tombstone.objects.filter(kind="tag").count(), 2, "clients drop the sources"
+        )
+        changed = dict(Recipe.objects.values_list("id", "sync_seq"))
+        self.assertGreater(changed[self.both.pk], seqs[self.both.pk])
+        self.assertGreater(changed[self.sources.pk], seqs[self.sources.pk])
+        self.assertEqual(changed[self.untouched.pk], seqs[self.untouched.pk])
+
+    def test_sequence_locked_before_sources(self):
+        # recipe writes lock the sequence row first, the tags after it
+        with CaptureQueriesContext(connection) as queries:
+            merge.merge(self.tomato, [self.tomatoes.pk])
+
+        statements = [query["sql"] for query in queries]
+        first_tag = next(i for i, sql in enumerate(statements) if "core_tag" in sql)
+        self.assertIn("core_syncstate", " ".join(statements[:first_tag]))
+
+    def test_sources_must_be_own(self):
+        foreign = create_tags(create_user(), ["tomato"])[0]
+
+        res = self.post(self.tomato, [self.toms, foreign])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(pk=self.toms.pk).exists())
+
+    def test_target_must_be_own(self):
+        foreign = create_tags(create_user(), ["tomato"])[0]
+
+        res = self.post(foreign, [self.toms])
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_merge_into_itself(self):
+        res = self.post(self.tomato, [self.tomato])
+
+        self.assertEqual(res.data["merged"], 0)
+        self.assertTrue(Tag.objects.filter(pk=self.tomato.pk).exists())
+
+
+class MergeIngredientsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tomato, cls.tomatoes, cls.toms = create_ingredients(
+            cls.user, ["tomato", "tomatoes", "toms"]
+        )
+
+    def setUp(self):
+        cache.clear()
+        matching.ingredients.clear()
+        self.addCleanup(matching.ingredients.clear)
+
+    def add(self, recipe, ingredient, quantity):
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, quantity=Decimal(quantity), unit="g"
+        )
+
+    def test_amounts(self):
+        recipe = create_recipe(self.user)
+        self.add(recipe, self.tomatoes, "100")
+        self.add(recipe, self.tomato, "200")
+        sources_only = create_recipe(self.user)
+        self.add(sources_only, self.tomatoes, "300")
+        self.add(sources_only, self.toms, "400")
+
+        merge.merge(self.tomato, [self.tomatoes.pk, self.toms.pk])
+
+        rows = RecipeIngredient.objects.values_list("recipe_id", "quantity")
+        self.assertEqual(
+            sorted(rows),
+            [(recipe.pk, Decimal("200")), (sources_only.pk, Decimal("300"))],
+        )
+
+    def test_amounts_of_sources_kept(self):
+        eggs, egg, an_egg = create_ingredients(self.user, ["eggs", "egg", "an egg"])
+        has_target = create_recipe(self.user)
+        RecipeIngredient.objects.create(recipe=has_target, ingredient=eggs)
+        self.add(has_target, egg, "2")
+        sources_only = create_recipe(self.user)
+        RecipeIngredient.objects.create(recipe=sources_only, ingredient=egg)
+        self.add(sources_only, an_egg, "3")
+
+        merge.merge(eggs, [egg.pk, an_egg.pk])
+
+        rows = RecipeIngredient.objects.filter(ingredient=eggs)
+        self.assertEqual(
+            sorted(rows.values_list("recipe_id", "quantity", "unit")),
+            [(has_target.pk, Decimal("2"), "g"), (sources_only.pk, Decimal("3"), "g")],
+        )
+
+    def test_statement_count_independent_of_recipes(self):
+        counts = []
+        # the first merge also sets up the user's change sequence
+        for recipes in (1, 2, 40):
+            target, source = create_ingredients(self.user, ["salt", "Salt"])
+            create_recipes(self.user, recipes, ingredients=[source])
+            with CaptureQueriesContext(connection) as queries:
+                merge.merge(target, [source.pk])
+            counts.append(len(queries))
+
+        self.assertEqual(counts[1], counts[2])
+
+    def test_matching_index_rebuilt(self):
+        recipe = create_recipe(self.user)
+        self.add(recipe, self.toms, "1")
+        index = matching.ingredients.get(self.user.pk)
+        self.assertEqual(index.match([self.tomato.pk]), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            merge.merge(self.tomato, [self.toms.pk])
+
+        index = matching.ingredients.get(self.user.pk)
+        self.assertEqual([m[0] for m in index.match([self.tomato.pk])], [recipe.pk])
+
+
+class MergeCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("cook@example.com")
+        cls.ingredients = create_ingredients(
+            cls.user, ["Tomato", "tomato ", "TOMATO", "basil", "Basil", "salt"]
+        )
+        cls.recipe = create_recipe(cls.user)
+        cls.recipe.ingredients.add(*cls.ingredients)
+
+    def call(self, *args):
+        out = StringIO()
+        call_command("merge_duplicates", *args, stdout=out)
+        return out.getvalue()
+
+    def test_case_duplicates(self):
+        out = self.call("ingredients", "cook@example.com", "--case")
+
+        self.assertIn("Merged 3 ingredients over 2 recipes~!", out)
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list("name", flat=True)),
+            ["Tomato", "basil", "salt"],
+        )
+        self.assertEqual(self.recipe.ingredients.count(), 3)
+
+    def test_explicit_ids(self):
+        tomato, _, caps, *_ = self.ingredients
+        self.call("ingredients", "cook@example.com", str(tomato.pk), str(caps.pk))
+
+        self.assertFalse(Ingredient.objects.filter(pk=caps.pk).exists())
+        self.assertEqual(Ingredient.objects.count(), 5)
+
+    def test_usage_errors(self):
+        for args in [
+            ["ingredients", "cook@example.com"],
+            ["ingredients", "nobody@example.com", "--case"],
+            ["ingredients", "cook@example.com", "--case", "--name", "x"],
+            ["tags", "cook@example.com", str(self.ingredients[0].pk), "1"],
+        ]:
+            with self.assertRaises(CommandError):
+                self.call(*args)
@@ -0,0 +1,156 @@
+"""tests for the tag and ingredient name caches of recipe writes"""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.factories import create_user, create_tags, create_ingredients
+from core.tests.utils import TempDirMixin
+from recipe import names
+
+RECIPES_URL = reverse("recipe:recipe-list")
+NAME_CACHE_URL = reverse("recipe:name-cache")
+
+
+class NameCacheTests(TempDirMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.vegan, cls.quick = create_tags(cls.user, ["vegan", "quick"])
+
+    def setUp(self):
+        cache.clear()
+        names.tags.clear()
+        self.addCleanup(names.tags.clear)
+
+    def test_loaded_once(self):
+        with self.assertNumQueries(1):
+            ids = names.tags.resolve(self.user, ["quick", "vegan"])
+        with self.assertNumQueries(0):
+            again = names.tags.resolve(self.user, ["vegan", "quick", "vegan"])
+
+        self.assertEqual(ids, [self.quick.id, self.vegan.id])
+        self.assertEqual(again, [self.vegan.id, self.quick.id, self.vegan.id])
+        stats = names.tags.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["loads"]), (5, 0, 1))
+        self.assertEqual(stats["hit_rate"], 1.0)
+
+    def test_new_names_created(self):
+        ids = names.tags.resolve(self.user, ["vegan", "spicy"])
+
+        spicy = Tag.objects.get(user=self.user, name="spicy")
+        self.assertEqual(ids, [self.vegan.id, spicy.id])
+        self.assertEqual(names.tags.stats()["misses"], 1)
+
+    def test_oldest_of_same_named(self):
+        create_tags(self.user, ["vegan"])
+
+        self.assertEqual(names.tags.resolve(self.user, ["vegan"]), [self.vegan.id])
+
+    def test_dropped_on_change(self):
+        names.tags.resolve(self.user, ["vegan"])
+        self.vegan.name = "plant based"
+        self.vegan.save()
+
+        self.assertNotIn(self.user.id, names.tags.maps)
+        ids = names.tags.resolve(self.user, ["vegan", "plant based"])
+        self.assertNotEqual(ids[0], self.vegan.id)
+        self.assertEqual(ids[1], self.vegan.id)
+
+    def test_not_kept_for_uncommitted_changes(self):
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name="spicy")
+            names.tags.resolve(self.user, ["spicy"])
+
+            self.assertNotIn(self.user.id, names.tags.maps)
+
+    def test_reloaded_after_commit_elsewhere(self):
+        with self.shared_cache() as other:
+            names.tags.resolve(self.user, ["vegan"])
+            # another process renamed the tag, through its own cache client
+            Tag.objects.filter(pk=self.vegan.pk).update(name="plant based")
+            with patch.object(names, "cache", other):
+                names.tags.bump_version(self.user.id)
+
+            with self.assertNumQueries(1):
+                ids = names.tags.resolve(self.user, ["plant based"])
+        self.assertEqual(ids, [self.vegan.id])
+
+    @override_settings(NAME_CACHE_MAX_USERS=1)
+    def test_least_recently_used_evicted(self):
+        other = create_user("other@example.com")
+        create_tags(other, ["vegan"])
+        names.tags.resolve(self.user, ["vegan"])
+        names.tags.resolve(other, ["vegan"])
+
+        self.assertEqual(list(names.tags.maps), [other.id])
+        self.assertEqual(names.tags.stats()["evictions"], 1)
+
+
+class NameCacheAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        create_tags(cls.user, ["vegan", "quick"])
+        create_ingredients(cls.user, ["salt", "pepper", "eggs"])
+
+    def setUp(self):
+        cache.clear()
+        names.tags.clear()
+        names.ingredients.clear()
+        self.addCleanup(names.tags.clear)
+        self.addCleanup(names.ingredients.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_known_names_skip_lookups(self):
+        payload = {
+            "title": "omelette",
+            "time_minutes": 5,
+            "price": "2.00",
+            "tags": [{"name": "vegan"}, {"name": "quick"}],
+            "ingredients": [{"name": "eggs"}, {"name": "salt"}],
+        }
+        self.client.post(RECIPES_URL, payload, format="json")
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        lookups = [
+            q["sql"]
+            for q in queries
+            # the response still reads the recipe's tags and ingredients
+            if "JOIN" not in q["sql"]
+            and ('FROM "core_tag"' in q["sql"] or 'FROM "core_ingredient"' in q["sql"])
+        ]
+        self.assertEqual(lookups, [])
+        recipe = Recipe.objects.get(pk=res.data["id"])
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)), ["quick", "vegan"]
+        )
+
+    def test_stats_staff_only(self):
+        res = self.client.get(NAME_CACHE_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.post(
+            RECIPES_URL,
+            {"title": "soup", "tags": [{"name": "vegan"}]},
+            format="json",
+        )
+        self.client.force_authenticate(create_user("staff@example.com", is_staff=True))
+        res = self.client.get(NAME_CACHE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tags"]["hits"], 1)
+        self.assertEqual(res.data["tags"]["hit_rate"], 1.0)
+        self.assertIsNone(res.data["ingredients"]["hit_rate"])
@@ -0,0 +1,166 @@
+"""tests for the change events recipe writes append to the outbox"""
+
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import OutboxEvent, Recipe
+from core.tests.factories import (
+    create_user,
+    create_tags,
+    create_ingredients,
+    create_recipe,
+)
+from recipe import clone, merge, names
+from user import deletion
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def events():
+    rows = OutboxEvent.objects.order_by("id")
+    return list(rows.values_list("kind", "object_id", "action", "payload"))
+
+
+class RecipeEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        names.tags.clear()
+        names.ingredients.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_update_delete(self):
+        payload = {
+            "title": "soup",
+            "time_minutes": 20,
+            "price": "4.50",
+            "tags": [{"name": "vegan"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(pk=res.data["id"])
+        tag = recipe.tags.get()
+
+        self.assertEqual(
+            events(),
+            [
+                (
+                    "recipe",
+                    recipe.pk,
+                    "created",
+                    {
+                        "title": "soup",
+                        "description": "",
+                        "time_minutes": 20,
+                        "price": "4.50",
+                        "link": "",
+                        "image": "",
+                    },
+                ),
+                ("tag", tag.pk, "created", {"name": "vegan"}),
+                (
+                    "recipe",
+                    recipe.pk,
+                    "relations",
+                    {"field": "tags", "added": [tag.pk]},
+                ),
+            ],
+        )
+        self.assertEqual(
+            set(OutboxEvent.objects.values_list("user_id", flat=True)), {self.user.pk}
+        )
+
+        OutboxEvent.objects.all().delete()
+        self.client.patch(detail_url(recipe.pk), {"tags": []}, format="json")
+        cleared, updated = events()
+        self.assertEqual(updated[2], "updated")
+        self.assertEqual(cleared[2:], ("relations", {"field": "tags", "cleared": True}))
+
+        OutboxEvent.objects.all().delete()
+        self.client.delete(detail_url(recipe.pk))
+        self.assertEqual(events(), [("recipe", recipe.pk, "deleted", {})])
+
+    def test_rolled_back_write_leaves_no_event(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            create_recipe(self.user)
+            raise RuntimeError()
+
+        self.assertEqual(events(), [])
+
+    def test_reverse_clear(self):
+        tag = create_tags(self.user, ["vegan"])[0]
+        recipes = [create_recipe(self.user) for _ in range(2)]
+        tag.recipe_set.add(*recipes)
+        OutboxEvent.objects.all().delete()
+
+        tag.recipe_set.clear()
+
+        self.assertEqual(
+            events(),
+            [
+                ("recipe", r.pk, "relations", {"field": "tags", "removed": [tag.pk]})
+                for r in recipes
+            ],
+        )
+
+    def test_merge(self):
+        tomato, tomatoes = create_ingredients(self.user, ["tomato", "tomatoes"])
+        recipe = create_recipe(self.user)
+        recipe.ingredients.add(tomatoes)
+        OutboxEvent.objects.all().delete()
+
+        merge.merge(tomato, [tomatoes.pk])
+
+        self.assertEqual(
+            events(),
+            [
+                (
+                    "recipe",
+                    recipe.pk,
+                    "relations",
+                    {
+                        "field": "ingredients",
+                        "added": [tomato.pk],
+                        "removed": [tomatoes.pk],
+                    },
+                ),
+                ("ingredient", tomatoes.pk, "deleted", {}),
+            ],
+        )
+
+    def test_clone(self):
+        original = create_recipe(self.user, title="bread")
+        flour, salt = create_ingredients(self.user, ["flour", "salt"])
+        original.ingredients.add(flour, salt)
+        OutboxEvent.objects.all().delete()
+
+        copy = clone.clone(self.user, [original.pk])[0]
+
+        self.assertEqual(
+            [event[1:3] for event in events()],
+            [(copy.pk, "created"), (copy.pk, "relations")],
+        )
+        self.assertEqual(events()[0][3]["title"], "bread (copy)")
+        self.assertEqual(
+            events()[1][3], {"field": "ingredients", "added": [flour.pk, salt.pk]}
+        )
+
+    def test_account_deletion(self):
+        user = create_user()
+        create_recipe(user)
+        OutboxEvent.objects.all().delete()
+
+        deletion.run(deletion.start(user, background=False))
+
+        self.assertEqual(events(), [("user", user.pk, "deleted", {})])
@@ -3,7 +3,6 @@ from decimal import Decimal
 import tempfile, os
 from PIL import Image
 
-from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 
@@ -12,6 +11,8 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.tests.factories import create_user, create_recipe
+from recipe import names
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse("recipe:recipe-list")
@@ -27,25 +28,6 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
-def create_recipe(user, **params):
-    defaults = {
-        "title": "sample title",
-        "time_minutes": 22,
-        "price": Decimal("5.25"),
-        "description": "sample description",
-        "link": "http://sample.com/what.pdf",
-    }
-    defaults.update(params)
-
-    recipe = Recipe.objects.create(user=user, **defaults)
-    return recipe
-
-
-def create_user(**params):
-    """creates and returns a new user"""
-    return get_user_model().objects.create_user(**params)
-
-
 class PublicRecipeAPITests(TestCase):
     """Unauthenticated tests"""
 
@@ -60,9 +42,15 @@ class PublicRecipeAPITests(TestCase):
 class PrivateRecipeAPITests(TestCase):
     """Authenticated tests"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email="user@example.com", password="iIzPassword")
+
     def setUp(self):
+        # ids of earlier tests' tags are reused after the rollback
+        names.tags.clear()
+        names.ingredients.clear()
         self.client = APIClient()
-        self.user = create_user(email="user@example.com", password="iIzPassword")
         self.client.force_authenticate(self.user)
 
     def test_retrieve_recipe_success(self):
@@ -388,11 +376,12 @@ class PrivateRecipeAPITests(TestCase):
 class ImageUploadTests(TestCase):
     """tests for the image uplaod end points"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("test@example.com", "password1")
+
     def setUp(self) -> None:
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            "test@example.com", "password1"
-        )
         self.client.force_authenticate(self.user)
         self.recipe = create_recipe(user=self.user)
 
@@ -421,3 +410,100 @@ class ImageUploadTests(TestCase):
         payload = {"image": "im the best image :D not sus at all! :3"}
         res = self.client.post(url, payload, format="multipart")
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeRangeAndOrderingTests(TestCase):
+    """tests range filters, ordering and keyset pagination of the list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email="user@example.com", password="iIzPassword")
+        cls.quick_cheap = create_recipe(
+            cls.user, title="toast", time_minutes=5, price=Decimal("1.50")
+        )
+        cls.quick_pricey = create_recipe(
+            cls.user, title="sushi", time_minutes=25, price=Decimal("30.00")
+        )
+        cls.slow_cheap = create_recipe(
+            cls.user, title="stew", time_minutes=120, price=Decimal("8.00")
+        )
+        cls.slow_pricey = create_recipe(
+            cls.user, title="roast", time_minutes=180, price=Decimal("45.00")
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, res):
+        return [r["id"] for r in res.data]
+
+    def test_range_filters(self):
+        res = self.client.get(
+            RECIPES_URL, {"time_minutes__lte": 30, "price__lte": "10.00"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(res), [self.quick_cheap.id])
+
+        res = self.client.get(
+            RECIPES_URL, {"time_minutes__gte": 25, "price__gte": "30"}
+        )
+        self.assertEqual(
+            set(self.ids(res)), {self.quick_pricey.id, self.slow_pricey.id}
+        )
+
+    def test_ordering(self):
+        res = self.client.get(RECIPES_URL, {"ordering": "price"})
+        self.assertEqual(
+            self.ids(res),
+            [
+                self.quick_cheap.id,
+                self.slow_cheap.id,
+                self.quick_pricey.id,
+                self.slow_pricey.id,
+            ],
+        )
+
+        res = self.client.get(RECIPES_URL, {"ordering": "-time_minutes"})
+        self.assertEqual(self.ids(res)[0], self.slow_pricey.id)
+
+    def test_invalid_params_rejected(self):
+        for params in [
+            {"ordering": "title"},
+            {"ordering": "user__password"},
+            {"price__lte": "cheap"},
+            {"time_minutes__gte": "soon"},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_keyset_pagination_on_sort_key(self):
+        # equal prices exercise the id tie breaker
+        same_price = [
+            create_recipe(self.user, title=f"rice {i}", price=Decimal("8.00"))
+            for i in range(3)
+        ]
+        expected = list(
+            Recipe.objects.filter(user=self.user)
+            .order_by("price", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertIn(same_price[0].id, expected)
+
+        seen = []
+        params = {"ordering": "price", "page_size": 2}
+        res = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            seen += [r["id"] for r in res.data["results"]]
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(RECIPES_URL, {"cursor": "garbage"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
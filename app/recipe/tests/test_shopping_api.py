@@ -0,0 +1,176 @@
+"""tests for ingredient amounts and the shopping list"""
+
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RecipeIngredient
+from core.tests.factories import (
+    create_user,
+    create_ingredients,
+    create_recipe,
+)
+from recipe import names
+from recipe.shopping import shopping_list
+
+RECIPES_URL = reverse("recipe:recipe-list")
+SHOPPING_LIST_URL = reverse("recipe:shopping-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def add_amounts(recipe, *amounts):
+    """`amounts` are (ingredient, quantity, unit)"""
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredient,
+            quantity=None if quantity is None else Decimal(quantity),
+            unit=unit,
+        )
+        for ingredient, quantity, unit in amounts
+    )
+
+
+class IngredientAmountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        names.ingredients.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_with_amounts(self):
+        payload = {
+            "title": "pancakes",
+            "ingredients": [
+                {"name": "flour", "quantity": "250", "unit": "g"},
+                {"name": "eggs", "quantity": "2"},
+                {"name": "salt"},
+            ],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        amounts = {
+            i["name"]: (i["quantity"], i["unit"]) for i in res.data["ingredients"]
+        }
+        self.assertEqual(
+            amounts,
+            {"flour": ("250.000", "g"), "eggs": ("2.000", ""), "salt": (None, "")},
+        )
+        res = self.client.get(detail_url(res.data["id"]))
+        self.assertEqual(len(res.data["ingredients"]), 3)
+
+    def test_update_replaces_amounts(self):
+        res = self.client.post(
+            RECIPES_URL,
+            {"title": "tea", "ingredients": [{"name": "milk", "quantity": "1"}]},
+            format="json",
+        )
+        res = self.client.patch(
+            detail_url(res.data["id"]),
+            {"ingredients": [{"name": "milk", "quantity": "50", "unit": "ml"}]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        row = RecipeIngredient.objects.get(recipe_id=res.data["id"])
+        self.assertEqual((row.quantity, row.unit), (Decimal("50"), "ml"))
+
+    def test_invalid_amounts(self):
+        for amount in [{"quantity": "-1"}, {"unit": "handful"}]:
+            res = self.client.post(
+                RECIPES_URL,
+                {"title": "soup", "ingredients": [{"name": "salt", **amount}]},
+                format="json",
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ShoppingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.flour, cls.milk, cls.eggs, cls.salt = create_ingredients(
+            cls.user, ["flour", "milk", "eggs", "salt"]
+        )
+        cls.pancakes = create_recipe(cls.user, title="pancakes")
+        add_amounts(
+            cls.pancakes,
+            (cls.flour, "0.25", "kg"),
+            (cls.milk, "1", "cup"),
+            (cls.eggs, "2", ""),
+            (cls.salt, None, ""),
+        )
+        cls.bread = create_recipe(cls.user, title="bread")
+        add_amounts(
+            cls.bread,
+            (cls.flour, "500", "g"),
+            (cls.milk, "2", "tbsp"),
+            (cls.salt, "1", "tsp"),
+        )
+        cls.other = create_recipe(create_user(), title="not mine")
+        add_amounts(cls.other, (cls.flour, "1", "kg"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, *recipes):
+        res = self.client.get(
+            SHOPPING_LIST_URL, {"recipes": ",".join(str(r.id) for r in recipes)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {
+            item["name"]: (item["quantity"], item["unit"], item["recipe_count"])
+            for item in res.data["items"]
+        }
+
+    def test_sums_in_common_units(self):
+        items = self.get(self.pancakes, self.bread, self.other)
+
+        self.assertEqual(
+            items,
+            {
+                "eggs": ("2.000", "", 1),
+                "flour": ("750.000", "g", 2),
+                "milk": ("266.162", "ml", 2),
+                "salt": ("4.929", "ml", 1),
+            },
+        )
+
+    def test_repeated_recipe_counts_twice(self):
+        items = self.get(self.pancakes, self.pancakes, self.bread)
+
+        self.assertEqual(items["flour"], ("1000.000", "g", 2))
+        self.assertEqual(items["eggs"], ("4.000", "", 1))
+
+    def test_to_taste(self):
+        self.assertEqual(self.get(self.pancakes)["salt"], (None, "", 1))
+
+    def test_units_that_dont_convert(self):
+        add_amounts(create_recipe(self.user), (self.flour, "1", "cup"))
+        recipes = list(self.user.recipe_set.all())
+
+        items = shopping_list(self.user, [r.id for r in recipes])
+
+        flour = [(i["quantity"], i["unit"]) for i in items if i["name"] == "flour"]
+        self.assertEqual(flour, [(Decimal("750"), "g"), (Decimal("236.588"), "ml")])
+
+    def test_one_query(self):
+        with self.assertNumQueries(1):
+            shopping_list(self.user, [self.pancakes.id, self.bread.id])
+
+    def test_invalid_params(self):
+        for params in [{}, {"recipes": "1,x"}, {"recipes": ",".join(["1"] * 201)}]:
+            res = self.client.get(SHOPPING_LIST_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.factories import create_user
+from core.tests.utils import TempDirMixin
+from recipe import stats
+
+STATS_URL = reverse("recipe:recipe-stats")
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "sample", "time_minutes": 10, "price": Decimal("5.00")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicStatsAPITests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsAPITests(TempDirMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user@example.com", "password12")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_empty_stats(self):
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 0)
+        self.assertIsNone(res.data["avg_price"])
+        self.assertEqual(res.data["price_histogram"], [])
+        self.assertEqual(res.data["top_tags"], [])
+
+    def test_stats(self):
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        Tag.objects.create(user=self.user, name="Unused")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        r1 = create_recipe(self.user, time_minutes=10, price=Decimal("2.50"))
+        r2 = create_recipe(self.user, time_minutes=20, price=Decimal("4.50"))
+        r3 = create_recipe(self.user, time_minutes=60, price=Decimal("12.00"))
+        r1.tags.add(vegan, quick)
+        r2.tags.add(vegan)
+        r3.ingredients.add(salt)
+        create_recipe(create_user(email="other@example.com"), price=Decimal("99"))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 3)
+        self.assertEqual(res.data["avg_time_minutes"], 30.0)
+        self.assertEqual(res.data["min_price"], "2.50")
+        self.assertEqual(res.data["max_price"], "12.00")
+        self.assertEqual(res.data["avg_price"], "6.33")
+        self.assertEqual(
+            res.data["price_histogram"],
+            [
+                {"min_price": "0.00", "max_price": "5.00", "count": 2},
+                {"min_price": "10.00", "max_price": "15.00", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            [(t["name"], t["recipe_count"]) for t in res.data["top_tags"]],
+            [("Vegan", 2), ("Quick", 1)],
+        )
+        self.assertEqual(res.data["top_ingredients"][0]["name"], "Salt")
+
+    def test_stats_cached_and_invalidated_on_write(self):
+        create_recipe(self.user)
+        self.client.get(STATS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["recipe_count"], 1)
+
+        recipe = create_recipe(self.user)
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["recipe_count"], 2)
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Lunch"))
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["top_tags"][0]["name"], "Lunch")
+
+    def test_not_cached_from_before_a_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                create_recipe(self.user)
+                # a concurrent read, on the committed data in production
+                cache.set(stats.cache_key(self.user.pk), {"recipe_count": 0})
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["recipe_count"], 1)
+
+    def test_invalidated_by_other_process(self):
+        with self.shared_cache() as other:
+            self.client.get(STATS_URL)
+            Recipe.objects.bulk_create([Recipe(user=self.user, title="soup")])
+
+            # the write's process drops the stats through its own cache client
+            other.delete(stats.cache_key(self.user.pk))
+
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["recipe_count"], 1)
@@ -0,0 +1,172 @@
+"""tests for the delta sync change feed"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, SyncState, Tombstone
+from core.tests.factories import create_user, create_recipe
+from recipe import sync
+
+SYNC_URL = reverse("recipe:sync")
+
+
+class SyncApiTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None, **params):
+        if cursor is not None:
+            params["since"] = cursor
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_auth_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync_then_nothing_new(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        recipe = create_recipe(self.user, title="curry")
+        recipe.tags.add(tag)
+        create_recipe(create_user(), title="not mine")
+
+        data = self.sync()
+
+        self.assertFalse(data["has_more"])
+        self.assertEqual([t["name"] for t in data["tags"]], ["vegan"])
+        self.assertEqual([r["title"] for r in data["recipes"]], ["curry"])
+        self.assertEqual(data["recipes"][0]["tags"], [{"id": tag.id, "name": "vegan"}])
+
+        again = self.sync(data["cursor"])
+        self.assertEqual(again["recipes"], [])
+        self.assertEqual(again["tags"], [])
+        self.assertEqual(again["deleted"]["recipes"], [])
+
+    def test_only_changes_since_cursor(self):
+        old = create_recipe(self.user, title="old")
+        changed = create_recipe(self.user, title="changed")
+        cursor = self.sync()["cursor"]
+
+        changed.title = "changed again"
+        changed.save()
+        new = create_recipe(self.user, title="new")
+        data = self.sync(cursor)
+
+        self.assertEqual([r["id"] for r in data["recipes"]], [changed.id, new.id])
+        self.assertNotIn(old.id, [r["id"] for r in data["recipes"]])
+
+    def test_membership_changes_renumber_recipes(self):
+        tag = Tag.objects.create(user=self.user, name="quick")
+        ingredient = Ingredient.objects.create(user=self.user, name="salt")
+        first = create_recipe(self.user)
+        second = create_recipe(self.user)
+        cursor = self.sync()["cursor"]
+
+        first.ingredients.add(ingredient)
+        data = self.sync(cursor)
+        self.assertEqual([r["id"] for r in data["recipes"]], [first.id])
+
+        tag.recipe_set.add(first, second)
+        data = self.sync(data["cursor"])
+        self.assertEqual(
+            sorted(r["id"] for r in data["recipes"]), [first.id, second.id]
+        )
+
+        tag.recipe_set.clear()
+        data = self.sync(data["cursor"])
+        self.assertEqual(len(data["recipes"]), 2)
+        self.assertEqual(data["recipes"][0]["tags"], [])
+
+    def test_deletes_are_tombstoned(self):
+        tag = Tag.objects.create(user=self.user, name="gone")
+        recipe = create_recipe(self.user)
+        cursor = self.sync()["cursor"]
+
+        recipe_id, tag_id = recipe.id, tag.id
+        recipe.delete()
+        tag.delete()
+        data = self.sync(cursor)
+
+        self.assertEqual(data["deleted"]["recipes"], [recipe_id])
+        self.assertEqual(data["deleted"]["tags"], [tag_id])
+        self.assertEqual(data["recipes"], [])
+
+    def test_pages_cover_every_change_once(self):
+        tags = [Tag.objects.create(user=self.user, name=f"t{i}") for i in range(3)]
+        recipes = [create_recipe(self.user, title=f"r{i}") for i in range(4)]
+        # one write renumbering several recipes shares a seq between them
+        tags[0].recipe_set.add(*recipes[:3])
+        deleted_id = tags[2].id
+        tags[2].delete()
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            data = self.sync(cursor, limit=2)
+            pages += 1
+            seen += [("tag", t["id"]) for t in data["tags"]]
+            seen += [("recipe", r["id"]) for r in data["recipes"]]
+            seen += [("deleted", pk) for pk in data["deleted"]["tags"]]
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                break
+
+        expected = [("tag", t.id) for t in tags[:2]]
+        expected += [("recipe", r.id) for r in recipes]
+        expected += [("deleted", deleted_id)]
+        self.assertEqual(sorted(seen), sorted(expected))
+        self.assertEqual(pages, 4)
+        self.assertEqual(self.sync(cursor)["recipes"], [])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(SYNC_URL, {"since": "nope"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_compacted_cursor_expires(self):
+        recipe = create_recipe(self.user)
+        cursor = self.sync()["cursor"]
+        recipe.delete()
+        create_recipe(self.user)
+
+        deleted = sync.compact(before=timezone.now() + timedelta(seconds=1))
+
+        self.assertEqual(deleted, 1)
+        res = self.client.get(SYNC_URL, {"since": cursor})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+        # a client caught up past the compacted deletes keeps syncing
+        data = self.sync()
+        self.assertEqual(len(data["recipes"]), 1)
+        self.assertEqual(self.sync(data["cursor"])["recipes"], [])
+
+    def test_compact_command_keeps_recent_tombstones(self):
+        create_recipe(self.user).delete()
+        out = StringIO()
+
+        call_command("compact_tombstones", stdout=out)
+
+        self.assertIn("0 tombstones", out.getvalue())
+        self.assertEqual(Tombstone.objects.count(), 1)
+
+    def test_user_delete_drops_sync_state(self):
+        user = create_user()
+        recipe = create_recipe(user)
+        recipe.tags.create(user=user, name="tag")
+        user_id = user.pk
+
+        user.delete()
+
+        self.assertFalse(Recipe.objects.filter(pk=recipe.pk).exists())
+        self.assertFalse(SyncState.objects.filter(user_id=user_id).exists())
+        self.assertFalse(Tombstone.objects.filter(user_id=user_id).exists())
@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
@@ -8,6 +7,7 @@ from rest_framework.test import APIClient
 from decimal import Decimal
 
 from core.models import Tag, Recipe
+from core.tests.factories import create_user
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse("recipe:tag-list")
@@ -17,10 +17,6 @@ def detail_url(tag_id):
     return reverse("recipe:tag-detail", args=[tag_id])
 
 
-def create_user(email="user@example.com", password="password12"):
-    return get_user_model().objects.create_user(email, password)
-
-
 class PublicTagsAPITests(TestCase):
     """Tests UNAUTHENTICATED endpoints"""
 
@@ -35,8 +31,11 @@ class PublicTagsAPITests(TestCase):
 class PrivateTagsAPITests(TestCase):
     """Tests Authenticated endpoints"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user@example.com", "password12")
+
     def setUp(self):
-        self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -10,5 +10,8 @@ router.register("ingredients", views.IngredientViewSet)
 app_name = "recipe"
 
 urlpatterns = [
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    path("shopping-list/", views.ShoppingListView.as_view(), name="shopping-list"),
+    path("name-cache/", views.NameCacheStatsView.as_view(), name="name-cache"),
     path("", include(router.urls)),
 ]
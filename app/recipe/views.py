@@ -1,8 +1,10 @@
-from rest_framework import viewsets, mixins, status
+from django.db import transaction
+from rest_framework import generics, viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -10,8 +12,29 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
+from core.idempotency import idempotent
+from core.mixins import ReplicaReadMixin
 from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+from core.throttling import UserTokenBucketThrottle
+from recipe import (
+    serializers,
+    clone,
+    fast_serializers,
+    matching,
+    merge,
+    names,
+    shopping,
+    stats,
+    sync,
+)
+from recipe.pagination import KeysetPagination
+
+IDEMPOTENCY_KEY = OpenApiParameter(
+    "Idempotency-Key",
+    OpenApiTypes.STR,
+    OpenApiParameter.HEADER,
+    description="Retries sending the same key get the first response replayed",
+)
 
 
 @extend_schema_view(
@@ -27,25 +50,81 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description="Comma seperated list of ingredients IDS to filter",
             ),
+            OpenApiParameter("time_minutes__gte", OpenApiTypes.INT),
+            OpenApiParameter("time_minutes__lte", OpenApiTypes.INT),
+            OpenApiParameter("price__gte", OpenApiTypes.DECIMAL),
+            OpenApiParameter("price__lte", OpenApiTypes.DECIMAL),
+            OpenApiParameter(
+                "ordering",
+                OpenApiTypes.STR,
+                enum=serializers.RecipeFilterSerializer.ORDERING_CHOICES,
+                description="Sort key, ties are broken by id in the same direction",
+            ),
+            OpenApiParameter(
+                "page_size",
+                OpenApiTypes.INT,
+                description="Enables keyset pagination, see `next` in the response",
+            ),
+            OpenApiParameter("cursor", OpenApiTypes.STR),
         ]
-    )
+    ),
+    create=extend_schema(parameters=[IDEMPOTENCY_KEY]),
+    upload_image=extend_schema(parameters=[IDEMPOTENCY_KEY]),
+    clone=extend_schema(
+        operation_id="recipe_recipes_clone",
+        parameters=[IDEMPOTENCY_KEY],
+        request=serializers.CloneSerializer,
+        responses={201: serializers.RecipeDetailSerializer},
+    ),
+    clone_many=extend_schema(
+        operation_id="recipe_recipes_clone_many",
+        parameters=[IDEMPOTENCY_KEY],
+        request=serializers.BulkCloneSerializer,
+        responses={201: serializers.RecipeSerializer(many=True)},
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = None
+    pagination_class = KeysetPagination
 
     def _params_to_ints(self, qs):
         """converts a list of strings to integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _get_filters(self):
+        """validated range filters and ordering from the query params"""
+        if not hasattr(self, "_filters"):
+            serializer = serializers.RecipeFilterSerializer(
+                data=self.request.query_params
+            )
+            serializer.is_valid(raise_exception=True)
+            self._filters = dict(serializer.validated_data)
+        return self._filters
+
+    def get_ordering(self):
+        """the sort key plus id as tie breaker in the same direction"""
+        ordering = self._get_filters()["ordering"]
+        if ordering.lstrip("-") == "id":
+            return (ordering,)
+        return (ordering, "-id" if ordering.startswith("-") else "id")
+
     def get_queryset(self):
         """get recipies for authenticated user"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
         queryset = self.queryset
 
+        if self.action == "list":
+            filters = self._get_filters()
+            ranges = {k: v for k, v in filters.items() if k != "ordering"}
+            queryset = queryset.filter(**ranges).order_by(*self.get_ordering())
+        else:
+            queryset = queryset.order_by("-id")
+
         if tags:
             tag_ids = self._params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
@@ -53,29 +132,176 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredients_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredients_ids)
 
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+        return queryset.filter(user=self.request.user).distinct()
 
     def get_serializer_class(self):
         if self.action == "list":
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "stats":
+            return serializers.RecipeStatsSerializer
+        elif self.action == "cookable":
+            return serializers.CookableRecipeSerializer
+        elif self.action == "similar":
+            return serializers.SimilarRecipeSerializer
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """lists recipes through the read only values serializer"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = fast_serializers.RecipeValuesSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = fast_serializers.RecipeValuesSerializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """override the default saving of the view"""
-        serializer.save(user=self.request.user)
+        # writes are atomic so they commit in change sequence order, see
+        # recipe.sync
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
 
-    @action(methods=["POST"], detail=True, url_path="upload-image")
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="upload-image",
+        throttle_classes=[UserTokenBucketThrottle],
+        throttle_scope="recipe_upload",
+    )
+    @idempotent
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=["POST"], detail=True)
+    @idempotent
+    def clone(self, request, pk=None):
+        """copies the recipe with its tags, ingredients and image"""
+        recipe = self.get_object()
+        params = serializers.CloneSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        copy = clone.clone(
+            request.user, [recipe.pk], params.validated_data.get("title")
+        )[0]
+        data = serializers.RecipeDetailSerializer(
+            copy, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=["POST"], detail=False, url_path="clone", url_name="clone-many")
+    @idempotent
+    def clone_many(self, request):
+        """copies several recipes, see clone"""
+        params = serializers.BulkCloneSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        ids = set(params.validated_data["ids"])
+        found = Recipe.objects.filter(user=request.user, id__in=ids)
+        missing = ids - set(found.values_list("id", flat=True))
+        if missing:
+            raise ValidationError({"ids": [f"Not found: {sorted(missing)}"]})
+
+        copies = clone.clone(request.user, ids)
+        queryset = Recipe.objects.filter(id__in=[c.pk for c in copies]).order_by("id")
+        data = fast_serializers.RecipeValuesSerializer(queryset, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=["GET"], detail=False)
+    def stats(self, request):
+        """recipe count, time and price stats, top tags and ingredients"""
+        data = stats.get_stats(
+            request.user, lambda raw: dict(self.get_serializer(raw).data)
+        )
+        return Response(data)
+
+    @extend_schema(
+        parameters=[serializers.CookableQuerySerializer],
+        responses=serializers.CookableRecipeSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False)
+    def cookable(self, request):
+        """recipes ranked by the share of their ingredients on hand"""
+        params = serializers.CookableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        index = matching.ingredients.get(request.user.pk)
+        matches = index.match(
+            params.validated_data["ingredients"], params.validated_data["limit"]
+        )
+
+        recipes = Recipe.objects.filter(
+            user=request.user, id__in=[recipe_id for recipe_id, _, _ in matches]
+        )
+        by_id = {
+            recipe["id"]: recipe
+            for recipe in fast_serializers.RecipeValuesSerializer(recipes).data
+        }
+        data = [
+            {
+                **by_id[recipe_id],
+                "coverage": round(have / size, 4),
+                "matched_count": have,
+                "missing_count": size - have,
+            }
+            for recipe_id, have, size in matches
+            if recipe_id in by_id
+        ]
+        return Response(data)
+
+    @extend_schema(
+        parameters=[serializers.SimilarQuerySerializer],
+        responses=serializers.SimilarRecipeSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """recipes sharing the most tags and ingredients with this one"""
+        recipe = self.get_object()
+        params = serializers.SimilarQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        metric = params.validated_data["metric"]
+        index = matching.features.get(request.user.pk)
+        with index.lock:
+            matches = index.similar(recipe.pk, params.validated_data["limit"], metric)
+            size = len(index.recipe_items.get(recipe.pk, ()))
+
+        recipes = Recipe.objects.filter(
+            user=request.user, id__in=[recipe_id for recipe_id, _, _ in matches]
+        )
+        by_id = {
+            recipe["id"]: recipe
+            for recipe in fast_serializers.RecipeValuesSerializer(recipes).data
+        }
+        similarity = matching.SIMILARITY_METRICS[metric]
+        data = [
+            {
+                **by_id[recipe_id],
+                "similarity": round(similarity(shared, other, size), 4),
+                "shared_count": shared,
+            }
+            for recipe_id, shared, other in matches
+            if recipe_id in by_id
+        ]
+        return Response(data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -90,6 +316,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
 )
 class BaseRecipeAttrViewSet(
+    ReplicaReadMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
@@ -108,6 +335,37 @@ class BaseRecipeAttrViewSet(
             queryset = queryset.filter(recipe__isnull=False)
         return queryset.filter(user=self.request.user).order_by("-name").distinct()
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+
+    @extend_schema(
+        request=serializers.MergeSerializer,
+        responses=serializers.MergeResultSerializer,
+    )
+    @action(methods=["POST"], detail=True)
+    def merge(self, request, pk=None):
+        """moves the recipes of `sources` onto this one and deletes them"""
+        target = self.get_object()
+        params = serializers.MergeSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        source_ids = set(params.validated_data["sources"]) - {target.pk}
+        found = self.queryset.filter(user=request.user, id__in=source_ids)
+        missing = source_ids - set(found.values_list("id", flat=True))
+        if missing:
+            raise ValidationError({"sources": [f"Not found: {sorted(missing)}"]})
+
+        merged, recipes = merge.merge(
+            target, source_ids, params.validated_data.get("name")
+        )
+        return Response(
+            {"id": target.pk, "name": target.name, "merged": merged, "recipes": recipes}
+        )
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.TagSerializer
@@ -117,3 +375,56 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+@extend_schema(
+    parameters=[serializers.SyncQuerySerializer],
+    responses=serializers.SyncSerializer,
+)
+class SyncView(generics.GenericAPIView):
+    """
+    changes to the user's recipes, tags and ingredients since a cursor,
+    follow `cursor` while `has_more`, then keep it for the next sync
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.SyncSerializer
+
+    def get(self, request):
+        params = serializers.SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = sync.changes(
+            request.user.pk,
+            params.validated_data.get("since"),
+            params.validated_data.get("limit"),
+        )
+        return Response(data)
+
+
+class ShoppingListView(generics.GenericAPIView):
+    """the ingredients of several recipes summed up, to shop for all of them"""
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.ShoppingListSerializer
+
+    @extend_schema(parameters=[serializers.ShoppingListQuerySerializer])
+    def get(self, request):
+        params = serializers.ShoppingListQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        items = shopping.shopping_list(request.user, params.validated_data["recipes"])
+        return Response(self.get_serializer({"items": items}).data)
+
+
+class NameCacheStatsView(generics.GenericAPIView):
+    """hit rates of this process's tag and ingredient name caches, staff only"""
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+    serializer_class = serializers.NameCacheStatsSerializer
+
+    def get(self, request):
+        return Response(
+            {"tags": names.tags.stats(), "ingredients": names.ingredients.stats()}
+        )
@@ -0,0 +1,122 @@
+"""
+batched account deletion
+
+Model.delete() collects every related object in python first, for a user
+with thousands of recipes that is a lot of memory and huge IN lists. this
+deletes their rows in chunks of USER_DELETE_CHUNK_SIZE instead, each chunk
+a transaction of plain set based DELETEs, so locks are short and a deletion
+that dies half way just picks up from what is left.
+
+no delete signals are sent, the caches they keep are per user and die with
+the user.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import jobs
+from core.models import AccountDeletion, Recipe, Tag, Ingredient
+
+# owned model, its recipe through table and field, progress counter
+OWNED = [
+    (Tag, Recipe.tags.through, "tag", "tags_deleted"),
+    (Ingredient, Recipe.ingredients.through, "ingredient", "ingredients_deleted"),
+]
+
+
+def raw_delete(model, field, ids):
+    """deletes the rows of `model` whose `field` is in `ids`, no signals"""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(model._meta.get_field(field).column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", ids)
+        return cursor.rowcount
+
+
+def chunks(queryset, size):
+    """yields the ids of `queryset` `size` at a time, deleted as it goes"""
+    while True:
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+
+
+def add_progress(deletion, **counts):
+    AccountDeletion.objects.filter(pk=deletion.pk).update(
+        **{name: F(name) + count for name, count in counts.items()}
+    )
+
+
+def start(user, background=True):
+    """
+    deactivates `user`, so their token stops working, and with `background`
+    queues the deletion for a worker
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        deletion = AccountDeletion.objects.create(
+            user=user, recipes_total=Recipe.objects.filter(user=user).count()
+        )
+        if background:
+            jobs.enqueue("user.delete_account", {"deletion_id": str(deletion.pk)})
+    return deletion
+
+
+def run(deletion, chunk_size=None, progress=None):
+    """
+    deletes the user of `deletion` and everything they own, calls
+    `progress(deletion)` after every chunk
+    """
+    size = chunk_size or settings.USER_DELETE_CHUNK_SIZE
+    user_id = deletion.user_id
+
+    def report():
+        deletion.refresh_from_db()
+        if progress:
+            progress(deletion)
+
+    AccountDeletion.objects.filter(pk=deletion.pk).update(
+        status=AccountDeletion.RUNNING
+    )
+    if user_id is not None:
+        for ids in chunks(Recipe.objects.filter(user_id=user_id), size):
+            with transaction.atomic():
+                images = list(
+                    Recipe.objects.filter(id__in=ids)
+                    .exclude(image="")
+                    .exclude(image=None)
+                    .values_list("image", flat=True)
+                )
+                raw_delete(Recipe.tags.through, "recipe", ids)
+                raw_delete(Recipe.ingredients.through, "recipe", ids)
+                deleted = raw_delete(Recipe, "id", ids)
+                if images:
+                    # files can't be rolled back, remove them once committed
+                    jobs.enqueue("recipe.delete_images", {"names": images})
+                add_progress(
+                    deletion, recipes_deleted=deleted, images_queued=len(images)
+                )
+            report()
+
+        for model, through, field, counter in OWNED:
+            for ids in chunks(model.objects.filter(user_id=user_id), size):
+                with transaction.atomic():
+                    raw_delete(through, field, ids)
+                    add_progress(deletion, **{counter: raw_delete(model, "id", ids)})
+                report()
+
+        # what is left, tokens and the like, is a handful of rows
+        get_user_model().objects.filter(pk=user_id).delete()
+
+    AccountDeletion.objects.filter(pk=deletion.pk).update(
+        status=AccountDeletion.DONE, finished_at=timezone.now()
+    )
+    report()
+    return deletion
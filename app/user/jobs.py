@@ -0,0 +1,8 @@
+from core.jobs import job
+from core.models import AccountDeletion
+from user import deletion
+
+
+@job("user.delete_account")
+def delete_account(deletion_id):
+    deletion.run(AccountDeletion.objects.get(pk=deletion_id))
@@ -1,6 +1,11 @@
 from django.contrib.auth import get_user_model, authenticate
+from django.db.models.functions import Lower
 from django.utils.translation import gettext as _
 from rest_framework import serializers
+from drf_spectacular.utils import extend_schema_field
+from drf_spectacular.types import OpenApiTypes
+
+from core.models import AccountDeletion
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -9,6 +14,17 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["email", "password", "name"]
         extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
 
+    def validate_email(self, value):
+        """emails are unique regardless of case"""
+        manager = get_user_model().objects
+        email = manager.normalize_email(value)
+        taken = manager.alias(email_lower=Lower("email")).filter(email_lower=email)
+        if self.instance is not None:
+            taken = taken.exclude(pk=self.instance.pk)
+        if taken.exists():
+            raise serializers.ValidationError(_("user with this email already exists."))
+        return email
+
     def create(self, validated_data):
         return get_user_model().objects.create_user(**validated_data)
 
@@ -40,3 +56,32 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs["user"] = user
         return attrs
+
+
+class AccountDeletionSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AccountDeletion
+        fields = [
+            "id",
+            "status",
+            "progress",
+            "recipes_total",
+            "recipes_deleted",
+            "tags_deleted",
+            "ingredients_deleted",
+            "images_queued",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    @extend_schema_field(OpenApiTypes.FLOAT)
+    def get_progress(self, obj):
+        """share of the recipes deleted so far"""
+        if obj.status == AccountDeletion.DONE:
+            return 1.0
+        if not obj.recipes_total:
+            return 0.0
+        return round(min(obj.recipes_deleted / obj.recipes_total, 1.0), 4)
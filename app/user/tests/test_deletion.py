@@ -0,0 +1,103 @@
+"""tests for batched account deletion"""
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AccountDeletion, Job, Recipe, Tag, Ingredient
+from user import deletion
+from user.jobs import delete_account
+
+ME_URL = reverse("user:me")
+
+
+def create_user(email="test@example.com"):
+    return get_user_model().objects.create_user(email, "password!")
+
+
+def create_recipes(user, count):
+    tag = Tag.objects.create(user=user, name="dinner")
+    ingredient = Ingredient.objects.create(user=user, name="salt")
+    for i in range(count):
+        recipe = Recipe.objects.create(user=user, title=f"recipe {i}")
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    return tag, ingredient
+
+
+class AccountDeletionTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        create_recipes(self.user, 5)
+        Recipe.objects.filter(user=self.user, title="recipe 0").update(
+            image="uploads/recipe/a.jpg"
+        )
+        self.other = create_user("other@example.com")
+        self.other_tag, _ = create_recipes(self.other, 2)
+
+    def test_delete_me_queues_deletion(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        res = client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["status"], AccountDeletion.PENDING)
+        self.assertEqual(res.data["recipes_total"], 5)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = Job.objects.get(name="user.delete_account")
+        self.assertEqual(job.payload, {"deletion_id": res.data["id"]})
+
+        progress = APIClient().get(res["Location"])
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.data["progress"], 0.0)
+
+    def test_deleted_in_chunks(self):
+        progress = deletion.start(self.user, background=False)
+        reports = []
+
+        deletion.run(
+            progress, chunk_size=2, progress=lambda d: reports.append(d.recipes_deleted)
+        )
+
+        self.assertEqual(reports[:3], [2, 4, 5])
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, AccountDeletion.DONE)
+        self.assertIsNone(progress.user)
+        self.assertEqual(progress.recipes_deleted, 5)
+        self.assertEqual(progress.tags_deleted, 1)
+        self.assertEqual(progress.ingredients_deleted, 1)
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+
+        images = Job.objects.get(name="recipe.delete_images")
+        self.assertEqual(images.payload, {"names": ["uploads/recipe/a.jpg"]})
+
+        # the other user is untouched
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(Recipe.tags.through.objects.count(), 2)
+        self.assertEqual(self.other_tag.recipe_set.count(), 2)
+
+    def test_job_runs_queued_deletion(self):
+        progress = deletion.start(self.user)
+
+        delete_account(str(progress.pk))
+
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, AccountDeletion.DONE)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 2)
+
+    def test_delete_user_command(self):
+        out = StringIO()
+
+        call_command("delete_user", self.user.email, "--chunk-size=3", stdout=out)
+
+        self.assertIn("3/5 recipes", out.getvalue())
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Job.objects.filter(name="user.delete_account").exists())
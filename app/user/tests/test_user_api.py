@@ -7,6 +7,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core import throttling
+
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
@@ -21,6 +23,9 @@ class PublicUserApiTests(TestCase):
     """Tests the public features of the API"""
 
     def setUp(self):
+        # the token and signup budgets are per ip, every test gets them full
+        throttling.memory_store.clear()
+        self.addCleanup(throttling.memory_store.clear)
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -48,6 +53,21 @@ class PublicUserApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_email_stored_lowercase(self):
+        payload = {"email": "Test@Example.COM", "password": "Pa$$w0rd!", "name": "x"}
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["email"], "test@example.com")
+
+    def test_user_with_email_in_other_case_exists_error(self):
+        create_user(email="test@example.com", password="Pa$$w0rd!")
+        payload = {"email": "TEST@example.com", "password": "Pa$$w0rd!", "name": "x"}
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("email", res.data)
+
     def test_password_2_short_error(self):
         payload = {"email": "test@example.com", "password": "P!", "name": "Test Name"}
 
@@ -71,6 +91,15 @@ class PublicUserApiTests(TestCase):
         self.assertIn("token", res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_email_any_case(self):
+        create_user(email="test@example.com", password="Pa$$w0rd!")
+
+        payload = {"email": "Test@EXAMPLE.com", "password": "Pa$$w0rd!"}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertIn("token", res.data)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_create_token_bad_creds(self):
         create_user(email="test@example.com", password="password")
 
@@ -97,10 +126,13 @@ class PublicUserApiTests(TestCase):
 class PrivateUserAPITests(TestCase):
     """tests endpoints that require authentication"""
 
-    def setUp(self):
-        self.user = create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(
             email="test@example.com", password="password!", name="test name"
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
@@ -122,3 +154,17 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(self.user.name, payload["name"])
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_email_to_taken_in_other_case(self):
+        create_user(email="other@example.com", password="password!")
+
+        res = self.client.patch(ME_URL, {"email": "Other@Example.com"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_own_email_case(self):
+        res = self.client.patch(ME_URL, {"email": "TEST@example.com"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "test@example.com")
@@ -1,19 +1,34 @@
-from rest_framework import generics, authentication, permissions
-from user.serializers import UserSerializer, AuthTokenSerializer
+from rest_framework import generics, authentication, permissions, status
+from rest_framework.response import Response
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    AccountDeletionSerializer,
+)
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from django.urls import reverse
+from drf_spectacular.utils import extend_schema
+
+from core.models import AccountDeletion
+from core.throttling import IPTokenBucketThrottle
+from user import deletion
 
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = "user_create"
 
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = "token"
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manages the authenticated user"""
 
     serializer_class = UserSerializer
@@ -23,3 +38,22 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """gets and returns the authenticated user"""
         return self.request.user
+
+    @extend_schema(responses={202: AccountDeletionSerializer})
+    def delete(self, request, *args, **kwargs):
+        """deactivates the account and deletes its data in the background"""
+        progress = deletion.start(request.user)
+        serializer = AccountDeletionSerializer(progress)
+        url = reverse("user:deletion", args=[progress.pk])
+        return Response(
+            serializer.data, status=status.HTTP_202_ACCEPTED, headers={"Location": url}
+        )
+
+
+class AccountDeletionView(generics.RetrieveAPIView):
+    """progress of an account deletion, the id is only known to its owner"""
+
+    serializer_class = AccountDeletionSerializer
+    queryset = AccountDeletion.objects.all()
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]